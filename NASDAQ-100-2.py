@@ -1,10 +1,60 @@
-import yagmail
-from config import EMAIL_ADDRESS, EMAIL_PASSWORD
-import yfinance as yf
-import pandas as pd
-import numpy as np
-from datetime import datetime
 import time
+_IMPORT_STARTED = time.perf_counter()
+
+from datetime import datetime
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial, reduce
+import argparse
+import asyncio
+import bisect
+import contextlib
+import csv
+import html
+import importlib
+import json
+import os
+import queue
+import string
+import sys
+import threading
+import numpy as np
+
+class _LazyModule:
+    """Module proxy that imports on first attribute access
+
+    Keeps startup cheap for frequent (cron) runs: a cached, no-email run never
+    imports yfinance or the SMTP stack, and --help does not even load pandas.
+    """
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attribute):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            if METRICS.enabled:
+                METRICS.record(f"import.{self._name}", time.perf_counter() - started)
+        return getattr(self._module, attribute)
+
+yf = _LazyModule('yfinance')
+pd = _LazyModule('pandas')
+shared_memory = _LazyModule('multiprocessing.shared_memory')
+smtplib = _LazyModule('smtplib')
+ssl = _LazyModule('ssl')
+email_message = _LazyModule('email.message')
+http_server = _LazyModule('http.server')
+socketserver = _LazyModule('socketserver')
+urllib_parse = _LazyModule('urllib.parse')
+
+try:
+    from config import EMAIL_ADDRESS, EMAIL_PASSWORD
+except ImportError:
+    # No config.py (CI, cron): take the credentials from the environment
+    EMAIL_ADDRESS = os.environ.get('EMAIL_ADDRESS', '')
+    EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD', '')
 
 # Complete NASDAQ-100 stocks
 COMPANY_NAMES = {
@@ -114,23 +164,797 @@ COMPANY_NAMES = {
 
 STOCKS_TO_MONITOR = list(COMPANY_NAMES.keys())
 
+def load_universe(path=None):
+    """Ticker -> company name map, NASDAQ-100 by default
+
+    `path` may be a CSV of ticker,name rows (header optional) or a JSON file
+    holding either {ticker: name} or a list of {"ticker": ..., "name": ...}.
+    """
+    if not path:
+        return dict(COMPANY_NAMES)
+    if path.endswith('.json'):
+        with open(path) as f:
+            data = json.load(f)
+        items = data.items() if isinstance(data, dict) else ((r['ticker'], r.get('name')) for r in data)
+    else:
+        with open(path, newline='') as f:
+            rows = [row for row in csv.reader(f) if row and row[0].strip()]
+        if rows and rows[0][0].strip().lower() in ('ticker', 'symbol'):
+            rows = rows[1:]
+        items = ((row[0], row[1] if len(row) > 1 else None) for row in rows)
+    
+    universe = {}
+    for ticker, name in items:
+        ticker = ticker.strip().upper()
+        universe.setdefault(ticker, (name or '').strip() or COMPANY_NAMES.get(ticker, 'Unknown Company'))
+    return universe
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'started')
+    
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.stage, time.perf_counter() - self.started)
+        return False
+
+_NULL_TIMER = contextlib.nullcontext()
+
+def _no_lap(name):
+    pass
+
+class Metrics:
+    """Per-stage timers and event counters for a run
+
+    Disabled by default; then timer() hands back a shared no-op context and
+    count() returns immediately, so the instrumentation costs next to nothing.
+    Enable with STOCK_METRICS=1 (the summary is printed after the run) and
+    export with STOCK_METRICS_FILE=<path>.json or <path>.prom.
+    """
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timings = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+    
+    def timer(self, stage):
+        """Context manager recording the wall time of one `stage` execution"""
+        return _StageTimer(self, stage) if self.enabled else _NULL_TIMER
+    
+    def record(self, stage, seconds):
+        with self.lock:
+            self.timings[stage].append(seconds)
+    
+    def laps(self, prefix):
+        """Callable recording the time since its previous call as stage '<prefix>.<name>'"""
+        if not self.enabled:
+            return _no_lap
+        last = [time.perf_counter()]
+        
+        def lap(name):
+            now = time.perf_counter()
+            self.record(f"{prefix}.{name}", now - last[0])
+            last[0] = now
+        return lap
+    
+    def count(self, name, n=1, **labels):
+        """Bump counter `name` (e.g. retries, empty_frames, swallowed_exceptions)"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += n
+    
+    def summary(self):
+        """{stage: {count, total, p50, p95, max}} in seconds"""
+        with self.lock:
+            timings = {stage: np.array(values) for stage, values in self.timings.items()}
+        return {
+            stage: {
+                'count': len(values),
+                'total': float(values.sum()),
+                'p50': float(np.percentile(values, 50)),
+                'p95': float(np.percentile(values, 95)),
+                'max': float(values.max()),
+            }
+            for stage, values in sorted(timings.items())
+        }
+    
+    def to_json(self):
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        return json.dumps({'stages': self.summary(), 'counters': counters}, indent=2)
+    
+    def to_prometheus(self, prefix='stock_analyzer'):
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, stats in self.summary().items():
+            for key, quantile in (('p50', '0.5'), ('p95', '0.95')):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["total"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        with self.lock:
+            counters = sorted(self.counters.items())
+        for name in dict.fromkeys(name for (name, _), _ in counters):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for (name, labels), value in counters:
+            label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+            lines.append(f"{prefix}_{name}_total{{{label_text}}} {value}")
+        return '\n'.join(lines) + '\n'
+    
+    def export(self, path):
+        """Write the metrics to `path`, as Prometheus text for .prom files and JSON otherwise"""
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if path.endswith('.prom') else self.to_json())
+    
+    def report(self):
+        """Print the stage percentiles and counters"""
+        print(f"⏱️  {'Stage':28s} {'n':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s} {'total s':>8s}")
+        for stage, stats in self.summary().items():
+            print(f"   {stage:28s} {stats['count']:6d} {stats['p50'] * 1000:9.1f} "
+                  f"{stats['p95'] * 1000:9.1f} {stats['max'] * 1000:9.1f} {stats['total']:8.2f}")
+        with self.lock:
+            counters = sorted(self.counters.items())
+        for (name, labels), value in counters:
+            label_text = ', '.join(f"{key}={val}" for key, val in labels)
+            print(f"🔢 {name}{f' ({label_text})' if label_text else ''}: {value}")
+
+METRICS = Metrics(enabled=os.environ.get('STOCK_METRICS', '') not in ('', '0'))
+
+def _run_blocking(coroutine):
+    """asyncio.run() that also works from inside a running event loop (the daemon, a notebook)
+
+    There the coroutine runs on its own loop in a worker thread, and the
+    caller blocks until it finishes.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
 def get_stock_data(ticker, period="1y", interval="1d"):
-    """Enhanced data fetching with retry logic"""
-    for attempt in range(2):
+    """Single-ticker history through the yfinance provider (None when unavailable)"""
+    try:
+        return _run_blocking(default_provider(use_cache=False).fetch_history(ticker, period, interval))
+    except Exception as e:
+        print(f"Error fetching data for {ticker}: {e}")
+        return None
+
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+def _yfinance_download(tickers, period="1y", interval="1d", start=None):
+    """Bulk download OHLCV for several tickers in one call
+
+    yf.download() collects its results in module-global state, so concurrent
+    fetch workers take turns; each call still fetches its tickers in parallel
+    on yfinance's own threads.
+    """
+    with _YF_DOWNLOAD_LOCK:
+        data = yf.download(list(tickers), period=period, interval=interval, start=start, group_by='ticker',
+                           auto_adjust=True, actions=True, ignore_tz=False,
+                           threads=True, progress=False)
+    if not isinstance(data.columns, pd.MultiIndex):
+        # yfinance returns flat columns when a single ticker is requested
+        data = pd.concat({tickers[0]: data}, axis=1)
+    return data
+
+def fetch_bulk_data(tickers, period="1y", interval="1d", chunk_size=25,
+                    max_retries=3, backoff=1.0, provider=None, start=None):
+    """Chunked multi-ticker download, retrying only the tickers that came back empty
+
+    Returns a (ticker, field) MultiIndex frame and the list of tickers that
+    still had no data after all retries. When `start` is given the provider
+    is asked for the bars from that timestamp on instead of a whole period.
+    """
+    provider = provider or _yfinance_download
+    request = {'period': period, 'interval': interval}
+    if start is not None:
+        request['start'] = start
+    frames = []
+    pending = list(dict.fromkeys(tickers))
+    
+    for attempt in range(max_retries):
+        if not pending:
+            break
+        if attempt:
+            METRICS.count('retries', len(pending), source='bulk')
+            time.sleep(backoff * 2 ** (attempt - 1))  # Exponential backoff
+        
+        missing = []
+        for offset in range(0, len(pending), chunk_size):
+            chunk = pending[offset:offset + chunk_size]
+            try:
+                data = provider(chunk, **request)
+            except Exception as e:
+                METRICS.count('fetch_errors', source='bulk')
+                if attempt == max_retries - 1:
+                    print(f"Error fetching data for {', '.join(chunk)}: {e}")
+                missing.extend(chunk)
+                continue
+            
+            for ticker in chunk:
+                ticker_data = extract_ticker_data(data, ticker)
+                if ticker_data is None:
+                    METRICS.count('empty_frames', source='bulk')
+                    missing.append(ticker)
+                else:
+                    frames.append((ticker, ticker_data))
+        pending = missing
+    
+    if not frames:
+        return pd.DataFrame(), pending
+    
+    # Preserve the requested ticker order in the combined frame
+    order = {ticker: i for i, ticker in enumerate(tickers)}
+    frames.sort(key=lambda item: order[item[0]])
+    bulk_data = pd.concat(dict(frames), axis=1)
+    return bulk_data, pending
+
+def extract_ticker_data(bulk_data, ticker):
+    """Single-ticker OHLCV frame out of a bulk download (None when empty)"""
+    if bulk_data is None or bulk_data.empty:
+        return None
+    if ticker not in bulk_data.columns.get_level_values(0):
+        return None
+    df = bulk_data[ticker].dropna(how='all')
+    if df.empty or df['Close'].isna().all():
+        return None
+    return df
+
+# On-disk price cache: one memory-mappable .npy record array per ticker and interval
+CACHE_DIR = os.environ.get('STOCK_CACHE_DIR', '.price_cache')
+CACHE_TIMEZONE = 'America/New_York'
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+_CACHE_DTYPE = np.dtype([('timestamp', 'i8')] + [(field, 'f8') for field in PRICE_FIELDS])
+
+def _cache_path(ticker, interval):
+    return os.path.join(CACHE_DIR, interval, f"{ticker}.npy")
+
+def load_cached_history(ticker, interval="1d"):
+    """Cached OHLCV history for a ticker (None when nothing is cached)"""
+    path = _cache_path(ticker, interval)
+    if not os.path.exists(path):
+        return None
+    try:
+        records = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if len(records) == 0:
+        return None
+    index = pd.to_datetime(records['timestamp'], utc=True).tz_convert(CACHE_TIMEZONE)
+    return pd.DataFrame({field: np.asarray(records[field]) for field in PRICE_FIELDS}, index=index)
+
+def save_cached_history(ticker, interval, data):
+    """Atomically (re)write a ticker's cache file"""
+    index = data.index
+    if index.tz is None:
+        index = index.tz_localize(CACHE_TIMEZONE)
+    
+    records = np.empty(len(data), dtype=_CACHE_DTYPE)
+    records['timestamp'] = index.tz_convert('UTC').asi8
+    for field in PRICE_FIELDS:
+        records[field] = data[field].to_numpy(dtype='f8') if field in data else 0.0
+    
+    path = _cache_path(ticker, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, records)
+    os.replace(tmp_path, path)
+
+def _period_start(last_timestamp, period):
+    """First timestamp covered by a yfinance-style period ending at last_timestamp"""
+    if period in (None, 'max'):
+        return None
+    if period == 'ytd':
+        return last_timestamp.normalize().replace(month=1, day=1)
+    units = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return last_timestamp - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Unsupported period: {period}")
+
+def _adjustments_changed(cached, fresh):
+    """True when a fresh download disagrees with the cached overlap or carries new corporate actions"""
+    overlap = cached.index.intersection(fresh.index)
+    if len(overlap) == 0:
+        return True
+    
+    # Dividends and splits re-adjust the whole back history under auto_adjust
+    new_bars = fresh.loc[fresh.index > cached.index[-1]]
+    if (new_bars[['Dividends', 'Stock Splits']].fillna(0) != 0).any().any():
+        return True
+    
+    reference = overlap[0]
+    return not np.allclose(cached.loc[reference, ['Open', 'High', 'Low', 'Close']].to_numpy(dtype='f8'),
+                           fresh.loc[reference, ['Open', 'High', 'Low', 'Close']].to_numpy(dtype='f8'),
+                           rtol=1e-6, equal_nan=True)
+
+def update_price_cache(tickers, period="1y", interval="1d", provider=None, offline=False, **fetch_options):
+    """Bring the on-disk cache up to date and return the requested window
+
+    Only the bars from the second-to-last cached bar on are downloaded (the last
+    one may have been an unfinished session). A ticker whose overlapping bar no
+    longer matches, or which paid a dividend or split, is re-downloaded and
+    rewritten in full. Tickers whose refresh fails are served from the cache as
+    is, so the analyzer keeps working while the provider is flaky.
+    Returns the same (bulk frame, missing tickers) pair as fetch_bulk_data.
+    """
+    histories = {}
+    full_fetch = []
+    incremental = defaultdict(list)
+    
+    for ticker in dict.fromkeys(tickers):
+        cached = load_cached_history(ticker, interval)
+        if cached is None or len(cached) < 2:
+            full_fetch.append(ticker)
+            continue
+        histories[ticker] = cached
+        first_needed = _period_start(cached.index[-1], period)
+        if first_needed is not None and cached.index[0] > first_needed + pd.Timedelta(days=7):
+            full_fetch.append(ticker)  # Cache is shallower than the requested period
+        else:
+            incremental[cached.index[-2]].append(ticker)
+    
+    if not offline:
+        rewrite = []
+        for start, group in incremental.items():
+            fresh_data, _ = fetch_bulk_data(group, interval=interval, provider=provider,
+                                            start=start, **fetch_options)
+            for ticker in group:
+                fresh = extract_ticker_data(fresh_data, ticker)
+                if fresh is None:
+                    continue  # Keep serving the cached history
+                cached = histories[ticker]
+                if _adjustments_changed(cached, fresh):
+                    rewrite.append(ticker)
+                    continue
+                merged = pd.concat([cached.loc[cached.index < fresh.index[0]], fresh])
+                save_cached_history(ticker, interval, merged)
+                histories[ticker] = load_cached_history(ticker, interval)
+        
+        if full_fetch or rewrite:
+            fresh_data, _ = fetch_bulk_data(full_fetch + rewrite, period=period, interval=interval,
+                                            provider=provider, **fetch_options)
+            for ticker in full_fetch + rewrite:
+                fresh = extract_ticker_data(fresh_data, ticker)
+                if fresh is not None:
+                    save_cached_history(ticker, interval, fresh)
+                    histories[ticker] = load_cached_history(ticker, interval)
+    
+    frames = {}
+    for ticker in dict.fromkeys(tickers):
+        history = histories.get(ticker)
+        if history is None:
+            continue
+        first_needed = _period_start(history.index[-1], period)
+        frames[ticker] = history if first_needed is None else history.loc[history.index >= first_needed]
+    
+    missing = [ticker for ticker in dict.fromkeys(tickers) if ticker not in frames]
+    if not frames:
+        return pd.DataFrame(), missing
+    return pd.concat(frames, axis=1), missing
+
+# Async data providers: every backend serves fetch_history / fetch_many, so the
+# analyzer can run against yfinance, the on-disk cache or recorded snapshots
+class DataProvider:
+    """Async source of OHLCV history; subclasses implement fetch_history"""
+    
+    rate_limited = True  # Whether fetch_pipeline should throttle requests to this backend
+    
+    async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+        """OHLCV frame for one ticker (None when the backend has no data)"""
+        raise NotImplementedError
+    
+    async def fetch_many(self, tickers, period="1y", interval="1d", start=None, timeout=None, concurrency=8):
+        """Fetch tickers concurrently, each request bounded by `timeout` seconds
+
+        Returns the same (bulk frame, missing tickers) pair as fetch_bulk_data.
+        Cancelling the caller cancels every request still in flight.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def fetch_one(ticker):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    history = await asyncio.wait_for(self.fetch_history(ticker, period, interval, start), timeout)
+                    if history is None or history.empty:
+                        METRICS.count('empty_frames', source=type(self).__name__)
+                    return history
+                except asyncio.TimeoutError:
+                    METRICS.count('timeouts', source=type(self).__name__)
+                    print(f"⏱️  Timed out fetching {ticker}")
+                except Exception as e:
+                    METRICS.count('fetch_errors', source=type(self).__name__)
+                    print(f"Error fetching data for {ticker}: {e}")
+                finally:
+                    if METRICS.enabled:
+                        METRICS.record('fetch', time.perf_counter() - started)
+                return None
+        
+        tickers = list(dict.fromkeys(tickers))
+        histories = await asyncio.gather(*(fetch_one(ticker) for ticker in tickers))
+        frames = {ticker: history for ticker, history in zip(tickers, histories)
+                  if history is not None and not history.empty}
+        missing = [ticker for ticker in tickers if ticker not in frames]
+        if not frames:
+            return pd.DataFrame(), missing
+        return pd.concat(frames, axis=1), missing
+    
+    def fetch_chunk(self, tickers, period="1y", interval="1d", timeout=None):
+        """Blocking fetch_many (the fetch_pipeline workers), safe inside a running event loop too"""
+        return _run_blocking(self.fetch_many(tickers, period, interval, timeout=timeout))
+    
+    def download(self, tickers, period="1y", interval="1d", start=None, timeout=None):
+        """Bulk frame only, so a provider can stand in for the download function of fetch_bulk_data"""
+        return _run_blocking(self.fetch_many(tickers, period, interval, start=start, timeout=timeout))[0]
+    
+    def close(self):
+        """Release the provider's worker threads (no-op for backends without any)"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class YFinanceProvider(DataProvider):
+    """yfinance backend; the blocking HTTP calls run on the provider's own thread pool
+
+    Requests that time out are abandoned rather than interrupted, so they run
+    on a dedicated executor instead of the event loop's default one, which
+    asyncio.run() would wait for on shutdown.
+    """
+    
+    def __init__(self, max_retries=3, backoff=1.0, max_workers=8):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+        loop = asyncio.get_running_loop()
+        request = partial(_yfinance_download, [ticker], period=period, interval=interval, start=start)
+        
+        for attempt in range(self.max_retries):
+            if attempt:
+                METRICS.count('retries', source='YFinanceProvider')
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))  # Exponential backoff
+            try:
+                data = await loop.run_in_executor(self.executor, request)
+            except Exception:
+                if attempt == self.max_retries - 1:
+                    raise
+                continue
+            history = extract_ticker_data(data, ticker)
+            if history is not None:
+                return history
+        return None
+    
+    async def fetch_many(self, tickers, period="1y", interval="1d", start=None, timeout=None, concurrency=8):
+        """One bulk yf.download for the whole batch, retrying only the tickers that came back empty"""
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return pd.DataFrame(), []
+        request = partial(fetch_bulk_data, tickers, period, interval, chunk_size=len(tickers),
+                          max_retries=self.max_retries, backoff=self.backoff, start=start)
+        started = time.perf_counter()
         try:
-            stock = yf.Ticker(ticker)
-            df = stock.history(period=period, interval=interval)
-            if not df.empty:
-                return df
-            time.sleep(1)  # Brief pause between attempts
-        except Exception as e:
-            if attempt == 1:  # Last attempt
-                print(f"Error fetching data for {ticker}: {e}")
-            time.sleep(1)
-    return None
+            return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(self.executor, request), timeout)
+        except asyncio.TimeoutError:
+            METRICS.count('timeouts', source=type(self).__name__)
+            print(f"⏱️  Timed out fetching {', '.join(tickers)}")
+            return pd.DataFrame(), tickers
+        finally:
+            if METRICS.enabled:
+                METRICS.record('fetch', time.perf_counter() - started)
+    
+    def close(self):
+        # Abandoned (timed-out) requests are left to finish on their own
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class CacheProvider(DataProvider):
+    """On-disk price cache, topped up from an upstream provider unless offline
+
+    close() leaves the upstream running: callers may share it, and the
+    default one is process-wide. Pass owns_upstream=True to close it too.
+    """
+    
+    def __init__(self, upstream=None, offline=False, owns_upstream=False):
+        self.owns_upstream = owns_upstream
+        self.upstream = upstream or default_provider(use_cache=False)
+        self.offline = offline
+        self.rate_limited = not offline  # Offline reads never reach the network
+        self.executor = ThreadPoolExecutor(max_workers=4)
+    
+    async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+        bulk_data, _ = await self.fetch_many([ticker], period, interval, start)
+        return extract_ticker_data(bulk_data, ticker)
+    
+    async def fetch_many(self, tickers, period="1y", interval="1d", start=None, timeout=None, concurrency=8):
+        # The cache groups tickers into shared incremental requests, so the whole
+        # batch goes through update_price_cache; `timeout` bounds each upstream request
+        download = partial(self.upstream.download, timeout=timeout)
+        update = partial(update_price_cache, list(tickers), period, interval, provider=download,
+                         offline=self.offline, max_retries=1)
+        bulk_data, missing = await asyncio.get_running_loop().run_in_executor(self.executor, update)
+        if start is not None and not bulk_data.empty:
+            bulk_data = bulk_data.loc[bulk_data.index >= start]
+        return bulk_data, missing
+    
+    def close(self):
+        self.executor.shutdown()
+        if self.owns_upstream:
+            self.upstream.close()
+
+@lru_cache(maxsize=None)
+def default_provider(use_cache=True):
+    """Process-wide yfinance provider (behind the on-disk cache) for callers that don't pass one
+
+    Sharing it means repeated calls reuse one set of worker threads instead of
+    starting a new thread pool per call.
+    """
+    return CacheProvider() if use_cache else YFinanceProvider()
+
+class ReplayProvider(DataProvider):
+    """Serves recorded snapshots from <directory>/<interval>/<TICKER>.csv or .parquet
+
+    No network is involved, so the full pipeline can be tested and benchmarked
+    offline at disk speed. Snapshots are written by save_replay_snapshot.
+    """
+    
+    rate_limited = False
+    
+    def __init__(self, directory):
+        self.directory = directory
+    
+    def _read(self, ticker, interval):
+        path = os.path.join(self.directory, interval, ticker)
+        if os.path.exists(path + '.parquet'):
+            data = pd.read_parquet(path + '.parquet')
+        elif os.path.exists(path + '.csv'):
+            data = pd.read_csv(path + '.csv', index_col=0)
+        else:
+            return None
+        data.index = pd.to_datetime(data.index, utc=True).tz_convert(CACHE_TIMEZONE)
+        return data
+    
+    async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+        data = await asyncio.to_thread(self._read, ticker, interval)
+        if data is None or data.empty:
+            return None
+        if start is not None:
+            return data.loc[data.index >= start]
+        first_needed = _period_start(data.index[-1], period)
+        return data if first_needed is None else data.loc[data.index >= first_needed]
+
+def save_replay_snapshot(bulk_data, directory, interval="1d", fmt='csv'):
+    """Record every ticker of a bulk frame as a ReplayProvider snapshot (fmt 'csv' or 'parquet')"""
+    os.makedirs(os.path.join(directory, interval), exist_ok=True)
+    for ticker in dict.fromkeys(bulk_data.columns.get_level_values(0)):
+        data = extract_ticker_data(bulk_data, ticker)
+        if data is None:
+            continue
+        path = os.path.join(directory, interval, f"{ticker}.{fmt}")
+        if fmt == 'parquet':
+            data.to_parquet(path)
+        else:
+            data.to_csv(path)
+
+# Universe price panel: the whole universe's OHLCV in one [ticker x date x field]
+# .npy array plus an index sidecar. Readers memory-map it, so opening costs an
+# mmap rather than a parse, and every process shares the same page-cache pages.
+PANEL_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume', 'Stock Splits')
+
+def _panel_paths(interval="1d", directory=None):
+    directory = directory or CACHE_DIR
+    return (os.path.join(directory, f"panel_{interval}.npy"),
+            os.path.join(directory, f"panel_{interval}.index.npz"))
+
+def write_price_panel(bulk_data, tickers, interval="1d", directory=None, dtype='f8'):
+    """Write a bulk download as the [ticker x date x field] panel and return it opened
+
+    Dates are the union calendar (UTC nanoseconds in the sidecar); a ticker
+    without a bar on a date has NaN in every field. `dtype` 'f4' halves the
+    file at float32 precision. Both files are written aside and swapped in
+    with os.replace, so readers that have the previous panel mapped keep a
+    consistent view.
+    """
+    dates, present, arrays = build_price_matrix(bulk_data, tickers, PANEL_FIELDS, align='dates')
+    panel_path, index_path = _panel_paths(interval, directory)
+    os.makedirs(os.path.dirname(panel_path) or '.', exist_ok=True)
+    
+    values = np.lib.format.open_memmap(panel_path + '.tmp', mode='w+', dtype=dtype,
+                                       shape=(len(present), len(dates), len(PANEL_FIELDS)))
+    for k, field in enumerate(PANEL_FIELDS):
+        values[:, :, k] = arrays[field].T
+    values.flush()
+    del values
+    if len(dates) and dates.tz is None:
+        dates = dates.tz_localize(CACHE_TIMEZONE)
+    timestamps = dates.tz_convert('UTC').asi8 if len(dates) else np.empty(0, dtype='i8')
+    with open(index_path + '.tmp', 'wb') as f:
+        np.savez(f, tickers=np.array(present, dtype=str), dates=timestamps, fields=np.array(PANEL_FIELDS),
+                 interval=np.array(interval))
+    os.replace(index_path + '.tmp', index_path)
+    os.replace(panel_path + '.tmp', panel_path)
+    return PricePanel.open(interval, directory)
+
+class PricePanel:
+    """Read-only memory map of a panel written by write_price_panel
 
-def calculate_rsi(data, periods=14):
+    `values` is the [ticker x date x field] array. Selections are views of
+    the map where possible: prices() hands out the (dates x tickers) field
+    matrices build_price_matrix would build, and build_price_matrix accepts
+    a panel in place of a bulk frame. Resident memory does not grow with the
+    number of processes reading the same panel.
+    """
+    
+    def __init__(self, values, tickers, dates, fields, interval="1d"):
+        self.values = values
+        self.tickers = list(tickers)
+        self.dates = dates
+        self.fields = list(fields)
+        self.interval = interval
+        self.positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+    
+    @classmethod
+    def open(cls, interval="1d", directory=None):
+        """Map the panel; FileNotFoundError when it has not been built"""
+        panel_path, index_path = _panel_paths(interval, directory)
+        for attempt in range(3):
+            with np.load(index_path) as index:
+                tickers, dates, fields = index['tickers'].tolist(), index['dates'], index['fields'].tolist()
+            values = np.load(panel_path, mmap_mode='r')
+            if values.shape == (len(tickers), len(dates), len(fields)):
+                return cls(values, tickers, dates, fields, interval)
+            time.sleep(0.1)  # Opened between the two os.replace calls of a rewrite
+        raise ValueError(f"Price panel {panel_path} does not match its index")
+    
+    @property
+    def empty(self):
+        return not self.tickers or not len(self.dates)
+    
+    @property
+    def index(self):
+        return pd.to_datetime(self.dates, utc=True).tz_convert(CACHE_TIMEZONE)
+    
+    def since(self, period=None, start=None):
+        """The panel restricted to `period` before its last date (or from `start`), still mapped"""
+        if start is None and not self.empty:
+            start = _period_start(pd.Timestamp(self.dates[-1], tz='UTC'), period)
+        if start is None:
+            return self
+        first = np.searchsorted(self.dates, pd.Timestamp(start).tz_convert('UTC').value)
+        return PricePanel(self.values[:, first:], self.tickers, self.dates[first:], self.fields, self.interval)
+    
+    def frame(self, ticker, period=None, start=None):
+        """One ticker's OHLCV frame (None when it has no closes), trimmed like ReplayProvider"""
+        position = self.positions.get(ticker)
+        if position is None:
+            return None
+        data = pd.DataFrame(self.values[position], index=self.index, columns=self.fields).dropna(how='all')
+        if data.empty or data['Close'].isna().all():
+            return None
+        if start is not None:
+            return data.loc[data.index >= start]
+        first_needed = _period_start(data.index[-1], period)
+        return data if first_needed is None else data.loc[data.index >= first_needed]
+    
+    def prices(self, tickers, fields=PANEL_FIELDS, align='dates'):
+        """(row index, tickers present, {field: (rows x tickers) array}) as build_price_matrix returns"""
+        close = self.fields.index('Close')
+        positions = [self.positions[ticker] for ticker in dict.fromkeys(tickers) if ticker in self.positions]
+        positions = [i for i in positions if not np.isnan(self.values[i, :, close]).all()]
+        present = [self.tickers[i] for i in positions]
+        if not present:
+            return pd.Index([]), present, {field: np.empty((0, 0)) for field in fields}
+        
+        if positions == list(range(positions[0], positions[-1] + 1)):
+            block = self.values[positions[0]:positions[-1] + 1]  # Contiguous tickers: a view of the map
+        else:
+            block = self.values[positions]
+        has_bar = ~np.isnan(block).all(axis=2)
+        
+        if align == 'dates':
+            dates = has_bar.any(axis=0)
+            index = self.index
+            if not dates.all():
+                block, index = block[:, dates], index[dates]
+            # Fields an older panel lacks come back all-NaN, as for frames without them
+            return index, present, {field: block[:, :, self.fields.index(field)].T if field in self.fields
+                                    else np.full((len(index), len(present)), np.nan) for field in fields}
+        
+        n_rows = int(has_bar.sum(axis=1).max())
+        arrays = {}
+        for field in fields:
+            values = np.full((n_rows, len(present)), np.nan)
+            if field in self.fields:
+                for j, bars in enumerate(has_bar):
+                    column = block[j, bars, self.fields.index(field)]
+                    values[n_rows - len(column):, j] = column
+            arrays[field] = values
+        return pd.RangeIndex(1 - n_rows, 1), present, arrays
+
+class PanelProvider(DataProvider):
+    """Serves histories out of a memory-mapped PricePanel: no parsing, no network"""
+    
+    rate_limited = False
+    
+    def __init__(self, panel):
+        self.panel = panel
+    
+    async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+        if interval != self.panel.interval:
+            return None
+        return self.panel.frame(ticker, period, start)
+
+def build_panel(stock_list, period="10y", interval="1d", provider=None, dtype='f8', workers=4, rate_limit=10.0):
+    """Fetch (incrementally, through the price cache) `period` of history and rewrite the panel"""
+    provider = provider or default_provider()
+    started = time.perf_counter()
+    bulk_data = fetch_universe(stock_list, provider, period, interval, workers=workers, rate_limit=rate_limit)
+    if bulk_data.empty:
+        print("❌ No data")
+        return None
+    panel = write_price_panel(bulk_data, stock_list, interval, dtype=dtype)
+    size = panel.values.nbytes / 1e6
+    print(f"🗄️  Price panel: {len(panel.tickers)} tickers x {len(panel.dates)} dates x {len(panel.fields)} fields "
+          f"({size:.1f} MB) written to {_panel_paths(interval)[0]} in {time.perf_counter() - started:.1f}s")
+    return panel
+
+# Tail-only evaluation: the signals only read the last one or two values of each
+# indicator, so the tail_only variants below work on the shortest trailing window
+# that reproduces those values instead of the whole history.
+_EWM_WARMUP_BARS = 400  # (1 - 2/27) ** 400 ~ 4e-14, far below price precision
+
+def _ewm_weights(n, span):
+    """(n x n) matrix whose row t reproduces ewm(span=span).mean() at bar t of a gap-free series"""
+    decay = 1 - 2 / (span + 1)
+    lags = np.subtract.outer(np.arange(n), np.arange(n))
+    weights = np.where(lags >= 0, decay ** np.maximum(lags, 0), 0.0)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+@lru_cache(maxsize=8)
+def _macd_tail_weights(n, fast, slow, signal):
+    """Weights turning the last n closes into the MACD and signal line of the last two bars"""
+    macd_weights = _ewm_weights(n, fast) - _ewm_weights(n, slow)
+    signal_weights = _ewm_weights(n, signal)[-2:] @ macd_weights
+    return macd_weights[-2:], signal_weights
+
+def calculate_moving_average(data, window, tail_only=False):
+    """Simple moving average of Close"""
+    if tail_only:
+        # Only the last two values, straight from the trailing window+1 closes
+        closes = data['Close'].to_numpy(dtype='f8')[-(window + 1):]
+        windows = np.lib.stride_tricks.sliding_window_view(_tail_rows(closes, window + 1), window)
+        return pd.Series(windows.mean(axis=-1)[-len(closes):], index=data.index[-len(closes):][-2:])
+    return data['Close'].rolling(window=window).mean()
+
+def calculate_rsi(data, periods=14, tail_only=False):
     """RSI calculation"""
+    if tail_only:
+        # Only the last two values, from the trailing periods+2 closes
+        closes = data['Close'].to_numpy(dtype='f8')[-(periods + 2):]
+        delta = np.diff(closes, prepend=np.nan)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        gain_windows = np.lib.stride_tricks.sliding_window_view(_tail_rows(gain, periods + 1), periods)
+        loss_windows = np.lib.stride_tricks.sliding_window_view(_tail_rows(loss, periods + 1), periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = gain_windows.mean(axis=-1) / loss_windows.mean(axis=-1)
+            rsi = 100 - (100 / (1 + rs))
+        count = min(2, len(closes))
+        return pd.Series(rsi[-count:], index=data.index[-count:])
+    
     delta = data['Close'].diff()
     gain = (delta.where(delta > 0, 0))
     loss = (-delta.where(delta < 0, 0))
@@ -140,49 +964,68 @@ def calculate_rsi(data, periods=14):
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
-def calculate_macd(data, fast=12, slow=26, signal=9):
+def calculate_macd(data, fast=12, slow=26, signal=9, tail_only=False):
     """MACD calculation with crossover detection"""
     try:
-        ema_fast = data['Close'].ewm(span=fast).mean()
-        ema_slow = data['Close'].ewm(span=slow).mean()
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal).mean()
-        histogram = macd_line - signal_line
+        closes = data['Close']
+        if tail_only and len(closes) >= 2 and not closes.isna().any():
+            # Last two MACD/signal values as dot products over the EWM warm-up window
+            values = closes.to_numpy(dtype='f8')[-_EWM_WARMUP_BARS:]
+            macd_weights, signal_weights = _macd_tail_weights(len(values), fast, slow, signal)
+            macd_prev, macd_now = macd_weights @ values
+            signal_prev, signal_now = signal_weights @ values
+        else:
+            ema_fast = closes.ewm(span=fast).mean()
+            ema_slow = closes.ewm(span=slow).mean()
+            macd_line = ema_fast - ema_slow
+            signal_line = macd_line.ewm(span=signal).mean()
+            macd_now, signal_now = macd_line.iloc[-1], signal_line.iloc[-1]
+            # A single bar has MACD == signal == 0, so no crossover needs the previous bar
+            macd_prev = macd_line.iloc[-2] if len(macd_line) > 1 else np.nan
+            signal_prev = signal_line.iloc[-2] if len(signal_line) > 1 else np.nan
+        histogram = macd_now - signal_now
         
         return {
-            'macd': macd_line.iloc[-1],
-            'signal': signal_line.iloc[-1],
-            'histogram': histogram.iloc[-1],
-            'bullish_crossover': (macd_line.iloc[-1] > signal_line.iloc[-1] and 
-                                macd_line.iloc[-2] <= signal_line.iloc[-2]),
-            'bearish_crossover': (macd_line.iloc[-1] < signal_line.iloc[-1] and 
-                                macd_line.iloc[-2] >= signal_line.iloc[-2]),
-            'above_zero': macd_line.iloc[-1] > 0,
-            'momentum_strength': abs(histogram.iloc[-1])
+            'macd': macd_now,
+            'signal': signal_now,
+            'histogram': histogram,
+            'bullish_crossover': (macd_now > signal_now and macd_prev <= signal_prev),
+            'bearish_crossover': (macd_now < signal_now and macd_prev >= signal_prev),
+            'above_zero': macd_now > 0,
+            'momentum_strength': abs(histogram)
         }
     except:
+        METRICS.count('swallowed_exceptions', function='calculate_macd')
         return None
 
-def calculate_bollinger_bands(data, window=20, std_dev=2):
+def calculate_bollinger_bands(data, window=20, std_dev=2, tail_only=False):
     """Bollinger Bands with squeeze detection"""
     try:
-        rolling_mean = data['Close'].rolling(window=window).mean()
-        rolling_std = data['Close'].rolling(window=window).std()
+        if tail_only:
+            # Only the 50 trailing windows the squeeze average needs
+            closes = data['Close'].to_numpy(dtype='f8')
+            windows = np.lib.stride_tricks.sliding_window_view(_tail_rows(closes, window + 49), window)
+            rolling_mean = windows.mean(axis=-1)
+            rolling_std = windows.std(axis=-1, ddof=1)
+        else:
+            rolling_mean = data['Close'].rolling(window=window).mean().to_numpy()
+            rolling_std = data['Close'].rolling(window=window).std().to_numpy()
         upper_band = rolling_mean + (rolling_std * std_dev)
         lower_band = rolling_mean - (rolling_std * std_dev)
         
         current_price = data['Close'].iloc[-1]
-        bb_position = (current_price - lower_band.iloc[-1]) / (upper_band.iloc[-1] - lower_band.iloc[-1])
+        bb_position = (current_price - lower_band[-1]) / (upper_band[-1] - lower_band[-1])
         
         # Bollinger Band squeeze detection
-        band_width = (upper_band.iloc[-1] - lower_band.iloc[-1]) / rolling_mean.iloc[-1]
-        avg_band_width = ((upper_band - lower_band) / rolling_mean).rolling(50).mean().iloc[-1]
+        band_width = (upper_band[-1] - lower_band[-1]) / rolling_mean[-1]
+        recent_widths = ((upper_band - lower_band) / rolling_mean)[-50:]
+        avg_band_width = recent_widths.mean() if len(recent_widths) == 50 else np.nan
         squeeze = band_width < avg_band_width * 0.8
         
         return {
-            'upper': upper_band.iloc[-1],
-            'middle': rolling_mean.iloc[-1],
-            'lower': lower_band.iloc[-1],
+            'upper': upper_band[-1],
+            'middle': rolling_mean[-1],
+            'lower': lower_band[-1],
             'position': bb_position,
             'oversold': bb_position < 0.1,      # Very oversold
             'approaching_oversold': bb_position < 0.25,  # Approaching oversold
@@ -192,6 +1035,7 @@ def calculate_bollinger_bands(data, window=20, std_dev=2):
             'band_width': band_width
         }
     except:
+        METRICS.count('swallowed_exceptions', function='calculate_bollinger_bands')
         return None
 
 def find_support_resistance(data, window=50):
@@ -228,6 +1072,7 @@ def find_support_resistance(data, window=50):
             'price_position': (current_price - support_1) / (resistance_1 - support_1)
         }
     except:
+        METRICS.count('swallowed_exceptions', function='find_support_resistance')
         return None
 
 def analyze_volume(data):
@@ -259,6 +1104,7 @@ def analyze_volume(data):
             'increasing_volume': volume_trend > 1.2
         }
     except:
+        METRICS.count('swallowed_exceptions', function='analyze_volume')
         return None
 
 def check_golden_cross(data):
@@ -290,383 +1136,3573 @@ def check_golden_cross(data):
             return "MINI DEATH"
         return None
     except:
+        METRICS.count('swallowed_exceptions', function='check_golden_cross')
         return None
 
-def calculate_momentum_indicators(data):
+def calculate_momentum_indicators(data, tail_only=False):
     """Multiple momentum indicators"""
     try:
-        closes = data['Close']
-        
-        # Rate of Change (ROC)
-        roc_10 = ((closes.iloc[-1] - closes.iloc[-11]) / closes.iloc[-11]) * 100
-        roc_20 = ((closes.iloc[-1] - closes.iloc[-21]) / closes.iloc[-21]) * 100
+        if tail_only:
+            # The ROC-20 reference bar and the last 14-bar stochastic window
+            closes = data['Close'].to_numpy(dtype='f8')[-21:]
+            roc_10 = ((closes[-1] - closes[-11]) / closes[-11]) * 100
+            roc_20 = ((closes[-1] - closes[-21]) / closes[-21]) * 100
+            low_14 = data['Low'].to_numpy(dtype='f8')[-14:].min()
+            high_14 = data['High'].to_numpy(dtype='f8')[-14:].max()
+        else:
+            closes = data['Close']
+            
+            # Rate of Change (ROC)
+            roc_10 = ((closes.iloc[-1] - closes.iloc[-11]) / closes.iloc[-11]) * 100
+            roc_20 = ((closes.iloc[-1] - closes.iloc[-21]) / closes.iloc[-21]) * 100
+            
+            low_14 = data['Low'].rolling(14).min().iloc[-1]
+            high_14 = data['High'].rolling(14).max().iloc[-1]
+        current_price = data['Close'].iloc[-1]
         
         # Stochastic %K
-        low_14 = data['Low'].rolling(14).min()
-        high_14 = data['High'].rolling(14).max()
-        stoch_k = ((closes - low_14) / (high_14 - low_14)) * 100
+        stoch_k = ((current_price - low_14) / (high_14 - low_14)) * 100
         
         # Williams %R
-        williams_r = ((high_14.iloc[-1] - closes.iloc[-1]) / (high_14.iloc[-1] - low_14.iloc[-1])) * -100
+        williams_r = ((high_14 - current_price) / (high_14 - low_14)) * -100
         
         return {
             'roc_10': roc_10,
             'roc_20': roc_20,
-            'stoch_k': stoch_k.iloc[-1],
+            'stoch_k': stoch_k,
             'williams_r': williams_r,
             'momentum_bullish': roc_10 > 5 and roc_20 > 10,
             'momentum_bearish': roc_10 < -5 and roc_20 < -10,
-            'stoch_oversold': stoch_k.iloc[-1] < 20,
-            'stoch_overbought': stoch_k.iloc[-1] > 80
+            'stoch_oversold': stoch_k < 20,
+            'stoch_overbought': stoch_k > 80
         }
     except:
+        METRICS.count('swallowed_exceptions', function='calculate_momentum_indicators')
         return None
 
-def analyze_stocks(stock_list):
-    """Ultimate stock analysis with all indicators"""
-    results = []
-    total_stocks = len(stock_list)
-    
-    print(f"\n🚀 ULTIMATE STOCK ANALYZER")
-    print(f"📊 Analyzing {total_stocks} NASDAQ-100 stocks with advanced indicators...")
-    print("🔍 Indicators: RSI, MACD, Bollinger Bands, Support/Resistance, Volume, Momentum")
-    print("=" * 80)
-    
-    for i, ticker in enumerate(stock_list, 1):
-        try:
-            company_name = COMPANY_NAMES.get(ticker, 'Unknown Company')
-            print(f"[{i:3d}/{total_stocks}] {ticker:5s} - {company_name[:35]:35s} ", end='')
-            
-            stock_data = get_stock_data(ticker)
-            
-            if stock_data is not None and not stock_data.empty:
-                # Calculate all technical indicators
-                stock_data['RSI'] = calculate_rsi(stock_data)
-                stock_data['MA20'] = stock_data['Close'].rolling(window=20).mean()
-                stock_data['MA50'] = stock_data['Close'].rolling(window=50).mean()
-                stock_data['MA200'] = stock_data['Close'].rolling(window=200).mean()
-                
-                current_rsi = stock_data['RSI'].iloc[-1]
-                current_price = stock_data['Close'].iloc[-1]
-                
-                # Advanced indicators
-                macd_data = calculate_macd(stock_data)
-                bb_data = calculate_bollinger_bands(stock_data)
-                sr_data = find_support_resistance(stock_data)
-                volume_data = analyze_volume(stock_data)
-                momentum_data = calculate_momentum_indicators(stock_data)
-                
-                # ULTIMATE SCORING SYSTEM
-                score = 0
-                signals = []
-                buy_signals = 0
-                sell_signals = 0
-                confidence = 0  # Confidence multiplier
-                
-                # RSI Analysis (Enhanced)
-                if current_rsi < 25:
-                    score += 6
-                    buy_signals += 1
-                    confidence += 2
-                    signals.append(f"🟢 EXTREMELY OVERSOLD: RSI {current_rsi:.1f} - Rare Opportunity")
-                elif current_rsi < 30:
-                    score += 4
-                    buy_signals += 1
-                    confidence += 1
-                    signals.append(f"🟢 OVERSOLD: RSI {current_rsi:.1f} - Strong Buy Zone")
-                elif current_rsi < 40:
-                    score += 2
-                    buy_signals += 1
-                    signals.append(f"🟡 APPROACHING OVERSOLD: RSI {current_rsi:.1f}")
-                elif current_rsi > 80:
-                    score -= 5
-                    sell_signals += 1
-                    signals.append(f"🔴 EXTREMELY OVERBOUGHT: RSI {current_rsi:.1f} - Danger Zone")
-                elif current_rsi > 70:
-                    score -= 3
-                    sell_signals += 1
-                    signals.append(f"🔴 OVERBOUGHT: RSI {current_rsi:.1f} - Avoid")
-                
-                # MACD Analysis (Advanced)
-                if macd_data:
-                    if macd_data['bullish_crossover']:
-                        score += 4
-                        buy_signals += 1
-                        confidence += 1
-                        signals.append("🟢 MACD BULLISH CROSSOVER - Momentum Turning Up")
-                    elif macd_data['macd'] > macd_data['signal'] and macd_data['above_zero']:
-                        score += 2
-                        buy_signals += 1
-                        signals.append("🟡 MACD Strong Positive - Above Zero Line")
-                    elif macd_data['bearish_crossover']:
-                        score -= 3
-                        sell_signals += 1
-                        signals.append("🔴 MACD BEARISH CROSSOVER - Momentum Turning Down")
-                
-                # Bollinger Bands Analysis (Advanced)
-                if bb_data:
-                    if bb_data['oversold']:
-                        score += 5
-                        buy_signals += 1
-                        confidence += 1
-                        signals.append(f"🟢 BOLLINGER EXTREME OVERSOLD - Position {bb_data['position']:.2f}")
-                    elif bb_data['approaching_oversold']:
-                        score += 3
-                        buy_signals += 1
-                        signals.append(f"🟡 BOLLINGER OVERSOLD - Position {bb_data['position']:.2f}")
-                    elif bb_data['overbought']:
-                        score -= 4
-                        sell_signals += 1
-                        signals.append(f"🔴 BOLLINGER EXTREME OVERBOUGHT - Position {bb_data['position']:.2f}")
-                    
-                    if bb_data['squeeze']:
-                        score += 2
-                        confidence += 1
-                        signals.append("⚡ BOLLINGER SQUEEZE - Breakout Imminent")
-                
-                # Support/Resistance Analysis (Advanced)
-                if sr_data:
-                    if sr_data['near_support'] and sr_data['price_position'] < 0.3:
-                        score += 4
-                        buy_signals += 1
-                        confidence += 1
-                        signals.append(f"🟢 STRONG SUPPORT - ${sr_data['support_1']:.2f} ({sr_data['support_strength']:.1%})")
-                    elif sr_data['near_support']:
-                        score += 2
-                        buy_signals += 1
-                        signals.append(f"🟡 NEAR SUPPORT - ${sr_data['support_1']:.2f}")
-                    elif sr_data['near_resistance']:
-                        score -= 2
-                        sell_signals += 1
-                        signals.append(f"🔴 NEAR RESISTANCE - ${sr_data['resistance_1']:.2f}")
-                
-                # Moving Average Analysis (Enhanced)
-                ma20 = stock_data['MA20'].iloc[-1]
-                ma50 = stock_data['MA50'].iloc[-1]
-                ma200 = stock_data['MA200'].iloc[-1]
-                
-                if current_price > ma20 > ma50 > ma200:
-                    score += 4
-                    buy_signals += 1
-                    confidence += 1
-                    signals.append("🟢 PERFECT BULLISH ALIGNMENT - All MAs Ascending")
-                elif ma50 > ma200:
-                    score += 2
-                    buy_signals += 1
-                    signals.append("🟡 BULLISH TREND - 50 MA above 200 MA")
-                elif ma50 < ma200:
-                    score -= 2
-                    sell_signals += 1
-                    signals.append("🔴 BEARISH TREND - 50 MA below 200 MA")
-                
-                # Golden/Death Cross Analysis (Enhanced)
-                cross = check_golden_cross(stock_data)
-                if cross == "GOLDEN CROSS":
-                    score += 6
-                    buy_signals += 1
-                    confidence += 2
-                    signals.append("🌟 GOLDEN CROSS - Major Bullish Breakout!")
-                elif cross == "MINI GOLDEN":
-                    score += 3
-                    buy_signals += 1
-                    signals.append("⭐ MINI GOLDEN CROSS - Short-term Bullish")
-                elif cross == "DEATH CROSS":
-                    score -= 6
-                    sell_signals += 1
-                    signals.append("💀 DEATH CROSS - Major Bearish Signal")
-                elif cross == "MINI DEATH":
-                    score -= 3
-                    sell_signals += 1
-                    signals.append("☠️ MINI DEATH CROSS - Short-term Bearish")
-                
-                # Volume Analysis (Advanced)
-                if volume_data:
-                    if volume_data['very_high_volume'] and buy_signals > sell_signals:
-                        score += 4
-                        confidence += 1
-                        signals.append(f"📈 EXPLOSIVE VOLUME - {volume_data['volume_ratio_20']:.1f}x Average")
-                    elif volume_data['high_volume'] and buy_signals > sell_signals:
-                        score += 2
-                        signals.append(f"📊 HIGH VOLUME CONFIRMATION - {volume_data['volume_ratio_20']:.1f}x")
-                    elif volume_data['increasing_volume']:
-                        score += 1
-                        signals.append("📈 INCREASING VOLUME TREND")
-                
-                # Momentum Analysis (Advanced)
-                if momentum_data:
-                    if momentum_data['momentum_bullish']:
-                        score += 3
-                        buy_signals += 1
-                        signals.append(f"🚀 STRONG MOMENTUM - ROC: {momentum_data['roc_20']:.1f}%")
-                    elif momentum_data['momentum_bearish']:
-                        score -= 3
-                        sell_signals += 1
-                        signals.append(f"📉 WEAK MOMENTUM - ROC: {momentum_data['roc_20']:.1f}%")
-                    
-                    if momentum_data['stoch_oversold']:
-                        score += 2
-                        buy_signals += 1
-                        signals.append(f"🟢 STOCHASTIC OVERSOLD - {momentum_data['stoch_k']:.1f}")
-                
-                # Confidence multiplier (for high-conviction plays)
-                if confidence >= 3:
-                    score = int(score * 1.2)  # 20% bonus for high confidence
-                    signals.append(f"⭐ HIGH CONFIDENCE SIGNAL - {confidence} confirmations")
-                
-                # Quality filter - only include high-quality signals
-                signal_quality = buy_signals - sell_signals
-                if signals and (signal_quality > 0 or score >= 8):
-                    results.append({
-                        'ticker': ticker,
-                        'company_name': company_name,
-                        'price': current_price,
-                        'rsi': current_rsi,
-                        'ma20': ma20,
-                        'ma50': ma50,
-                        'ma200': ma200,
-                        'score': score,
-                        'buy_signals': buy_signals,
-                        'sell_signals': sell_signals,
-                        'confidence': confidence,
-                        'signal_quality': signal_quality,
-                        'signals': signals,
-                        'macd_data': macd_data,
-                        'bb_data': bb_data,
-                        'sr_data': sr_data,
-                        'volume_data': volume_data,
-                        'momentum_data': momentum_data
-                    })
-                    print("🎯 OPPORTUNITY DETECTED!")
-                else:
-                    print("⚪ No clear signal")
-            else:
-                print("❌ No data")
-                
-        except Exception as e:
-            print(f"❌ Error: {str(e)[:30]}...")
-            continue
-    
-    return results
+# Cross-sectional indicator engine: every indicator computed column-wise over
+# aligned (dates x tickers) arrays, returning one row per ticker with the same
+# fields the per-ticker functions above return.
+INDICATOR_GROUPS = {
+    'macd_data': ['macd', 'signal', 'histogram', 'bullish_crossover', 'bearish_crossover',
+                  'above_zero', 'momentum_strength'],
+    'bb_data': ['upper', 'middle', 'lower', 'position', 'oversold', 'approaching_oversold',
+                'overbought', 'approaching_overbought', 'squeeze', 'band_width'],
+    'sr_data': ['resistance_1', 'resistance_2', 'support_1', 'support_2', 'near_resistance',
+                'near_support', 'support_strength', 'resistance_strength', 'price_position'],
+    'volume_data': ['current_volume', 'avg_volume_20', 'avg_volume_50', 'volume_ratio_20',
+                    'volume_ratio_50', 'high_volume', 'very_high_volume', 'volume_trend',
+                    'increasing_volume'],
+    'momentum_data': ['roc_10', 'roc_20', 'stoch_k', 'williams_r', 'momentum_bullish',
+                      'momentum_bearish', 'stoch_oversold', 'stoch_overbought'],
+}
 
-def send_ultimate_email(opportunities):
-    """Send comprehensive email with detailed analysis"""
-    try:
-        yag = yagmail.SMTP(EMAIL_ADDRESS, EMAIL_PASSWORD)
+# Bars a ticker needs before each group stops raising in the per-ticker functions
+_GROUP_MIN_BARS = {'macd_data': 1, 'bb_data': 1, 'sr_data': 1, 'volume_data': 1, 'momentum_data': 21}
+
+# Validation stage: one vectorized pass per batch over the (bars x tickers) price
+# arrays before any indicator math. Each ticker gets a bitmask of the indicators
+# its data supports, and compute_indicator_table masks by bit instead of
+# guarding every calculation.
+ELIGIBILITY_BITS = {name: 1 << bit for bit, name in enumerate(
+    ('rsi', 'ma20', 'ma50', 'ma200', 'cross', 'macd_data', 'bb_data', 'sr_data', 'volume_data', 'momentum_data'))}
+INDICATOR_MIN_BARS = {'rsi': 15, 'ma20': 20, 'ma50': 50, 'ma200': 200, 'cross': 2, **_GROUP_MIN_BARS}
+MAX_GAP_BARS = 3  # Longer runs of missing closes are left missing (masked) rather than filled
+SPLIT_RATIOS = (2, 3, 4, 5, 8, 10, 20)
+SPLIT_TOLERANCE = 0.05
+VALIDATION_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume', 'Stock Splits')
+
+def indicator_eligibility(n_obs, volume=None):
+    """ELIGIBILITY_BITS mask per ticker from its bar count (and recent volume)
+
+    With (bars x tickers) bar counts the mask is per bar, each bar judged on
+    the history up to it.
+    """
+    eligible = np.zeros(np.shape(n_obs), dtype=np.uint16)
+    for name, bit in ELIGIBILITY_BITS.items():
+        eligible[n_obs >= INDICATOR_MIN_BARS[name]] |= bit
+    if volume is not None and len(volume):
+        # Twenty sessions without volume leave every volume ratio undefined
+        traded = volume > 0
+        if np.ndim(n_obs) == 2:
+            dead_volume = _rolling(traded.astype('f8'), 20, 'sum', min_periods=1) == 0
+        else:
+            dead_volume = ~traded[-20:].any(axis=0)
+        eligible[dead_volume] &= ~np.uint16(ELIGIBILITY_BITS['volume_data'])
+    return eligible
+
+def validate_prices(prices, max_gap=MAX_GAP_BARS, history=False):
+    """Validate and repair a batch's (bars x tickers) OHLCV arrays in one vectorized pass
+
+    Non-positive prices count as missing. Runs of up to `max_gap` missing
+    closes between two valid ones are forward-filled from the earlier close,
+    in the price fields that are missing (volume stays missing). A ticker
+    whose last close is missing is masked rather than filled. A day-over-day
+    close ratio within 5% of a whole split ratio (2:1 ... 20:1, or reversed)
+    is back-adjusted only when the 'Stock Splits' field records that split on
+    the day; an unexplained split-like jump masks the ticker instead. Each
+    repair only runs when some column needs it, so clean batches take the
+    fast path. Returns (prices, eligible), where eligible is the per-ticker
+    ELIGIBILITY_BITS mask, or with `history` the per-bar mask for
+    compute_indicator_history.
+    """
+    prices = dict(prices)
+    price_fields = [field for field in ('Open', 'High', 'Low', 'Close') if field in prices]
+    close = prices['Close']
+    n_rows, n_cols = close.shape
+    
+    with METRICS.timer('validation'), np.errstate(invalid='ignore', divide='ignore'):
+        invalid = np.zeros(close.shape, dtype=bool)
+        for field in price_fields:
+            invalid |= prices[field] <= 0
+        if invalid.any():
+            METRICS.count('invalid_prices', int(invalid.sum()))
+            for field in price_fields:
+                prices[field] = np.where(invalid, np.nan, prices[field])
         
-        email_body = [
-            f"🚀 ULTIMATE NASDAQ-100 STOCK ANALYSIS",
-            f"📅 {datetime.now().strftime('%A, %B %d, %Y at %I:%M %p EST')}",
-            f"🎯 Advanced Multi-Indicator Analysis\n",
-            f"🏆 TOP {len(opportunities)} ULTIMATE OPPORTUNITIES:\n"
-        ]
+        missing = np.isnan(prices['Close'])
+        rows = np.arange(n_rows)[:, None]
+        last_valid = np.maximum.accumulate(np.where(missing, -1, rows), axis=0)
+        dirty = np.flatnonzero((missing & (last_valid >= 0)).any(axis=0))
+        if len(dirty):
+            # Length of the missing run each cell sits in, from the valid closes around it
+            last_valid = last_valid[:, dirty]
+            next_valid = np.minimum.accumulate(np.where(missing[:, dirty], n_rows, rows)[::-1], axis=0)[::-1]
+            fill = (missing[:, dirty] & (last_valid >= 0) & (next_valid < n_rows)
+                    & (next_valid - last_valid - 1 <= max_gap))
+            if fill.any():
+                METRICS.count('filled_bars', int(fill.sum()))
+                filled_close = np.take_along_axis(prices['Close'][:, dirty], np.maximum(last_valid, 0), axis=0)
+                for field in price_fields:
+                    prices[field] = prices[field].copy()
+                    values = prices[field][:, dirty]
+                    prices[field][:, dirty] = np.where(fill & np.isnan(values), filled_close, values)
         
-        for idx, stock in enumerate(opportunities[:15], 1):  # Top 15
-            confidence_stars = "⭐" * min(stock['confidence'], 5)
-            
-            stock_info = [
-                f"\n{idx}. {stock['ticker']} - {stock['company_name']}",
-                f"💰 Price: ${stock['price']:.2f}",
-                f"🎯 Ultimate Score: {stock['score']} {confidence_stars}",
-                f"📊 Signal Quality: {stock['buy_signals']} buy vs {stock['sell_signals']} sell",
-                f"📈 RSI: {stock['rsi']:.1f}",
-                f"🔍 Key Signals:"
-            ]
-            
-            # Show top 5 signals
-            for signal in stock['signals'][:5]:
-                stock_info.append(f"   • {signal}")
-            
-            if len(stock['signals']) > 5:
-                stock_info.append(f"   • ... and {len(stock['signals']) - 5} more signals")
-            
-            stock_info.append("─" * 60)
-            email_body.extend(stock_info)
-        
-        email_body.extend([
-            "\n" + "="*60,
-            "🧠 ULTIMATE ANALYSIS FEATURES:",
-            "• Multi-timeframe RSI analysis (extreme levels)",
-            "• Advanced MACD with momentum strength",
-            "• Bollinger Bands with squeeze detection", 
-            "• Multi-level Support/Resistance mapping",
-            "• Volume trend and explosion detection",
-            "• Momentum indicators (ROC, Stochastic, Williams %R)",
-            "• Golden Cross variations (50/200 + 20/50)",
-            "• Confidence scoring with quality filters",
-            "",
-            f"📊 Analysis completed: {datetime.now().strftime('%I:%M %p EST')}",
-            f"🎯 {len(opportunities)} high-quality opportunities identified",
-            f"⚙️ Ultimate NASDAQ-100 Stock Analyzer",
-            "📈 Professional-grade technical analysis!"
-        ])
-        
-        yag.send(
-            to=EMAIL_ADDRESS,
-            subject=f"🚀 ULTIMATE Analysis - {len(opportunities)} Premium Opportunities",
-            contents='\n'.join(email_body)
-        )
-        print(f"\n📧 Ultimate analysis email sent with {len(opportunities)} opportunities!")
+        ratio = prices['Close'][1:] / prices['Close'][:-1]
+        split_like = np.zeros(ratio.shape, dtype=bool)
+        for split in SPLIT_RATIOS:
+            split_like |= (np.abs(ratio * split - 1) < SPLIT_TOLERANCE) | (np.abs(ratio / split - 1) < SPLIT_TOLERANCE)
+        step = np.ones(ratio.shape)
+        if 'Stock Splits' in prices:
+            # yfinance records an N-for-1 split as N on its first bar, where unadjusted prices drop by 1/N
+            recorded = prices['Stock Splits'][1:]
+            confirmed = (recorded > 0) & (np.abs(ratio * recorded - 1) < SPLIT_TOLERANCE)
+            step[confirmed] = 1 / recorded[confirmed]
+            split_like &= ~confirmed
+        suspect = np.zeros(close.shape, dtype=bool)  # From the first unexplained jump on
+        if split_like.any():
+            METRICS.count('suspect_splits', int(split_like.sum()))
+            suspect[1:] = np.logical_or.accumulate(split_like, axis=0)
+        jumped = np.flatnonzero((step != 1).any(axis=0))
+        if len(jumped):
+            METRICS.count('split_repairs', int((step != 1).sum()))
+            # Every bar is scaled by the ratios of all the jumps after it
+            adjust = np.ones((n_rows, len(jumped)))
+            adjust[:-1] = np.cumprod(step[::-1, jumped], axis=0)[::-1]
+            for field in price_fields:
+                prices[field] = prices[field].copy()
+                prices[field][:, jumped] *= adjust
+            if 'Volume' in prices:
+                prices['Volume'] = prices['Volume'].copy()
+                prices['Volume'][:, jumped] /= adjust
         
-    except Exception as e:
-        print(f"❌ Email error: {e}")
+        has_close = ~np.isnan(prices['Close'])
+        if history:
+            first_bar = np.where(has_close.any(axis=0), np.argmax(has_close, axis=0), n_rows)
+            n_obs = np.maximum(np.arange(n_rows)[:, None] - first_bar + 1, 0)
+        elif n_rows:
+            n_obs = np.where(has_close.any(axis=0), n_rows - np.argmax(has_close, axis=0), 0)
+            missing, suspect = missing[-1], suspect[-1]
+        else:
+            n_obs = np.zeros(n_cols, dtype=int)  # No ticker in the batch returned data
+            missing = suspect = np.zeros(n_cols, dtype=bool)
+        eligible = indicator_eligibility(n_obs, prices.get('Volume'))
+        eligible[missing | suspect] = 0  # Bars without a close of their own, and unexplained jumps
+    return prices, eligible
 
-def main():
-    """Ultimate stock analysis main function"""
-    start_time = datetime.now()
+def build_price_matrix(bulk_data, tickers, fields=('Open', 'High', 'Low', 'Close', 'Volume'),
+                       align='bars'):
+    """Stack a bulk download into (rows x tickers) float64 arrays, one per field
+
+    align='bars' right-aligns each ticker's own bars (row -1 is every ticker's
+    latest bar, shorter histories are padded with leading NaN), which is what
+    the last-bar indicators need. align='dates' puts every ticker on the union
+    calendar instead. Returns (row index, tickers present, arrays). A
+    PricePanel may stand in for the bulk frame.
+    """
+    if isinstance(bulk_data, PricePanel):
+        return bulk_data.prices(tickers, fields, align)
     
-    print(f"\n" + "="*80)
-    print(f"🚀 ULTIMATE NASDAQ-100 STOCK ANALYZER")
-    print(f"📅 {start_time.strftime('%A, %B %d, %Y at %I:%M %p EST')}")
-    print(f"🎯 Professional-Grade Multi-Indicator Analysis")
-    print(f"="*80)
+    # Validation: timestamps must be unique and increasing (checked once per batch)
+    if bulk_data is not None and not (bulk_data.index.is_monotonic_increasing and bulk_data.index.is_unique):
+        METRICS.count('unordered_timestamps')
+        bulk_data = bulk_data[~bulk_data.index.duplicated(keep='last')].sort_index()
     
-    results = analyze_stocks(STOCKS_TO_MONITOR)
+    frames = {}
+    for ticker in tickers:
+        ticker_data = extract_ticker_data(bulk_data, ticker)
+        if ticker_data is not None:
+            if not set(fields).issubset(ticker_data.columns):
+                ticker_data = ticker_data.reindex(columns=list(fields))  # Absent fields (e.g. 'Stock Splits') are NaN
+            frames[ticker] = ticker_data
     
-    if results:
-        # Sort by ultimate score
-        results.sort(key=lambda x: (x['score'], x['confidence']), reverse=True)
+    present = list(frames)
+    if not present:
+        return pd.Index([]), present, {field: np.empty((0, 0)) for field in fields}
+    
+    arrays = {}
+    if align == 'dates':
+        for field in fields:
+            aligned = pd.concat({ticker: frames[ticker][field] for ticker in present}, axis=1)
+            index = aligned.index
+            arrays[field] = np.ascontiguousarray(aligned.to_numpy(dtype='f8'))
+        return index, present, arrays
+    
+    n_rows = max(len(frame) for frame in frames.values())
+    for field in fields:
+        values = np.full((n_rows, len(present)), np.nan)
+        for j, ticker in enumerate(present):
+            column = frames[ticker][field].to_numpy(dtype='f8')
+            values[n_rows - len(column):, j] = column
+        arrays[field] = values
+    return pd.RangeIndex(1 - n_rows, 1), present, arrays
+
+def _tail_rows(values, count):
+    """Last `count` rows, padded with leading NaN rows when the history is shorter"""
+    if len(values) >= count:
+        return values[-count:]
+    padding = np.full((count - len(values),) + values.shape[1:], np.nan)
+    return np.concatenate([padding, values])
+
+def _nanmean(values, axis=0):
+    """NaN-skipping mean that returns NaN for empty slices without warning"""
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=axis)
+    totals = np.where(valid, values, 0.0).sum(axis=axis)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+def _ewm_mean(values, span):
+    """Column-wise equivalent of Series.ewm(span=span).mean() (adjust=True)"""
+    return kernels()['ewm_mean'](values, span)
+
+def _ewm_mean_numpy(values, span):
+    """_ewm_mean one row at a time, vectorized across the columns"""
+    decay = 1 - 2 / (span + 1)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    numerator = np.zeros(values.shape[1:])
+    denominator = np.zeros(values.shape[1:])
+    result = np.full(values.shape, np.nan)
+    
+    for i in range(len(values)):
+        numerator = numerator * decay + filled[i]
+        denominator = denominator * decay + valid[i]
+        np.divide(numerator, denominator, out=result[i], where=denominator > 0)
+    return result
+
+def _nth_extreme_mean(values, first, last, largest):
+    """Mean of the first..last-th largest (or smallest) valid values in each column"""
+    sentinel = -np.inf if largest else np.inf
+    filled = np.where(np.isnan(values), sentinel, values)
+    if last < len(filled):
+        # Only the `last` most extreme values matter, so partition before sorting
+        kth = len(filled) - last if largest else last - 1
+        filled = np.partition(filled, kth, axis=0)
+        filled = filled[kth:] if largest else filled[:last]
+    ordered = np.sort(filled, axis=0)
+    if largest:
+        ordered = ordered[::-1]
+    picked = ordered[first - 1:last]
+    return _nanmean(np.where(np.isinf(picked), np.nan, picked))
+
+# Trailing windows compute_indicator_table reads: (field, length) -> how many of
+# the latest windows it needs (50 Bollinger windows, current + previous MAs)
+FEATURE_WINDOWS = {
+    ('Close', 15): 1,  # RSI: the last 14 changes
+    ('Close', 20): 50,
+    ('Close', 21): 1,  # ROC 10 / 20
+    ('Close', 50): 2,
+    ('Close', 200): 2,
+    ('High', 14): 1,
+    ('High', 50): 1,  # Resistance
+    ('Low', 14): 1,
+    ('Low', 50): 1,  # Support
+    ('Volume', 20): 1,
+    ('Volume', 50): 1,
+}
+
+FEATURE_STATS = {
+    'mean': lambda windows: windows.mean(axis=-1),
+    'nanmean': lambda windows: _nanmean(windows, axis=-1),
+    'std': lambda windows: windows.std(axis=-1, ddof=1),
+    'min': lambda windows: windows.min(axis=-1),
+    'max': lambda windows: windows.max(axis=-1),
+}
+
+class FeatureCache:
+    """Window statistics over a batch's (dates x tickers) price arrays, each computed once
+
+    Indicators ask for (field, length, stat) instead of re-slicing the series:
+    the MA20 pair is the tail of the Bollinger middle band, and every other
+    window is materialized once per batch and shared by whichever statistics
+    read it. tail() serves compute_indicator_table from the trailing windows
+    sized by `counts`; rolling() serves compute_indicator_history with
+    full-length rolling statistics. `passes` counts window traversals per
+    (field, length), which stay at one with the cache in place.
+    """
+    
+    def __init__(self, arrays, counts=None):
+        self.arrays = arrays
+        self.counts = FEATURE_WINDOWS if counts is None else counts
+        self.windows = {}
+        self.stats = {}
+        self.passes = defaultdict(int)
+    
+    def window(self, field, length):
+        """(count x tickers x length) view of the latest trailing windows of `field`"""
+        key = (field, length)
+        windows = self.windows.get(key)
+        if windows is None:
+            count = self.counts.get(key, 1)
+            rows = _tail_rows(self.arrays[field], length + count - 1)
+            windows = np.lib.stride_tricks.sliding_window_view(rows, length, axis=0)
+            self.windows[key] = windows
+            self.passes[key] += 1
+            METRICS.count('feature_windows', field=field, length=length)
+        return windows
+    
+    def tail(self, field, length, how='mean'):
+        """(count x tickers) FEATURE_STATS[how] of the latest windows, the current bar last"""
+        key = ('tail', field, length, how)
+        values = self.stats.get(key)
+        if values is None:
+            values = self.stats[key] = FEATURE_STATS[how](self.window(field, length))
+        return values
+    
+    def rolling(self, field, length, how='mean', min_periods=None):
+        """_rolling() of `field` down every row, memoized"""
+        key = ('rolling', field, length, how, min_periods)
+        values = self.stats.get(key)
+        if values is None:
+            values = self.stats[key] = _rolling(self.arrays[field], length, how, min_periods)
+            self.passes[(field, length)] += 1
+            METRICS.count('feature_windows', field=field, length=length)
+        return values
+
+def compute_indicator_table(close, high, low, volume, tickers, eligible=None):
+    """Every indicator for every ticker in one column-wise pass
+
+    Takes aligned (dates x tickers) arrays and returns a DataFrame indexed by
+    ticker holding price, rsi, ma20/ma50/ma200, cross and every field of the
+    INDICATOR_GROUPS dicts, plus a `<group>_valid` flag per group and the
+    `eligible` bitmask. Indicators whose bit is clear in `eligible` (from
+    validate_prices; derived from the bar counts when omitted) are blanked.
+    """
+    close, high, low, volume = (np.asarray(a, dtype='f8') for a in (close, high, low, volume))
+    if len(close) == 0:
+        # No ticker in the chunk returned data: score an all-NaN bar so the table keeps its columns
+        close, high, low, volume = (np.full((1, a.shape[1]), np.nan) for a in (close, high, low, volume))
+    n_rows, n_cols = close.shape
+    has_close = ~np.isnan(close)
+    n_obs = np.where(has_close.any(axis=0), n_rows - np.argmax(has_close, axis=0), 0)
+    if eligible is None or len(eligible) != n_cols:
+        eligible = indicator_eligibility(n_obs)
+    features = FeatureCache({'Close': close, 'High': high, 'Low': low, 'Volume': volume})
+    table = {}
+    lap = METRICS.laps('indicator')
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        current_price = close[-1]
+        table['price'] = current_price
         
-        # Categorize by quality
-        ultimate_opportunities = [r for r in results if r['score'] >= 12]  # Exceptional
-        premium_opportunities = [r for r in results if 8 <= r['score'] < 12]  # Very good
-        good_opportunities = [r for r in results if 4 <= r['score'] < 8]      # Good
+        # RSI (simple rolling averages, as calculate_rsi); only the last 14 changes matter
+        closes = features.window('Close', 15)[-1].T
+        delta = np.diff(closes, axis=0)
+        gain = np.where(delta > 0, delta, 0.0)  # A change next to a missing close counts as 0, as in calculate_rsi
+        loss = np.where(delta < 0, -delta, 0.0)
+        avg_gain = gain.mean(axis=0)
+        avg_loss = loss.mean(axis=0)
+        table['rsi'] = 100 - (100 / (1 + avg_gain / avg_loss))
+        lap('rsi')
         
-        print(f"\n" + "="*80)
-        print(f"🏆 ULTIMATE OPPORTUNITIES (Score ≥ 12)")
-        print(f"="*80)
+        # Moving averages for the current and previous bar
+        ma = {}
+        for window in (20, 50, 200):
+            averages = features.tail('Close', window)
+            ma[window] = (averages[-1], averages[-2])
+            table[f'ma{window}'] = ma[window][0]
         
-        if ultimate_opportunities:
-            for idx, result in enumerate(ultimate_opportunities[:10], 1):
-                confidence_display = "⭐" * min(result['confidence'], 5)
-                print(f"\n{idx}. {result['ticker']} - {result['company_name']}")
-                print(f"   💰 Price: ${result['price']:.2f}")
-                print(f"   🎯 Ultimate Score: {result['score']} {confidence_display}")
-                print(f"   📊 Quality: {result['buy_signals']} buy signals vs {result['sell_signals']} sell")
-                print(f"   📈 RSI: {result['rsi']:.1f}")
-                print(f"   🔍 Top Signals:")
-                for signal in result['signals'][:4]:  # Top 4 signals
-                    print(f"      • {signal}")
-                if len(result['signals']) > 4:
-                    print(f"      • ... plus {len(result['signals']) - 4} more")
-                print("   " + "─" * 70)
+        cross = np.full(n_cols, None, dtype=object)
+        patterns = [
+            ('MINI DEATH', (ma[20][1] >= ma[50][1]) & (ma[20][0] < ma[50][0])),
+            ('MINI GOLDEN', (ma[20][1] <= ma[50][1]) & (ma[20][0] > ma[50][0])),
+            ('DEATH CROSS', (ma[50][1] >= ma[200][1]) & (ma[50][0] < ma[200][0])),
+            ('GOLDEN CROSS', (ma[50][1] <= ma[200][1]) & (ma[50][0] > ma[200][0])),
+        ]
+        for name, mask in patterns:  # Later patterns take precedence
+            cross[mask] = name
+        table['cross'] = cross
+        lap('moving_averages')
         
-        if premium_opportunities:
-            print(f"\n🥇 PREMIUM OPPORTUNITIES (Score 8-11)")
-            print("─" * 50)
+        # MACD
+        macd_line = _ewm_mean(close, 12) - _ewm_mean(close, 26)
+        signal_line = _ewm_mean(macd_line, 9)
+        histogram = macd_line - signal_line
+        macd_now, macd_prev = _tail_rows(macd_line, 2)[::-1]
+        signal_now, signal_prev = _tail_rows(signal_line, 2)[::-1]
+        table.update({
+            'macd': macd_now,
+            'signal': signal_now,
+            'histogram': histogram[-1],
+            'bullish_crossover': (macd_now > signal_now) & (macd_prev <= signal_prev),
+            'bearish_crossover': (macd_now < signal_now) & (macd_prev >= signal_prev),
+            'above_zero': macd_now > 0,
+            'momentum_strength': np.abs(histogram[-1]),
+        })
+        lap('macd')
+        
+        # Bollinger Bands, with the 50-bar average band width for squeeze detection
+        rolling_mean = features.tail('Close', 20)
+        rolling_std = features.tail('Close', 20, 'std')
+        upper_band = rolling_mean + rolling_std * 2
+        lower_band = rolling_mean - rolling_std * 2
+        band_widths = (upper_band - lower_band) / rolling_mean
+        bb_position = (current_price - lower_band[-1]) / (upper_band[-1] - lower_band[-1])
+        table.update({
+            'upper': upper_band[-1],
+            'middle': rolling_mean[-1],
+            'lower': lower_band[-1],
+            'position': bb_position,
+            'oversold': bb_position < 0.1,
+            'approaching_oversold': bb_position < 0.25,
+            'overbought': bb_position > 0.9,
+            'approaching_overbought': bb_position > 0.75,
+            'squeeze': band_widths[-1] < band_widths.mean(axis=0) * 0.8,
+            'band_width': band_widths[-1],
+        })
+        lap('bollinger')
+        
+        # Support / resistance over the last 50 bars
+        highs = features.window('High', 50)[-1].T
+        lows = features.window('Low', 50)[-1].T
+        resistance_1 = _nth_extreme_mean(highs, 1, 1, largest=True)
+        support_1 = _nth_extreme_mean(lows, 1, 1, largest=False)
+        resistance_distance = (resistance_1 - current_price) / current_price
+        support_distance = (current_price - support_1) / current_price
+        table.update({
+            'resistance_1': resistance_1,
+            'resistance_2': _nth_extreme_mean(highs, 6, 10, largest=True),
+            'support_1': support_1,
+            'support_2': _nth_extreme_mean(lows, 6, 10, largest=False),
+            'near_resistance': resistance_distance < 0.03,
+            'near_support': support_distance < 0.03,
+            'support_strength': support_distance,
+            'resistance_strength': resistance_distance,
+            'price_position': (current_price - support_1) / (resistance_1 - support_1),
+        })
+        lap('support_resistance')
+        
+        # Volume
+        recent_volume = features.window('Volume', 20)[-1].T
+        current_volume = volume[-1]
+        avg_volume_20 = features.tail('Volume', 20, 'nanmean')[-1]
+        avg_volume_50 = features.tail('Volume', 50, 'nanmean')[-1]
+        volume_ratio_20 = np.where(avg_volume_20 > 0, current_volume / avg_volume_20, 0)
+        volume_ratio_50 = np.where(avg_volume_50 > 0, current_volume / avg_volume_50, 0)
+        # head(5) of the last 20 bars starts at the ticker's first bar when it has fewer
+        head_rows = np.clip(20 - n_obs, 0, 19) + np.arange(5)[:, None]
+        head_volume = np.take_along_axis(recent_volume, np.minimum(head_rows, 19), axis=0)
+        head_volume[head_rows > 19] = np.nan
+        volume_trend = _nanmean(recent_volume[-5:]) / _nanmean(head_volume)
+        table.update({
+            'current_volume': current_volume,
+            'avg_volume_20': avg_volume_20,
+            'avg_volume_50': avg_volume_50,
+            'volume_ratio_20': volume_ratio_20,
+            'volume_ratio_50': volume_ratio_50,
+            'high_volume': volume_ratio_20 > 1.5,
+            'very_high_volume': volume_ratio_20 > 2.0,
+            'volume_trend': volume_trend,
+            'increasing_volume': volume_trend > 1.2,
+        })
+        lap('volume')
+        
+        # Momentum
+        closes = features.window('Close', 21)[-1].T
+        roc_10 = (closes[-1] - closes[-11]) / closes[-11] * 100
+        roc_20 = (closes[-1] - closes[-21]) / closes[-21] * 100
+        low_14 = features.tail('Low', 14, 'min')[-1]
+        high_14 = features.tail('High', 14, 'max')[-1]
+        stoch_k = (current_price - low_14) / (high_14 - low_14) * 100
+        table.update({
+            'roc_10': roc_10,
+            'roc_20': roc_20,
+            'stoch_k': stoch_k,
+            'williams_r': (high_14 - current_price) / (high_14 - low_14) * -100,
+            'momentum_bullish': (roc_10 > 5) & (roc_20 > 10),
+            'momentum_bearish': (roc_10 < -5) & (roc_20 < -10),
+            'stoch_oversold': stoch_k < 20,
+            'stoch_overbought': stoch_k > 80,
+        })
+        lap('momentum')
+    
+    _apply_eligibility(table, eligible)
+    table['eligible'] = eligible
+    return pd.DataFrame(table, index=pd.Index(tickers, name='ticker'))
+
+def _apply_eligibility(table, eligible):
+    """Blank out every indicator whose ELIGIBILITY_BITS bit is clear"""
+    for name, bit in ELIGIBILITY_BITS.items():
+        valid = (eligible & bit) != 0
+        if name in INDICATOR_GROUPS:
+            table[f'{name[:-5]}_valid'] = valid
+        for field in INDICATOR_GROUPS.get(name, [name]):
+            values = table[field]
+            if values.dtype == bool:
+                table[field] = values & valid
+            elif values.dtype == object:
+                table[field] = np.where(valid, values, None)
+            else:
+                table[field] = np.where(valid, values, np.nan)
+
+def _rolling(values, window, how='mean', min_periods=None):
+    """Trailing-window statistic down each column (NaN until min_periods valid rows)"""
+    if how in ('min', 'max'):
+        return kernels()['rolling_extreme'](values, window, how == 'max', window if min_periods is None else min_periods)
+    rolling = pd.DataFrame(values).rolling(window, min_periods=min_periods)
+    return getattr(rolling, how)().to_numpy()
+
+def _rolling_extreme_numpy(values, window, largest, min_periods):
+    rolling = pd.DataFrame(values).rolling(window, min_periods=min_periods)
+    return (rolling.max() if largest else rolling.min()).to_numpy()
+
+def _shift(values, periods):
+    """Rows moved down by `periods`, NaN-filled at the top"""
+    shifted = np.full(values.shape, np.nan)
+    shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+def _rolling_nth_extreme_mean(values, window, first, last, largest):
+    """_nth_extreme_mean over the trailing `window` rows at every row"""
+    return kernels()['rolling_nth_extreme_mean'](values, window, first, last, largest)
+
+def _rolling_nth_extreme_mean_numpy(values, window, first, last, largest, block=256):
+    """_rolling_nth_extreme_mean by partitioning every window, in row blocks to bound memory"""
+    padded = np.vstack([np.full((window - 1, values.shape[1]), np.nan), values])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+    result = np.empty(values.shape)
+    for offset in range(0, len(values), block):
+        chunk = np.moveaxis(windows[offset:offset + block], -1, 0)
+        result[offset:offset + block] = _nth_extreme_mean(chunk, first, last, largest)
+    return result
+
+# Loop kernels for the sequential indicators. Each takes (tickers x rows) float64
+# series, contiguous per ticker, and fills `out`; numba compiles them when it
+# is installed, otherwise the NumPy implementations above are used.
+
+def _ewm_mean_loop(series, decay, out):
+    for j in range(series.shape[0]):
+        numerator = 0.0
+        denominator = 0.0
+        for i in range(series.shape[1]):
+            value = series[j, i]
+            numerator *= decay
+            denominator *= decay
+            if value == value:
+                numerator += value
+                denominator += 1.0
+            out[j, i] = numerator / denominator if denominator > 0 else np.nan
+
+def _rolling_extreme_loop(series, window, largest, min_periods, out):
+    sign = 1.0 if largest else -1.0
+    queue = np.empty(series.shape[1], np.int64)  # Candidate rows, their values decreasing (times sign)
+    for j in range(series.shape[0]):
+        head = 0
+        tail = 0
+        count = 0
+        for i in range(series.shape[1]):
+            value = series[j, i]
+            if value == value:
+                count += 1
+                while tail > head and sign * series[j, queue[tail - 1]] <= sign * value:
+                    tail -= 1
+                queue[tail] = i
+                tail += 1
+            if i >= window and series[j, i - window] == series[j, i - window]:
+                count -= 1
+            while tail > head and queue[head] <= i - window:
+                head += 1
+            out[j, i] = series[j, queue[head]] if tail > head and count >= min_periods else np.nan
+
+def _rolling_nth_extreme_loop(series, window, first, last, largest, out):
+    ordered = np.empty(window)  # The window's valid values, ascending
+    for j in range(series.shape[0]):
+        size = 0
+        for i in range(series.shape[1]):
+            if i >= window:
+                old = series[j, i - window]
+                if old == old:
+                    k = 0
+                    while ordered[k] != old:
+                        k += 1
+                    for shift in range(k, size - 1):
+                        ordered[shift] = ordered[shift + 1]
+                    size -= 1
+            value = series[j, i]
+            if value == value:
+                k = size
+                while k > 0 and ordered[k - 1] > value:
+                    ordered[k] = ordered[k - 1]
+                    k -= 1
+                ordered[k] = value
+                size += 1
+            total = 0.0
+            count = 0
+            for rank in range(first - 1, min(last, size)):
+                total += ordered[size - 1 - rank] if largest else ordered[rank]
+                count += 1
+            out[j, i] = total / count if count > 0 else np.nan
+
+def _run_loop(loop, values, *args):
+    """Call a loop kernel on (rows x tickers) values and return (rows x tickers) results"""
+    series = np.ascontiguousarray(np.asarray(values, dtype='f8').T)
+    out = np.empty(series.shape)
+    loop(series, *args, out)
+    return out.T
+
+NUMPY_KERNELS = {
+    'name': 'numpy',
+    'ewm_mean': _ewm_mean_numpy,
+    'rolling_extreme': _rolling_extreme_numpy,
+    'rolling_nth_extreme_mean': _rolling_nth_extreme_mean_numpy,
+}
+
+def _numba_kernels():
+    """The loop kernels compiled with numba (ImportError when it is not installed)"""
+    import numba
+    jit = numba.njit(cache=True, nogil=True)
+    ewm_mean, rolling_extreme, rolling_nth_extreme = (
+        jit(loop) for loop in (_ewm_mean_loop, _rolling_extreme_loop, _rolling_nth_extreme_loop))
+    return {
+        'name': 'numba',
+        'ewm_mean': lambda values, span: _run_loop(ewm_mean, values, 1 - 2 / (span + 1)),
+        'rolling_extreme': lambda values, window, largest, min_periods: _run_loop(
+            rolling_extreme, values, window, largest, min_periods),
+        'rolling_nth_extreme_mean': lambda values, window, first, last, largest: _run_loop(
+            rolling_nth_extreme, values, window, first, last, largest),
+    }
+
+KERNEL_BACKENDS = ('auto', 'numba', 'numpy')
+_KERNELS = {}
+
+def set_kernel_backend(name=None):
+    """Select the indicator kernels: 'numba', 'numpy' or 'auto' (numba when installed)
+
+    Defaults to STOCK_KERNELS. The choice is exported to the environment so
+    worker processes pick the same backend. Returns the backend in use.
+    """
+    name = name or os.environ.get('STOCK_KERNELS', 'auto')
+    if name not in KERNEL_BACKENDS:
+        raise ValueError(f"Unknown kernel backend {name!r}, expected one of {', '.join(KERNEL_BACKENDS)}")
+    kernels = NUMPY_KERNELS
+    if name != 'numpy':
+        try:
+            kernels = _numba_kernels()
+        except ImportError:
+            if name == 'numba':
+                raise
+    _KERNELS.clear()
+    _KERNELS.update(kernels)
+    os.environ['STOCK_KERNELS'] = name
+    return kernels['name']
+
+def kernels():
+    """The active kernel table, resolved on first use so numba is only imported when needed"""
+    if not _KERNELS:
+        set_kernel_backend()
+    return _KERNELS
+
+def compute_indicator_history(close, high, low, volume, eligible=None):
+    """compute_indicator_table at every date at once
+
+    Takes date-aligned (dates x tickers) arrays and returns a dict of (dates x
+    tickers) arrays whose row t holds what compute_indicator_table gives for
+    the history up to t. Rolling windows replace re-slicing the history for
+    every date, so the cost is linear in the number of dates. `eligible` is
+    the per-bar mask from validate_prices(..., history=True); it is derived
+    from the bar counts when omitted.
+    """
+    close, high, low, volume = (np.asarray(a, dtype='f8') for a in (close, high, low, volume))
+    n_rows, n_cols = close.shape
+    has_close = ~np.isnan(close)
+    first_bar = np.where(has_close.any(axis=0), np.argmax(has_close, axis=0), n_rows)
+    rows = np.arange(n_rows)[:, None]
+    n_obs = np.maximum(rows - first_bar + 1, 0)
+    features = FeatureCache({'Close': close, 'High': high, 'Low': low, 'Volume': volume})
+    table = {}
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['price'] = close
+        
+        # RSI
+        delta = np.vstack([np.full((1, n_cols), np.nan), np.diff(close, axis=0)])
+        gain = np.where(delta > 0, delta, 0.0)  # Missing changes count as 0, as in calculate_rsi
+        loss = np.where(delta < 0, -delta, 0.0)
+        table['rsi'] = 100 - (100 / (1 + _rolling(gain, 14) / _rolling(loss, 14)))
+        
+        # Moving averages and crosses
+        ma = {}
+        for window in (20, 50, 200):
+            current = features.rolling('Close', window)
+            ma[window] = (current, _shift(current, 1))
+            table[f'ma{window}'] = current
+        
+        cross = np.full((n_rows, n_cols), None, dtype=object)
+        patterns = [
+            ('MINI DEATH', (ma[20][1] >= ma[50][1]) & (ma[20][0] < ma[50][0])),
+            ('MINI GOLDEN', (ma[20][1] <= ma[50][1]) & (ma[20][0] > ma[50][0])),
+            ('DEATH CROSS', (ma[50][1] >= ma[200][1]) & (ma[50][0] < ma[200][0])),
+            ('GOLDEN CROSS', (ma[50][1] <= ma[200][1]) & (ma[50][0] > ma[200][0])),
+        ]
+        for name, mask in patterns:  # Later patterns take precedence
+            cross[mask] = name
+        table['cross'] = cross
+        
+        # MACD
+        macd_line = _ewm_mean(close, 12) - _ewm_mean(close, 26)
+        signal_line = _ewm_mean(macd_line, 9)
+        histogram = macd_line - signal_line
+        macd_prev = _shift(macd_line, 1)
+        signal_prev = _shift(signal_line, 1)
+        table.update({
+            'macd': macd_line,
+            'signal': signal_line,
+            'histogram': histogram,
+            'bullish_crossover': (macd_line > signal_line) & (macd_prev <= signal_prev),
+            'bearish_crossover': (macd_line < signal_line) & (macd_prev >= signal_prev),
+            'above_zero': macd_line > 0,
+            'momentum_strength': np.abs(histogram),
+        })
+        
+        # Bollinger Bands
+        rolling_mean = features.rolling('Close', 20)
+        rolling_std = features.rolling('Close', 20, 'std')
+        upper_band = rolling_mean + rolling_std * 2
+        lower_band = rolling_mean - rolling_std * 2
+        band_width = (upper_band - lower_band) / rolling_mean
+        bb_position = (close - lower_band) / (upper_band - lower_band)
+        table.update({
+            'upper': upper_band,
+            'middle': rolling_mean,
+            'lower': lower_band,
+            'position': bb_position,
+            'oversold': bb_position < 0.1,
+            'approaching_oversold': bb_position < 0.25,
+            'overbought': bb_position > 0.9,
+            'approaching_overbought': bb_position > 0.75,
+            'squeeze': band_width < _rolling(band_width, 50) * 0.8,
+            'band_width': band_width,
+        })
+        
+        # Support / resistance over the last 50 bars
+        resistance_1 = features.rolling('High', 50, 'max', min_periods=1)
+        support_1 = features.rolling('Low', 50, 'min', min_periods=1)
+        resistance_distance = (resistance_1 - close) / close
+        support_distance = (close - support_1) / close
+        table.update({
+            'resistance_1': resistance_1,
+            'resistance_2': _rolling_nth_extreme_mean(high, 50, 6, 10, largest=True),
+            'support_1': support_1,
+            'support_2': _rolling_nth_extreme_mean(low, 50, 6, 10, largest=False),
+            'near_resistance': resistance_distance < 0.03,
+            'near_support': support_distance < 0.03,
+            'support_strength': support_distance,
+            'resistance_strength': resistance_distance,
+            'price_position': (close - support_1) / (resistance_1 - support_1),
+        })
+        
+        # Volume
+        avg_volume_20 = features.rolling('Volume', 20, min_periods=1)
+        avg_volume_50 = features.rolling('Volume', 50, min_periods=1)
+        volume_ratio_20 = np.where(avg_volume_20 > 0, volume / avg_volume_20, 0)
+        volume_ratio_50 = np.where(avg_volume_50 > 0, volume / avg_volume_50, 0)
+        # head(5) of the last 20 bars, which starts at the ticker's first bar when it has fewer
+        last_5_volume = features.rolling('Volume', 5, min_periods=1)
+        head_volume = _shift(last_5_volume, 15)
+        expanding = pd.DataFrame(volume).expanding(min_periods=1).mean().to_numpy()
+        head_end = np.minimum(rows, np.minimum(first_bar, n_rows - 1) + 4)
+        early_head = np.take_along_axis(expanding, np.minimum(head_end, n_rows - 1), axis=0)
+        head_volume = np.where(n_obs < 20, early_head, head_volume)
+        volume_trend = last_5_volume / head_volume
+        table.update({
+            'current_volume': volume,
+            'avg_volume_20': avg_volume_20,
+            'avg_volume_50': avg_volume_50,
+            'volume_ratio_20': volume_ratio_20,
+            'volume_ratio_50': volume_ratio_50,
+            'high_volume': volume_ratio_20 > 1.5,
+            'very_high_volume': volume_ratio_20 > 2.0,
+            'volume_trend': volume_trend,
+            'increasing_volume': volume_trend > 1.2,
+        })
+        
+        # Momentum
+        close_10 = _shift(close, 10)
+        close_20 = _shift(close, 20)
+        roc_10 = (close - close_10) / close_10 * 100
+        roc_20 = (close - close_20) / close_20 * 100
+        low_14 = features.rolling('Low', 14, 'min')
+        high_14 = features.rolling('High', 14, 'max')
+        stoch_k = (close - low_14) / (high_14 - low_14) * 100
+        table.update({
+            'roc_10': roc_10,
+            'roc_20': roc_20,
+            'stoch_k': stoch_k,
+            'williams_r': (high_14 - close) / (high_14 - low_14) * -100,
+            'momentum_bullish': (roc_10 > 5) & (roc_20 > 10),
+            'momentum_bearish': (roc_10 < -5) & (roc_20 < -10),
+            'stoch_oversold': stoch_k < 20,
+            'stoch_overbought': stoch_k > 80,
+        })
+    
+    table['eligible'] = indicator_eligibility(n_obs) if eligible is None else eligible
+    _apply_eligibility(table, table['eligible'])
+    return table
+
+def indicator_groups(row):
+    """Rebuild the per-ticker indicator dicts (None for invalid groups) from a table row"""
+    return {
+        group: {field: row[field] for field in fields} if row[f'{group[:-5]}_valid'] else None
+        for group, fields in INDICATOR_GROUPS.items()
+    }
+
+_BOOLEAN_FIELDS = {
+    'bullish_crossover', 'bearish_crossover', 'above_zero', 'oversold', 'approaching_oversold',
+    'overbought', 'approaching_overbought', 'squeeze', 'near_resistance', 'near_support',
+    'high_volume', 'very_high_volume', 'increasing_volume', 'momentum_bullish',
+    'momentum_bearish', 'stoch_oversold', 'stoch_overbought',
+}
+
+def compute_ticker_indicators(data, tail_only=True):
+    """One ticker's indicators as a flat row, laid out like compute_indicator_table
+
+    Uses the per-ticker functions, by default in tail-only mode, which makes
+    re-scoring a single ticker (e.g. intraday) cheap.
+    """
+    moving_averages = pd.DataFrame({
+        f'MA{window}': calculate_moving_average(data, window, tail_only=tail_only)
+        for window in (20, 50, 200)
+    })
+    row = {
+        'price': data['Close'].iloc[-1],
+        'rsi': calculate_rsi(data, tail_only=tail_only).iloc[-1],
+        'ma20': moving_averages['MA20'].iloc[-1],
+        'ma50': moving_averages['MA50'].iloc[-1],
+        'ma200': moving_averages['MA200'].iloc[-1],
+        'cross': check_golden_cross(moving_averages),
+    }
+    
+    groups = {
+        'macd_data': calculate_macd(data, tail_only=tail_only),
+        'bb_data': calculate_bollinger_bands(data, tail_only=tail_only),
+        'sr_data': find_support_resistance(data),
+        'volume_data': analyze_volume(data),
+        'momentum_data': calculate_momentum_indicators(data, tail_only=tail_only),
+    }
+    for group, values in groups.items():
+        row[f'{group[:-5]}_valid'] = values is not None
+        for field in INDICATOR_GROUPS[group]:
+            if values is not None:
+                row[field] = values[field]
+            else:
+                row[field] = False if field in _BOOLEAN_FIELDS else np.nan
+    return row
+
+class TickerState:
+    """Streaming indicator state for one ticker, updated in O(1) per new bar
+
+    Seed it once from history with from_history(), then feed each new bar to
+    update(). indicators() returns the same flat row as compute_indicator_table,
+    so score_indicators() can consume the state directly. Keeps simple rolling
+    sums for RSI, the moving averages, Bollinger Bands and volume, adjusted EMA
+    numerator/denominator pairs for MACD, monotonic deques for the 14-bar
+    stochastic range and sorted 50-bar windows for support/resistance (which
+    also yield the 6th-10th highest/lowest levels). Bars are assumed complete
+    (no NaN prices).
+    """
+    __slots__ = (
+        'bars', 'closes', 'close_sums', 'ma_prev', 'anchor', 'sq_sum_20', 'band_widths',
+        'band_width_sum', 'gains', 'losses', 'gain_sum', 'loss_sum', 'ema', 'macd_prev',
+        'signal_prev', 'stoch_highs', 'stoch_lows', 'highs', 'lows', 'sorted_highs',
+        'sorted_lows', 'volumes', 'volume_sums',
+    )
+    
+    MA_WINDOWS = (20, 50, 200)
+    EMA_SPANS = {'fast': 12, 'slow': 26, 'signal': 9}
+    
+    def __init__(self):
+        self.bars = 0
+        self.closes = deque(maxlen=201)
+        self.close_sums = {window: 0.0 for window in self.MA_WINDOWS}
+        self.ma_prev = {window: np.nan for window in self.MA_WINDOWS}
+        self.anchor = None  # Shift for the sum of squares, against cancellation
+        self.sq_sum_20 = 0.0
+        self.band_widths = deque(maxlen=50)
+        self.band_width_sum = 0.0
+        self.gains = deque(maxlen=14)
+        self.losses = deque(maxlen=14)
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.ema = {name: [0.0, 0.0] for name in self.EMA_SPANS}  # [numerator, denominator]
+        self.macd_prev = np.nan
+        self.signal_prev = np.nan
+        self.stoch_highs = deque()  # (bar, high) with decreasing highs
+        self.stoch_lows = deque()   # (bar, low) with increasing lows
+        self.highs = deque(maxlen=50)
+        self.lows = deque(maxlen=50)
+        self.sorted_highs = []
+        self.sorted_lows = []
+        self.volumes = deque(maxlen=50)
+        self.volume_sums = {20: 0.0, 50: 0.0}
+    
+    @classmethod
+    def from_history(cls, data):
+        """Seed the state from an OHLCV frame"""
+        state = cls()
+        for high, low, close, volume in data[['High', 'Low', 'Close', 'Volume']].itertuples(index=False):
+            state.update(high, low, close, volume)
+        return state
+    
+    def _ema_update(self, name, value):
+        decay = 1 - 2 / (self.EMA_SPANS[name] + 1)
+        state = self.ema[name]
+        state[0] = state[0] * decay + value
+        state[1] = state[1] * decay + 1
+        return state[0] / state[1]
+    
+    def update(self, high, low, close, volume):
+        """Fold one new bar into the state"""
+        closes = self.closes
+        if self.anchor is None:
+            self.anchor = close
+        
+        # Previous-bar values for the crossover checks
+        for window in self.MA_WINDOWS:
+            self.ma_prev[window] = self._moving_average(window)
+        if self.bars:
+            self.macd_prev, self.signal_prev = self._macd_values()
+        
+        # RSI deltas (the very first bar counts as a zero change, as in calculate_rsi)
+        delta = close - closes[-1] if closes else 0.0
+        if len(self.gains) == 14:
+            self.gain_sum -= self.gains[0]
+            self.loss_sum -= self.losses[0]
+        self.gains.append(max(delta, 0.0))
+        self.losses.append(max(-delta, 0.0))
+        self.gain_sum += self.gains[-1]
+        self.loss_sum += self.losses[-1]
+        
+        # Rolling close sums for the moving averages and the Bollinger variance
+        for window in self.MA_WINDOWS:
+            if len(closes) >= window:
+                self.close_sums[window] -= closes[-window]
+            self.close_sums[window] += close
+        if len(closes) >= 20:
+            self.sq_sum_20 -= (closes[-20] - self.anchor) ** 2
+        self.sq_sum_20 += (close - self.anchor) ** 2
+        closes.append(close)
+        
+        # MACD
+        macd = self._ema_update('fast', close) - self._ema_update('slow', close)
+        self._ema_update('signal', macd)
+        
+        # Bollinger band width history for squeeze detection
+        if len(closes) >= 20:
+            if len(self.band_widths) == 50:
+                self.band_width_sum -= self.band_widths[0]
+            upper, middle, lower = self._bollinger_band()
+            self.band_widths.append((upper - lower) / middle)
+            self.band_width_sum += self.band_widths[-1]
+        
+        # 14-bar stochastic range via monotonic deques
+        bar = self.bars
+        while self.stoch_highs and self.stoch_highs[-1][1] <= high:
+            self.stoch_highs.pop()
+        self.stoch_highs.append((bar, high))
+        while self.stoch_lows and self.stoch_lows[-1][1] >= low:
+            self.stoch_lows.pop()
+        self.stoch_lows.append((bar, low))
+        for window in (self.stoch_highs, self.stoch_lows):
+            if window[0][0] <= bar - 14:
+                window.popleft()
+        
+        # 50-bar support/resistance windows
+        for window, ordered, value in ((self.highs, self.sorted_highs, high),
+                                       (self.lows, self.sorted_lows, low)):
+            if len(window) == 50:
+                del ordered[bisect.bisect_left(ordered, window[0])]
+            window.append(value)
+            bisect.insort(ordered, value)
+        
+        # Volume averages
+        for window in self.volume_sums:
+            if len(self.volumes) >= window:
+                self.volume_sums[window] -= self.volumes[-window]
+            self.volume_sums[window] += volume
+        self.volumes.append(volume)
+        
+        self.bars += 1
+    
+    def _moving_average(self, window):
+        if len(self.closes) < window:
+            return np.nan
+        return self.close_sums[window] / window
+    
+    def _macd_values(self):
+        fast, slow, signal = (self.ema[name] for name in ('fast', 'slow', 'signal'))
+        return fast[0] / fast[1] - slow[0] / slow[1], signal[0] / signal[1]
+    
+    def _bollinger_band(self, std_dev=2):
+        middle = self.close_sums[20] / 20
+        shifted_sum = self.close_sums[20] - 20 * self.anchor
+        variance = max((self.sq_sum_20 - shifted_sum ** 2 / 20) / 19, 0.0)
+        width = variance ** 0.5 * std_dev
+        return middle + width, middle, middle - width
+    
+    def indicators(self):
+        """Current indicator row, laid out like compute_indicator_table"""
+        if not self.bars:
+            return None
+        closes = self.closes
+        current_price = closes[-1]
+        row = {'price': current_price}
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row['rsi'] = np.nan
+            if len(self.gains) == 14:
+                rs = np.float64(self.gain_sum / 14) / np.float64(self.loss_sum / 14)
+                row['rsi'] = 100 - (100 / (1 + rs))
+            
+            ma = {window: self._moving_average(window) for window in self.MA_WINDOWS}
+            row.update({f'ma{window}': ma[window] for window in self.MA_WINDOWS})
+            prev = self.ma_prev
+            cross = None
+            if self.bars >= 2:
+                if prev[50] <= prev[200] and ma[50] > ma[200]:
+                    cross = "GOLDEN CROSS"
+                elif prev[50] >= prev[200] and ma[50] < ma[200]:
+                    cross = "DEATH CROSS"
+                elif prev[20] <= prev[50] and ma[20] > ma[50]:
+                    cross = "MINI GOLDEN"
+                elif prev[20] >= prev[50] and ma[20] < ma[50]:
+                    cross = "MINI DEATH"
+            row['cross'] = cross
+            
+            macd, signal = self._macd_values()
+            histogram = macd - signal
+            row.update({
+                'macd': macd,
+                'signal': signal,
+                'histogram': histogram,
+                'bullish_crossover': macd > signal and self.macd_prev <= self.signal_prev,
+                'bearish_crossover': macd < signal and self.macd_prev >= self.signal_prev,
+                'above_zero': macd > 0,
+                'momentum_strength': abs(histogram),
+            })
+            
+            upper = middle = lower = position = band_width = np.nan
+            squeeze = False
+            if len(closes) >= 20:
+                upper, middle, lower = self._bollinger_band()
+                position = np.float64(current_price - lower) / (upper - lower)
+                band_width = self.band_widths[-1]
+                if len(self.band_widths) == 50:
+                    squeeze = band_width < self.band_width_sum / 50 * 0.8
+            row.update({
+                'upper': upper,
+                'middle': middle,
+                'lower': lower,
+                'position': position,
+                'oversold': position < 0.1,
+                'approaching_oversold': position < 0.25,
+                'overbought': position > 0.9,
+                'approaching_overbought': position > 0.75,
+                'squeeze': squeeze,
+                'band_width': band_width,
+            })
+            
+            resistance_1 = self.sorted_highs[-1]
+            support_1 = self.sorted_lows[0]
+            resistance_2 = np.mean(self.sorted_highs[::-1][5:10]) if len(self.highs) > 5 else np.nan
+            support_2 = np.mean(self.sorted_lows[5:10]) if len(self.lows) > 5 else np.nan
+            resistance_distance = (resistance_1 - current_price) / current_price
+            support_distance = (current_price - support_1) / current_price
+            row.update({
+                'resistance_1': resistance_1,
+                'resistance_2': resistance_2,
+                'support_1': support_1,
+                'support_2': support_2,
+                'near_resistance': resistance_distance < 0.03,
+                'near_support': support_distance < 0.03,
+                'support_strength': support_distance,
+                'resistance_strength': resistance_distance,
+                'price_position': np.float64(current_price - support_1) / (resistance_1 - support_1),
+            })
+            
+            volumes = self.volumes
+            current_volume = volumes[-1]
+            avg_volume_20 = self.volume_sums[20] / min(len(volumes), 20)
+            avg_volume_50 = self.volume_sums[50] / len(volumes)
+            volume_ratio_20 = current_volume / avg_volume_20 if avg_volume_20 > 0 else 0
+            volume_ratio_50 = current_volume / avg_volume_50 if avg_volume_50 > 0 else 0
+            recent = list(volumes)[-20:]
+            volume_trend = np.float64(np.mean(recent[-5:])) / np.mean(recent[:5])
+            row.update({
+                'current_volume': current_volume,
+                'avg_volume_20': avg_volume_20,
+                'avg_volume_50': avg_volume_50,
+                'volume_ratio_20': volume_ratio_20,
+                'volume_ratio_50': volume_ratio_50,
+                'high_volume': volume_ratio_20 > 1.5,
+                'very_high_volume': volume_ratio_20 > 2.0,
+                'volume_trend': volume_trend,
+                'increasing_volume': volume_trend > 1.2,
+            })
+            
+            low_14 = self.stoch_lows[0][1]
+            high_14 = self.stoch_highs[0][1]
+            stoch_k = np.nan
+            if self.bars >= 14:
+                stoch_k = np.float64(current_price - low_14) / (high_14 - low_14) * 100
+            roc_10 = roc_20 = np.nan
+            if len(closes) >= 21:
+                roc_10 = (current_price - closes[-11]) / closes[-11] * 100
+                roc_20 = (current_price - closes[-21]) / closes[-21] * 100
+            row.update({
+                'roc_10': roc_10,
+                'roc_20': roc_20,
+                'stoch_k': stoch_k,
+                'williams_r': np.float64(high_14 - current_price) / (high_14 - low_14) * -100,
+                'momentum_bullish': roc_10 > 5 and roc_20 > 10,
+                'momentum_bearish': roc_10 < -5 and roc_20 < -10,
+                'stoch_oversold': stoch_k < 20,
+                'stoch_overbought': stoch_k > 80,
+            })
+        
+        for group, min_bars in _GROUP_MIN_BARS.items():
+            valid = self.bars >= min_bars
+            row[f'{group[:-5]}_valid'] = valid
+            if not valid:
+                for field in INDICATOR_GROUPS[group]:
+                    row[field] = False if field in _BOOLEAN_FIELDS else np.nan
+        return row
+
+# ULTIMATE SCORING SYSTEM, expressed as data. Rules sharing a group form an
+# if/elif chain (the first matching rule wins). Conditions are NumPy expressions
+# over indicator-table columns, the thresholds below and the running
+# buy_signals/sell_signals counts, so every ticker is scored in one shot.
+SCORING_THRESHOLDS = {
+    'rsi_extreme_oversold': 25,
+    'rsi_oversold': 30,
+    'rsi_approaching_oversold': 40,
+    'rsi_overbought': 70,
+    'rsi_extreme_overbought': 80,
+    'bb_extreme_oversold': 0.1,
+    'bb_oversold': 0.25,
+    'bb_extreme_overbought': 0.9,
+    'support_distance': 0.03,
+    'resistance_distance': 0.03,
+    'strong_support_position': 0.3,
+    'high_volume_ratio': 1.5,
+    'explosive_volume_ratio': 2.0,
+    'volume_trend': 1.2,
+    'roc_10_momentum': 5,
+    'roc_20_momentum': 10,
+    'stoch_oversold': 20,
+    'high_confidence': 3,
+    'confidence_bonus': 1.2,
+    'min_score': 8,        # Quality filter for signals without a buy majority
+    'ultimate_score': 12,  # Tier cutoffs
+    'premium_score': 8,
+    'good_score': 4,
+}
+
+SCORING_RULES = [
+    # RSI Analysis (Enhanced)
+    {'id': 'rsi_extreme_oversold', 'group': 'rsi', 'when': "rsi < rsi_extreme_oversold",
+     'score': 6, 'buy': 1, 'confidence': 2,
+     'text': "🟢 EXTREMELY OVERSOLD: RSI {rsi:.1f} - Rare Opportunity"},
+    {'id': 'rsi_oversold', 'group': 'rsi', 'when': "rsi < rsi_oversold",
+     'score': 4, 'buy': 1, 'confidence': 1,
+     'text': "🟢 OVERSOLD: RSI {rsi:.1f} - Strong Buy Zone"},
+    {'id': 'rsi_approaching_oversold', 'group': 'rsi', 'when': "rsi < rsi_approaching_oversold",
+     'score': 2, 'buy': 1,
+     'text': "🟡 APPROACHING OVERSOLD: RSI {rsi:.1f}"},
+    {'id': 'rsi_extreme_overbought', 'group': 'rsi', 'when': "rsi > rsi_extreme_overbought",
+     'score': -5, 'sell': 1,
+     'text': "🔴 EXTREMELY OVERBOUGHT: RSI {rsi:.1f} - Danger Zone"},
+    {'id': 'rsi_overbought', 'group': 'rsi', 'when': "rsi > rsi_overbought",
+     'score': -3, 'sell': 1,
+     'text': "🔴 OVERBOUGHT: RSI {rsi:.1f} - Avoid"},
+    
+    # MACD Analysis (Advanced)
+    {'id': 'macd_bullish_crossover', 'group': 'macd', 'when': "bullish_crossover",
+     'score': 4, 'buy': 1, 'confidence': 1,
+     'text': "🟢 MACD BULLISH CROSSOVER - Momentum Turning Up"},
+    {'id': 'macd_strong_positive', 'group': 'macd', 'when': "(macd > signal) & above_zero",
+     'score': 2, 'buy': 1,
+     'text': "🟡 MACD Strong Positive - Above Zero Line"},
+    {'id': 'macd_bearish_crossover', 'group': 'macd', 'when': "bearish_crossover",
+     'score': -3, 'sell': 1,
+     'text': "🔴 MACD BEARISH CROSSOVER - Momentum Turning Down"},
+    
+    # Bollinger Bands Analysis (Advanced)
+    {'id': 'bb_extreme_oversold', 'group': 'bollinger', 'when': "position < bb_extreme_oversold",
+     'score': 5, 'buy': 1, 'confidence': 1,
+     'text': "🟢 BOLLINGER EXTREME OVERSOLD - Position {position:.2f}"},
+    {'id': 'bb_oversold', 'group': 'bollinger', 'when': "position < bb_oversold",
+     'score': 3, 'buy': 1,
+     'text': "🟡 BOLLINGER OVERSOLD - Position {position:.2f}"},
+    {'id': 'bb_extreme_overbought', 'group': 'bollinger', 'when': "position > bb_extreme_overbought",
+     'score': -4, 'sell': 1,
+     'text': "🔴 BOLLINGER EXTREME OVERBOUGHT - Position {position:.2f}"},
+    {'id': 'bb_squeeze', 'group': 'squeeze', 'when': "squeeze",
+     'score': 2, 'confidence': 1,
+     'text': "⚡ BOLLINGER SQUEEZE - Breakout Imminent"},
+    
+    # Support/Resistance Analysis (Advanced)
+    {'id': 'strong_support', 'group': 'support_resistance',
+     'when': "(support_strength < support_distance) & (price_position < strong_support_position)",
+     'score': 4, 'buy': 1, 'confidence': 1,
+     'text': "🟢 STRONG SUPPORT - ${support_1:.2f} ({support_strength:.1%})"},
+    {'id': 'near_support', 'group': 'support_resistance', 'when': "support_strength < support_distance",
+     'score': 2, 'buy': 1,
+     'text': "🟡 NEAR SUPPORT - ${support_1:.2f}"},
+    {'id': 'near_resistance', 'group': 'support_resistance',
+     'when': "resistance_strength < resistance_distance",
+     'score': -2, 'sell': 1,
+     'text': "🔴 NEAR RESISTANCE - ${resistance_1:.2f}"},
+    
+    # Moving Average Analysis (Enhanced)
+    {'id': 'perfect_alignment', 'group': 'moving_averages',
+     'when': "(price > ma20) & (ma20 > ma50) & (ma50 > ma200)",
+     'score': 4, 'buy': 1, 'confidence': 1,
+     'text': "🟢 PERFECT BULLISH ALIGNMENT - All MAs Ascending"},
+    {'id': 'bullish_trend', 'group': 'moving_averages', 'when': "ma50 > ma200",
+     'score': 2, 'buy': 1,
+     'text': "🟡 BULLISH TREND - 50 MA above 200 MA"},
+    {'id': 'bearish_trend', 'group': 'moving_averages', 'when': "ma50 < ma200",
+     'score': -2, 'sell': 1,
+     'text': "🔴 BEARISH TREND - 50 MA below 200 MA"},
+    
+    # Golden/Death Cross Analysis (Enhanced)
+    {'id': 'golden_cross', 'group': 'cross', 'when': "cross == 'GOLDEN CROSS'",
+     'score': 6, 'buy': 1, 'confidence': 2,
+     'text': "🌟 GOLDEN CROSS - Major Bullish Breakout!"},
+    {'id': 'mini_golden_cross', 'group': 'cross', 'when': "cross == 'MINI GOLDEN'",
+     'score': 3, 'buy': 1,
+     'text': "⭐ MINI GOLDEN CROSS - Short-term Bullish"},
+    {'id': 'death_cross', 'group': 'cross', 'when': "cross == 'DEATH CROSS'",
+     'score': -6, 'sell': 1,
+     'text': "💀 DEATH CROSS - Major Bearish Signal"},
+    {'id': 'mini_death_cross', 'group': 'cross', 'when': "cross == 'MINI DEATH'",
+     'score': -3, 'sell': 1,
+     'text': "☠️ MINI DEATH CROSS - Short-term Bearish"},
+    
+    # Volume Analysis (Advanced) - confirms the signals counted so far
+    {'id': 'explosive_volume', 'group': 'volume',
+     'when': "(volume_ratio_20 > explosive_volume_ratio) & (buy_signals > sell_signals)",
+     'score': 4, 'confidence': 1,
+     'text': "📈 EXPLOSIVE VOLUME - {volume_ratio_20:.1f}x Average"},
+    {'id': 'high_volume', 'group': 'volume',
+     'when': "(volume_ratio_20 > high_volume_ratio) & (buy_signals > sell_signals)",
+     'score': 2,
+     'text': "📊 HIGH VOLUME CONFIRMATION - {volume_ratio_20:.1f}x"},
+    {'id': 'increasing_volume', 'group': 'volume', 'when': "volume_trend > volume_trend_threshold",
+     'score': 1,
+     'text': "📈 INCREASING VOLUME TREND"},
+    
+    # Momentum Analysis (Advanced)
+    {'id': 'strong_momentum', 'group': 'momentum',
+     'when': "(roc_10 > roc_10_momentum) & (roc_20 > roc_20_momentum)",
+     'score': 3, 'buy': 1,
+     'text': "🚀 STRONG MOMENTUM - ROC: {roc_20:.1f}%"},
+    {'id': 'weak_momentum', 'group': 'momentum',
+     'when': "(roc_10 < -roc_10_momentum) & (roc_20 < -roc_20_momentum)",
+     'score': -3, 'sell': 1,
+     'text': "📉 WEAK MOMENTUM - ROC: {roc_20:.1f}%"},
+    {'id': 'stoch_oversold', 'group': 'stochastic', 'when': "stoch_k < stoch_oversold",
+     'score': 2, 'buy': 1,
+     'text': "🟢 STOCHASTIC OVERSOLD - {stoch_k:.1f}"},
+    
+    # Confidence multiplier (for high-conviction plays)
+    {'id': 'high_confidence', 'group': 'confidence', 'when': "confidence >= high_confidence",
+     'multiply': 'confidence_bonus',
+     'text': "⭐ HIGH CONFIDENCE SIGNAL - {confidence} confirmations"},
+]
+
+# Threshold names that would shadow an indicator column inside rule expressions
+_THRESHOLD_ALIASES = {'volume_trend': 'volume_trend_threshold'}
+
+@lru_cache(maxsize=None)
+def _compile_rule(expression):
+    return compile(expression, '<scoring rule>', 'eval')
+
+TUNABLE_RULE_FIELDS = ('score', 'buy', 'sell', 'confidence')  # Rule conditions and texts stay in the code
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _check_overrides(thresholds, rules, rule_ids, kind, is_value):
+    """Reject overrides other than values (is_value) for known thresholds and tunable rule fields"""
+    unknown = (set(thresholds) - set(SCORING_THRESHOLDS)) | (set(rules) - set(rule_ids))
+    if unknown:
+        raise ValueError(f"Unknown {kind}: {', '.join(sorted(unknown))}")
+    for rule_id, fields in rules.items():
+        fixed = set(fields) - set(TUNABLE_RULE_FIELDS)
+        if fixed:
+            raise ValueError(f"Rule {rule_id} only allows {', '.join(TUNABLE_RULE_FIELDS)} to be overridden, "
+                             f"not {', '.join(sorted(fixed))}")
+    names = [*thresholds, *(f'{rule_id}.{field}' for rule_id, fields in rules.items() for field in fields)]
+    values = [*thresholds.values(), *(value for fields in rules.values() for value in fields.values())]
+    invalid = [name for name, value in zip(names, values) if not is_value(value)]
+    if invalid:
+        raise ValueError(f"Non-numeric {kind}: {', '.join(invalid)}")
+
+def load_scoring_config(path=None):
+    """Scoring thresholds and rules, with optional overrides from a JSON file
+
+    The file may hold {"thresholds": {name: value}, "rules": {rule_id: {field: value}}},
+    so weights and cutoffs can be tuned without touching the code. Only numbers
+    are accepted, and only for the TUNABLE_RULE_FIELDS of a rule: its `when`
+    expression is evaluated, so it never comes from a file.
+    """
+    thresholds = dict(SCORING_THRESHOLDS)
+    rules = [dict(rule) for rule in SCORING_RULES]
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        rule_overrides = overrides.get('rules', {})
+        _check_overrides(overrides.get('thresholds', {}), rule_overrides, [rule['id'] for rule in rules],
+                         'scoring overrides', _is_number)
+        thresholds.update(overrides.get('thresholds', {}))
+        for rule in rules:
+            rule.update(rule_overrides.get(rule['id'], {}))
+    return thresholds, rules
+
+def _rule_namespace(namespace, thresholds):
+    """Indicator arrays plus the thresholds under the names the rule expressions use"""
+    namespace = dict(namespace)
+    namespace.update({_THRESHOLD_ALIASES.get(name, name): value for name, value in thresholds.items()})
+    return namespace
+
+def _apply_scoring_rules(namespace, thresholds, rules, n_rows, conditions=None):
+    """Run the rules in order over the indicator arrays in `namespace`
+
+    Returns (score, buy_signals, sell_signals, confidence, fired) with `fired`
+    mapping rule id to its mask. `conditions` may supply precomputed masks by
+    rule id. Thresholds and rule weights may be (candidates x 1) columns, which
+    broadcasts every result to (candidates x n_rows).
+    """
+    namespace = _rule_namespace(namespace, thresholds)
+    score = np.zeros(n_rows, dtype=int)
+    buy_signals = np.zeros(n_rows, dtype=int)
+    sell_signals = np.zeros(n_rows, dtype=int)
+    confidence = np.zeros(n_rows, dtype=int)
+    fired = {}
+    group_taken = {}
+    
+    with np.errstate(invalid='ignore'):
+        for rule in rules:
+            condition = conditions.get(rule['id']) if conditions else None
+            if condition is None:
+                namespace.update(buy_signals=buy_signals, sell_signals=sell_signals, confidence=confidence)
+                condition = np.asarray(eval(_compile_rule(rule['when']), {'__builtins__': {}}, namespace), dtype=bool)
+                condition = np.broadcast_to(condition, np.broadcast_shapes(condition.shape, (n_rows,)))
+            
+            taken = group_taken.get(rule['group'], np.zeros(n_rows, dtype=bool))
+            mask = condition & ~taken
+            group_taken[rule['group']] = taken | mask
+            fired[rule['id']] = mask
+            
+            if 'multiply' in rule:
+                score = np.where(mask, np.trunc(score * thresholds[rule['multiply']]), score).astype(int)
+            # Zero weights are skipped: with swept candidates every addition is a full tensor op
+            if np.any(rule.get('score', 0)):
+                score = score + mask * rule['score']
+            if np.any(rule.get('buy', 0)):
+                buy_signals = buy_signals + mask * rule['buy']
+            if np.any(rule.get('sell', 0)):
+                sell_signals = sell_signals + mask * rule['sell']
+            if np.any(rule.get('confidence', 0)):
+                confidence = confidence + mask * rule['confidence']
+    return score, buy_signals, sell_signals, confidence, fired
+
+def evaluate_scoring_rules(table, thresholds=None, rules=None):
+    """Score every row of an indicator table as boolean masks
+
+    Returns (scores, fired): `scores` holds score, buy_signals, sell_signals,
+    confidence, signal_quality and the quality-filter result `passed` per row;
+    `fired` is a rows x rule-id boolean frame used to render signal text later.
+    """
+    thresholds = SCORING_THRESHOLDS if thresholds is None else thresholds
+    rules = SCORING_RULES if rules is None else rules
+    namespace = {column: table[column].to_numpy() for column in table.columns}
+    score, buy_signals, sell_signals, confidence, fired = _apply_scoring_rules(namespace, thresholds, rules,
+                                                                               len(table))
+    fired = pd.DataFrame(fired, index=table.index)
+    signal_quality = buy_signals - sell_signals
+    passed = fired.any(axis=1).to_numpy() & ((signal_quality > 0) | (score >= thresholds['min_score']))
+    scores = pd.DataFrame({
+        'score': score,
+        'buy_signals': buy_signals,
+        'sell_signals': sell_signals,
+        'confidence': confidence,
+        'signal_quality': signal_quality,
+        'passed': passed,
+    }, index=table.index)
+    return scores, fired
+
+def render_signals(row, fired_rules, rules=None):
+    """Signal text for the rules that fired on one row, in rule order"""
+    rules = SCORING_RULES if rules is None else rules
+    return [rule['text'].format(**row) for rule in rules if fired_rules[rule['id']]]
+
+def build_opportunity(row, scores, fired_rules, rules=None):
+    """Opportunity fields for a row that passed the quality filter"""
+    values = dict(row)
+    values.update(scores)
+    return {
+        'price': row['price'],
+        'rsi': row['rsi'],
+        'ma20': row['ma20'],
+        'ma50': row['ma50'],
+        'ma200': row['ma200'],
+        'score': int(scores['score']),
+        'buy_signals': int(scores['buy_signals']),
+        'sell_signals': int(scores['sell_signals']),
+        'confidence': int(scores['confidence']),
+        'signal_quality': int(scores['signal_quality']),
+        'signals': render_signals(values, fired_rules, rules),
+        **indicator_groups(row),
+    }
+
+def score_indicators(row, thresholds=None, rules=None):
+    """Ultimate scoring system over one row of indicators
+
+    Accepts a compute_indicator_table row, a compute_ticker_indicators row or
+    TickerState.indicators(). Returns the opportunity fields, or None when the
+    signals do not pass the quality filter.
+    """
+    scores, fired = evaluate_scoring_rules(pd.DataFrame([row]), thresholds, rules)
+    scores = scores.iloc[0]
+    if not scores['passed']:
+        return None
+    return build_opportunity(row, scores, fired.iloc[0], rules)
+
+# Columnar opportunity records: one structured-array row per opportunity
+_RESULT_FIELDS = ([('ticker', 'U12'), ('company_name', 'U64')]
+                  + [(field, 'f8') for field in ('price', 'rsi', 'ma20', 'ma50', 'ma200')]
+                  + [(field, 'i4') for field in ('score', 'buy_signals', 'sell_signals', 'confidence',
+                                                 'signal_quality')])
+for _group, _fields in INDICATOR_GROUPS.items():
+    _RESULT_FIELDS.append((f'{_group[:-5]}_valid', '?'))
+    _RESULT_FIELDS.extend((field, '?' if field in _BOOLEAN_FIELDS else 'f8') for field in _fields)
+RESULT_DTYPE = np.dtype(_RESULT_FIELDS + [('details', 'O')])  # details: optional per-row extras
+
+class ResultRow:
+    """Read-only view of one ResultTable row, indexable like an opportunity dict"""
+    __slots__ = ('table', 'position')
+    
+    def __init__(self, table, position):
+        self.table = table
+        self.position = position
+    
+    def __getitem__(self, key):
+        return self.table.value(self.position, key)
+    
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        details = self.table.records['details'][self.position] or {}
+        return (['ticker', 'company_name', 'price', 'rsi', 'ma20', 'ma50', 'ma200', 'score', 'buy_signals',
+                 'sell_signals', 'confidence', 'signal_quality', 'signals'] + list(INDICATOR_GROUPS) + list(details))
+    
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+class ResultTable:
+    """Opportunities stored column-wise in a structured array
+
+    Sorting and tier bucketing are array operations. Rows are read through
+    ResultRow views, and signal text is only rendered for rows whose 'signals'
+    are actually read (printed or emailed), from the stored fired-rule mask.
+    """
+    
+    def __init__(self, records, fired, rules):
+        self.records = records
+        self.fired = fired  # rows x rules boolean matrix
+        self.rules = rules
+        self._signals = {}
+    
+    @classmethod
+    def from_scores(cls, table, scores, fired, company_names=None, rules=None, details=None):
+        """Records for every row of an indicator table (indexed by ticker) with its scores and fired rules"""
+        company_names = COMPANY_NAMES if company_names is None else company_names
+        rules = SCORING_RULES if rules is None else rules
+        records = np.zeros(len(table), dtype=RESULT_DTYPE)
+        records['ticker'] = table.index
+        records['company_name'] = [company_names.get(ticker, 'Unknown Company') for ticker in table.index]
+        for name in RESULT_DTYPE.names[2:-1]:
+            source = scores if name in scores else table
+            records[name] = source[name].to_numpy()
+        records['details'] = details if details is not None else None
+        fired_matrix = np.asarray(fired[[rule['id'] for rule in rules]].to_numpy(), dtype=bool).reshape(len(table), len(rules))
+        return cls(records, fired_matrix, rules)
+    
+    @classmethod
+    def concat(cls, tables, rules=None):
+        tables = list(tables)
+        rules = tables[0].rules if tables else (SCORING_RULES if rules is None else rules)
+        if not tables:
+            return cls(np.zeros(0, dtype=RESULT_DTYPE), np.zeros((0, len(rules)), dtype=bool), rules)
+        return cls(np.concatenate([table.records for table in tables]),
+                   np.concatenate([table.fired for table in tables]), rules)
+    
+    def take(self, indices):
+        subset = ResultTable(self.records[indices], self.fired[indices], self.rules)
+        rendered = np.arange(len(self.records))[indices]
+        subset._signals = {i: self._signals[old] for i, old in enumerate(rendered) if old in self._signals}
+        return subset
+    
+    def sorted(self):
+        """Rows by descending (score, confidence), ties kept in their current order"""
+        return self.take(np.lexsort((-self.records['confidence'], -self.records['score'])))
+    
+    def tiers(self, thresholds=None):
+        """(ultimate, premium, good) sub-tables by the tier score cutoffs"""
+        thresholds = SCORING_THRESHOLDS if thresholds is None else thresholds
+        score = self.records['score']
+        ultimate, premium, good = (thresholds['ultimate_score'], thresholds['premium_score'],
+                                   thresholds['good_score'])
+        return (self.take(np.flatnonzero(score >= ultimate)),
+                self.take(np.flatnonzero((score >= premium) & (score < ultimate))),
+                self.take(np.flatnonzero((score >= good) & (score < premium))))
+    
+    @staticmethod
+    def tier_ranges(thresholds=None):
+        """Score ranges of the (ultimate, premium, good) tiers as heading text, e.g. ('≥ 12', '8-11', '4-7')"""
+        thresholds = SCORING_THRESHOLDS if thresholds is None else thresholds
+        ultimate, premium, good = (int(np.ceil(thresholds[name]))  # Scores are whole points
+                                   for name in ('ultimate_score', 'premium_score', 'good_score'))
+        
+        def span(low, stop):
+            return f"{low}-{stop - 1}" if stop - 1 > low else f"{low}"
+        return f"≥ {ultimate}", span(premium, ultimate), span(good, premium)
+    
+    def value(self, position, key):
+        records = self.records
+        if key == 'signals':
+            if position not in self._signals:
+                values = dict(zip(RESULT_DTYPE.names[:-1], records[position].item()[:-1]))
+                fired = dict(zip((rule['id'] for rule in self.rules), self.fired[position]))
+                with METRICS.timer('render'):
+                    self._signals[position] = render_signals(values, fired, self.rules)
+            return self._signals[position]
+        if key in INDICATOR_GROUPS:
+            if not records[f'{key[:-5]}_valid'][position]:
+                return None
+            return {field: records[field][position].item() for field in INDICATOR_GROUPS[key]}
+        if key in RESULT_DTYPE.names and key != 'details':
+            return records[key][position].item()
+        details = records['details'][position]
+        if details is None or key not in details:
+            raise KeyError(key)
+        return details[key]
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return ResultRow(self, range(len(self))[index])
+        return self.take(np.arange(len(self))[index])
+    
+    def __iter__(self):
+        return (ResultRow(self, position) for position in range(len(self)))
+    
+    def __add__(self, other):
+        return ResultTable.concat([self, other])
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how fast the fetch workers hit the provider"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens=1):
+        """Take tokens, sleeping until the bucket has refilled enough to cover them"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Requests larger than the bucket go into debt and wait it off
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+def fetch_pipeline(stock_list, fetch_chunk, workers=4, chunk_size=10, rate_limit=10.0, burst=20):
+    """Fetch chunks of tickers on a bounded worker pool, yielding them as they complete
+
+    Every chunk takes one token per ticker from a shared TokenBucket before it
+    is requested. Finished chunks are handed to the caller (the compute stage)
+    through a queue, so indicators for one chunk are computed while the next
+    ones are still downloading. Yields (chunk, bulk frame, missing tickers).
+    A rate_limit of None disables throttling (local backends).
+    """
+    bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+    finished = queue.Queue()
+    chunks = [stock_list[i:i + chunk_size] for i in range(0, len(stock_list), chunk_size)]
+    
+    def fetch(chunk):
+        try:
+            if bucket:
+                with METRICS.timer('rate_limit_wait'):
+                    bucket.acquire(len(chunk))
+            with METRICS.timer('fetch_chunk'):
+                bulk_data, missing = fetch_chunk(chunk)
+        except Exception as e:
+            METRICS.count('fetch_errors', source='pipeline')
+            print(f"Error fetching data for {', '.join(chunk)}: {e}")
+            bulk_data, missing = pd.DataFrame(), list(chunk)
+        finished.put((chunk, bulk_data, missing))
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in chunks:
+            executor.submit(fetch, chunk)
+        for _ in chunks:
+            yield finished.get()
+
+def fetch_universe(stock_list, provider, period="1y", interval="1d", workers=4, rate_limit=10.0):
+    """Whole-universe (ticker, field) frame through fetch_pipeline (empty when nothing came back)"""
+    fetch_chunk = partial(provider.fetch_chunk, period=period, interval=interval)
+    frames = [bulk_data for _, bulk_data, _ in fetch_pipeline(stock_list, fetch_chunk, workers=workers,
+                                                             rate_limit=rate_limit if provider.rate_limited else None)
+              if not bulk_data.empty]
+    return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+def score_universe(bulk_data, tickers, thresholds=None, rules=None):
+    """Indicator table plus rule scores for every ticker with data"""
+    with METRICS.timer('price_matrix'):
+        _, present, prices = build_price_matrix(bulk_data, tickers, VALIDATION_FIELDS)
+    prices, eligible = validate_prices(prices)
+    table = compute_indicator_table(prices['Close'], prices['High'], prices['Low'],
+                                    prices['Volume'], present, eligible)
+    with METRICS.timer('scoring'):
+        scores, fired = evaluate_scoring_rules(table, thresholds, rules)
+    return table, scores, fired
+
+def _score_shard(shm_name, shape, start, stop, tickers, eligible, thresholds, rules):
+    """Process-pool worker: score columns start:stop of the shared price block"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        prices = np.ndarray(shape, dtype='f8', buffer=shm.buf)
+        close, high, low, volume = np.array(prices[:, :, start:stop])  # Copy out so the block can be closed
+        del prices
+    finally:
+        shm.close()
+    table = compute_indicator_table(close, high, low, volume, tickers, eligible)
+    scores, fired = evaluate_scoring_rules(table, thresholds, rules)
+    return table, scores, fired
+
+def score_universe_sharded(bulk_data, tickers, processes=None, thresholds=None, rules=None):
+    """score_universe split across a ProcessPoolExecutor
+
+    The Close/High/Low/Volume matrices are written once into a shared memory
+    block; each worker maps it and scores its own slice of tickers, so no
+    DataFrames are pickled on the way in. Returns the same (table, scores,
+    fired) frames as score_universe.
+    """
+    _, present, prices = build_price_matrix(bulk_data, tickers, VALIDATION_FIELDS)
+    processes = processes or os.cpu_count() or 1
+    if len(present) < 2 * processes:
+        return score_universe(bulk_data, tickers, thresholds, rules)
+    
+    prices, eligible = validate_prices(prices)
+    fields = ('Close', 'High', 'Low', 'Volume')
+    shape = (len(fields),) + prices['Close'].shape
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    try:
+        block = np.ndarray(shape, dtype='f8', buffer=shm.buf)
+        for i, field in enumerate(fields):
+            block[i] = prices[field]
+        del block
+        
+        bounds = np.linspace(0, len(present), processes + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_score_shard, shm.name, shape, start, stop, present[start:stop],
+                                       eligible[start:stop], thresholds, rules)
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+            shards = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+    
+    return tuple(pd.concat(parts) for parts in zip(*shards))
+
+def analyze_stocks(stock_list, use_cache=True, workers=4, rate_limit=10.0, provider=None, timeout=30.0,
+                   processes=1, company_names=None, store=None, run_date=None, period="1y", interval="1d",
+                   correlations=None):
+    """Ultimate stock analysis with all indicators
+
+    Downloads run on a pool of `workers` threads (at most `rate_limit` tickers
+    per second) while the chunks already fetched are scored; the result order
+    only depends on stock_list, never on which download finished first.
+    Each chunk's tickers are awaited concurrently from `provider` (the cached
+    yfinance backend by default), every request bounded by `timeout` seconds.
+    With processes > 1 the whole universe is fetched first and the scoring is
+    sharded across a process pool (see score_universe_sharded).
+    Every scored ticker is saved to `store` under `run_date` when a
+    SnapshotStore is given, and the fetched closes roll `correlations` (a
+    RollingCorrelation) forward.
+    """
+    company_names = COMPANY_NAMES if company_names is None else company_names
+    found = []
+    snapshots = [np.zeros(0, dtype=SNAPSHOT_DTYPE)]
+    total_stocks = len(stock_list)
+    position = {ticker: i for i, ticker in enumerate(stock_list, 1)}
+    
+    print(f"\n🚀 ULTIMATE STOCK ANALYZER")
+    print(f"📊 Analyzing {total_stocks} NASDAQ-100 stocks with advanced indicators...")
+    print("🔍 Indicators: RSI, MACD, Bollinger Bands, Support/Resistance, Volume, Momentum")
+    print("=" * 80)
+    
+    # Chunked downloads, topped up incrementally from the on-disk cache when it is enabled
+    if provider is None:
+        provider = default_provider(use_cache)
+    fetch_chunk = partial(provider.fetch_chunk, period=period, interval=interval, timeout=timeout)
+    if not provider.rate_limited:
+        rate_limit = None
+    thresholds, rules = load_scoring_config(os.environ.get('SCORING_CONFIG'))
+    missing = []
+    closes = []
+    
+    def scored_chunks():
+        pipeline = fetch_pipeline(stock_list, fetch_chunk, workers=workers, rate_limit=rate_limit)
+        if processes > 1:
+            frames = []
+            for _, bulk_data, chunk_missing in pipeline:
+                missing.extend(chunk_missing)
+                if not bulk_data.empty:
+                    frames.append(bulk_data)
+            bulk_data = pd.concat(frames, axis=1) if frames else pd.DataFrame()
+            if not bulk_data.empty:
+                closes.append(bulk_data.xs('Close', axis=1, level=1))
+            yield stock_list, score_universe_sharded(bulk_data, stock_list, processes, thresholds, rules)
+            return
+        for chunk, bulk_data, chunk_missing in pipeline:
+            missing.extend(chunk_missing)
+            if not bulk_data.empty:
+                closes.append(bulk_data.xs('Close', axis=1, level=1))
+            # Calculate all technical indicators and scores for the chunk in one pass
+            yield chunk, score_universe(bulk_data, chunk, thresholds, rules)
+    
+    for chunk, (table, scores, fired) in scored_chunks():
+        passed = scores['passed'].to_numpy(dtype=bool)
+        found.append(ResultTable.from_scores(table[passed], scores[passed], fired[passed], company_names, rules))
+        snapshots.append(snapshot_records(table, scores))
+        for ticker in chunk:
+            try:
+                company_name = company_names.get(ticker, 'Unknown Company')
+                print(f"[{position[ticker]:3d}/{total_stocks}] {ticker:5s} - {company_name[:35]:35s} ", end='')
+                
+                if ticker in table.index:
+                    if scores.at[ticker, 'passed']:
+                        print("🎯 OPPORTUNITY DETECTED!")
+                    else:
+                        print("⚪ No clear signal")
+                else:
+                    METRICS.count('no_data')
+                    print("❌ No data")
+                    
+            except Exception as e:
+                METRICS.count('ticker_errors')
+                print(f"❌ Error: {str(e)[:30]}...")
+                continue
+    
+    if missing:
+        print(f"⚠️  No data returned for {len(missing)} tickers: {', '.join(missing)}")
+    
+    if store is not None:
+        records = np.concatenate(snapshots)
+        if len(records) >= max(1, SNAPSHOT_MIN_COVERAGE * total_stocks):
+            store.save(run_date or _market_date(), records)
+        else:
+            # A partial run would show up as every missing opportunity dropping out of the next delta
+            print(f"⚠️  Snapshot not saved: only {len(records)} of {total_stocks} tickers were scored")
+    if correlations is not None and closes:
+        correlations.update(pd.concat(closes, axis=1))
+    
+    # Deterministic order regardless of download completion order
+    results = ResultTable.concat(found, rules)
+    return results.take(np.argsort([position[ticker] for ticker in results.records['ticker']], kind='stable'))
+
+# Multi-timeframe mode: the finest interval is downloaded once and every coarser
+# timeframe is resampled from it in memory. Rules are (pandas rule, bin offset);
+# hourly bins start at :30 like Yahoo's market-hours bars.
+TIMEFRAME_RULES = {
+    '1m': ('1min', None),
+    '5m': ('5min', None),
+    '15m': ('15min', None),
+    '30m': ('30min', None),
+    '1h': ('60min', '30min'),
+    '1d': ('1D', None),
+}
+# Longest history Yahoo serves for each fine interval
+FINE_PERIODS = {'1m': '7d', '5m': '60d', '15m': '60d', '30m': '60d', '1h': '730d', '1d': '1y'}
+_RESAMPLE_AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                         'Volume': 'sum', 'Dividends': 'sum', 'Stock Splits': 'max'}
+
+def _timeframe_length(timeframe):
+    return pd.Timedelta(TIMEFRAME_RULES[timeframe][0])
+
+def resample_ohlcv(data, timeframe):
+    """Aggregate finer OHLCV bars into `timeframe` bars (empty bins dropped)"""
+    rule, offset = TIMEFRAME_RULES[timeframe]
+    aggregation = {field: how for field, how in _RESAMPLE_AGGREGATION.items() if field in data}
+    bars = data.resample(rule, offset=offset, label='left', closed='left').agg(aggregation)
+    return bars.loc[bars['Close'].notna()]
+
+class ResampleCache:
+    """Per-ticker coarse bars, re-aggregated only from the last (possibly still open) bar
+
+    Assumes the fine history is append-only between calls, which holds for
+    the cached provider; call clear() after the fine data was re-adjusted.
+    Coarse bars outlive the fine download window, up to max_bars per series.
+    """
+    
+    def __init__(self, max_bars=500):
+        self.max_bars = max_bars
+        self.bars = {}
+    
+    def resample(self, ticker, data, timeframe):
+        key = (ticker, timeframe)
+        cached = self.bars.get(key)
+        if cached is not None and len(cached) and data.index[0] <= cached.index[-1]:
+            last_open = cached.index[-1]
+            fresh = resample_ohlcv(data.loc[data.index >= last_open], timeframe)
+            bars = pd.concat([cached.loc[cached.index < last_open], fresh])
+        else:
+            bars = resample_ohlcv(data, timeframe)
+        bars = bars.iloc[-self.max_bars:]
+        self.bars[key] = bars
+        return bars
+    
+    def clear(self, ticker=None):
+        if ticker is None:
+            self.bars.clear()
+        else:
+            for key in [key for key in self.bars if key[0] == ticker]:
+                del self.bars[key]
+
+RESAMPLE_CACHE = ResampleCache()
+
+def analyze_timeframes(stock_list, timeframes=('5m', '1h', '1d'), provider=None, workers=4, rate_limit=10.0,
+                       timeout=30.0, company_names=None, cache=None):
+    """Score every ticker on several timeframes from one fine-grained download
+
+    Only the finest timeframe is fetched, so download volume does not grow
+    with the number of timeframes; the coarser bars come from `cache`.
+    A ticker is an opportunity when any timeframe passes the quality filter.
+    Its ResultTable row holds the best-scoring passing timeframe, with
+    'timeframe', the per-timeframe scores under 'timeframes' and
+    'timeframe_confidence' (share of timeframes with a buy majority) as details.
+    """
+    company_names = COMPANY_NAMES if company_names is None else company_names
+    cache = RESAMPLE_CACHE if cache is None else cache
+    unknown = set(timeframes) - set(TIMEFRAME_RULES)
+    if unknown:
+        raise ValueError(f"Unsupported timeframes: {', '.join(sorted(unknown))}")
+    timeframes = sorted(dict.fromkeys(timeframes), key=_timeframe_length)
+    finest = timeframes[0]
+    provider = provider or default_provider()
+    fetch_chunk = partial(provider.fetch_chunk, period=FINE_PERIODS[finest], interval=finest, timeout=timeout)
+    thresholds, rules = load_scoring_config(os.environ.get('SCORING_CONFIG'))
+    found = []
+    missing = []
+    total_stocks = len(stock_list)
+    position = {ticker: i for i, ticker in enumerate(stock_list, 1)}
+    
+    print(f"\n🚀 MULTI-TIMEFRAME ANALYZER ({', '.join(timeframes)} from {finest} bars)")
+    print("=" * 80)
+    
+    for chunk, bulk_data, chunk_missing in fetch_pipeline(stock_list, fetch_chunk, workers=workers,
+                                                          rate_limit=rate_limit if provider.rate_limited else None):
+        missing.extend(chunk_missing)
+        fine = {}
+        for ticker in chunk:
+            ticker_data = extract_ticker_data(bulk_data, ticker)
+            if ticker_data is not None:
+                fine[ticker] = ticker_data
+        
+        scored = {}
+        for timeframe in timeframes:
+            with METRICS.timer('resample'):
+                bars = {ticker: data if timeframe == finest else cache.resample(ticker, data, timeframe)
+                        for ticker, data in fine.items()}
+            frame = pd.concat(bars, axis=1) if bars else pd.DataFrame()
+            scored[timeframe] = score_universe(frame, chunk, thresholds, rules)
+        
+        best_rows = {'table': [], 'scores': [], 'fired': [], 'details': []}
+        for ticker in chunk:
+            company_name = company_names.get(ticker, 'Unknown Company')
+            print(f"[{position[ticker]:3d}/{total_stocks}] {ticker:5s} - {company_name[:30]:30s} ", end='')
+            summary = {}
+            for timeframe, (table, scores, fired) in scored.items():
+                if ticker in table.index:
+                    row = scores.loc[ticker]
+                    summary[timeframe] = {
+                        'score': int(row['score']),
+                        'buy_signals': int(row['buy_signals']),
+                        'sell_signals': int(row['sell_signals']),
+                        'confidence': int(row['confidence']),
+                        'passed': bool(row['passed']),
+                    }
+            if not summary:
+                METRICS.count('no_data')
+                print("❌ No data")
+                continue
+            
+            print(' '.join(f"{timeframe}:{values['score']:+d}" for timeframe, values in summary.items()), end=' ')
+            passing = [timeframe for timeframe, values in summary.items() if values['passed']]
+            if not passing:
+                print("⚪")
+                continue
+            
+            best = max(passing, key=lambda timeframe: (summary[timeframe]['score'], _timeframe_length(timeframe)))
+            bullish = sum(values['buy_signals'] > values['sell_signals'] for values in summary.values())
+            for part, frame in zip(('table', 'scores', 'fired'), scored[best]):
+                best_rows[part].append(frame.loc[ticker])
+            best_rows['details'].append({
+                'timeframe': best,
+                'timeframes': summary,
+                'timeframe_confidence': bullish / len(timeframes),
+            })
+            print(f"🎯 {best}")
+        
+        if best_rows['details']:
+            found.append(ResultTable.from_scores(pd.DataFrame(best_rows['table']), pd.DataFrame(best_rows['scores']),
+                                                 pd.DataFrame(best_rows['fired']), company_names, rules,
+                                                 best_rows['details']))
+    
+    if missing:
+        print(f"⚠️  No data returned for {len(missing)} tickers: {', '.join(missing)}")
+    results = ResultTable.concat(found, rules)
+    return results.take(np.argsort([position[ticker] for ticker in results.records['ticker']], kind='stable'))
+
+# Run-to-run snapshots: every ticker's scores from a run, one .npy partition per date
+SNAPSHOT_DIR = os.environ.get('STOCK_SNAPSHOT_DIR', '.snapshots')
+SNAPSHOT_DTYPE = np.dtype([('ticker', 'U12'), ('price', 'f8'), ('rsi', 'f8'), ('score', 'i4'),
+                           ('buy_signals', 'i4'), ('sell_signals', 'i4'), ('confidence', 'i4'),
+                           ('passed', '?'), ('cross', 'U12')])
+SNAPSHOT_MIN_COVERAGE = 0.5  # Runs scoring less of the universe (provider outage) are not stored
+
+def _market_date():
+    return pd.Timestamp.now(tz=CACHE_TIMEZONE).strftime('%Y-%m-%d')
+
+def snapshot_records(table, scores):
+    """Compact snapshot rows for every ticker of an indicator table and its scores"""
+    records = np.zeros(len(table), dtype=SNAPSHOT_DTYPE)
+    records['ticker'] = table.index
+    records['price'] = table['price'].to_numpy()
+    records['rsi'] = table['rsi'].to_numpy()
+    for name in ('score', 'buy_signals', 'sell_signals', 'confidence', 'passed'):
+        records[name] = scores[name].to_numpy()
+    records['cross'] = [cross or '' for cross in table['cross']]
+    return records
+
+class SnapshotStore:
+    """Append-only store of scored runs, partitioned by date
+
+    Each partition is sorted by ticker, so a (date, ticker) lookup is one file
+    name plus a binary search, and signal history is read back without
+    recomputing any indicators. Re-running on the same date replaces that
+    date's partition.
+    """
+    
+    def __init__(self, directory=None):
+        self.directory = directory or SNAPSHOT_DIR
+        self.saved = []  # Dates written through this store
+    
+    def _path(self, date):
+        return os.path.join(self.directory, f"{date}.npy")
+    
+    def save(self, date, records):
+        os.makedirs(self.directory, exist_ok=True)
+        records = np.sort(np.asarray(records, dtype=SNAPSHOT_DTYPE), order='ticker')
+        path = self._path(date)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp_path, path)
+        self.saved.append(date)
+    
+    def dates(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.directory) if name.endswith('.npy'))
+    
+    def load(self, date):
+        path = self._path(date)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=SNAPSHOT_DTYPE)
+        return np.load(path, mmap_mode='r')
+    
+    def previous(self, date):
+        """Latest stored date before `date` (None on the first run)"""
+        earlier = [stored for stored in self.dates() if stored < date]
+        return earlier[-1] if earlier else None
+    
+    def lookup(self, date, ticker):
+        records = self.load(date)
+        i = np.searchsorted(records['ticker'], ticker)
+        if i < len(records) and records['ticker'][i] == ticker:
+            return records[i]
+        return None
+    
+    def history(self, ticker):
+        """One ticker's stored rows across every date"""
+        rows = {}
+        for date in self.dates():
+            record = self.lookup(date, ticker)
+            if record is not None:
+                rows[date] = dict(zip(SNAPSHOT_DTYPE.names[1:], record.item()[1:]))
+        return pd.DataFrame.from_dict(rows, orient='index')
+    
+    def delta(self, date, previous=None):
+        """What changed since the previous run, as a keyed join on ticker
+
+        Returns a dict with the two dates and frames of new and dropped
+        opportunities, score changes and newly triggered crosses.
+        """
+        previous = previous or self.previous(date)
+        current = pd.DataFrame(np.asarray(self.load(date))).set_index('ticker')
+        prior = pd.DataFrame(np.asarray(self.load(previous) if previous else
+                                        np.zeros(0, dtype=SNAPSHOT_DTYPE))).set_index('ticker')
+        joined = current.join(prior, how='outer', rsuffix='_prev')
+        
+        listed = joined['score'].notna()
+        listed_before = joined['score_prev'].notna()
+        passed = joined['passed'].fillna(False).astype(bool)
+        passed_before = joined['passed_prev'].fillna(False).astype(bool)
+        cross = joined['cross'].fillna('')
+        cross_before = joined['cross_prev'].fillna('')
+        joined['score_delta'] = joined['score'] - joined['score_prev']
+        
+        changed = joined.loc[listed & listed_before & (joined['score_delta'] != 0)]
+        return {
+            'date': date,
+            'previous': previous,
+            'new': joined.loc[passed & ~passed_before].sort_values('score', ascending=False),
+            'dropped': joined.loc[passed_before & ~passed].sort_values('score_prev', ascending=False),
+            'changed': changed.reindex(changed['score_delta'].abs().sort_values(ascending=False).index),
+            'new_crosses': joined.loc[listed & (cross != '') & (cross != cross_before)],
+        }
+
+def format_delta_report(delta, limit=15):
+    """Plain-text "what changed since the last run" report"""
+    if delta['previous'] is None:
+        return f"📋 First snapshot stored for {delta['date']} - no previous run to compare with"
+    lines = [f"📋 CHANGES SINCE {delta['previous']}"]
+    sections = [
+        ('🆕 New opportunities', 'new', lambda t, r: f"{t} - Score {int(r['score'])}"),
+        ('❌ Dropped opportunities', 'dropped', lambda t, r: f"{t} - was Score {int(r['score_prev'])}"),
+        ('📊 Score changes', 'changed',
+         lambda t, r: f"{t} - {int(r['score_prev'])} → {int(r['score'])} ({int(r['score_delta']):+d})"),
+        ('✨ New crosses', 'new_crosses', lambda t, r: f"{t} - {r['cross']}"),
+    ]
+    for title, key, describe in sections:
+        frame = delta[key]
+        lines.append(f"{title} ({len(frame)})")
+        for ticker, row in frame.head(limit).iterrows():
+            lines.append(f"   • {describe(ticker, row)}")
+        if len(frame) > limit:
+            lines.append(f"   • ... plus {len(frame) - limit} more")
+    return '\n'.join(lines)
+
+# Correlated opportunities (GOOG/GOOGL, the semiconductor names...) are the same
+# trade repeated; the ranking keeps the best-scoring name of each correlated cluster.
+CORRELATION_WINDOW = 60
+CORRELATION_THRESHOLD = 0.8
+
+class RollingCorrelation:
+    """Rolling `window`-day return correlations across the whole universe
+
+    Keeps the window's daily log returns (missing sessions count as flat) with
+    their running sums: per-ticker sum and sum of squares plus the cross-product
+    matrix. A new day is a rank-2 update of the cross products (add the new
+    row, drop the oldest), and a revised bar (today's partial session) is
+    replaced the same way, so a daily run costs O(tickers²) instead of
+    O(window x tickers²). The state is cached on disk between runs and rebuilt
+    with blocked matrix products when the universe or history changes. With
+    `persist=False` (replay and offline runs) the cache is read but never
+    written, so old or recorded history cannot replace the live window.
+    """
+    REFIT_EVERY = 250  # Full rebuilds bound the drift of the running sums
+    
+    def __init__(self, window=CORRELATION_WINDOW, path=None, block=512, persist=True):
+        self.window = window
+        self.path = path or os.path.join(CACHE_DIR, f"correlation_{window}d.npz")
+        self.block = block
+        self.persist = persist
+        self.tickers = None
+        self.dates = None
+        self.returns = None
+        self.sum = None
+        self.sum_sq = None
+        self.cross = None
+        self.updates = 0
+        self.load()
+    
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as state:
+                self.tickers, self.dates, self.returns = state['tickers'], state['dates'], state['returns']
+                self.sum, self.sum_sq, self.cross = state['sum'], state['sum_sq'], state['cross']
+                self.updates = int(state['updates'])
+        except (OSError, ValueError, KeyError):
+            METRICS.count('swallowed_exceptions', function='RollingCorrelation.load')
+            self.cross = None
+    
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp.npz'
+        np.savez(tmp_path, tickers=self.tickers, dates=self.dates, returns=self.returns, sum=self.sum,
+                 sum_sq=self.sum_sq, cross=self.cross, updates=self.updates)
+        os.replace(tmp_path, self.path)
+    
+    def fit(self, returns):
+        """Full rebuild from a (days x tickers) return window, in ticker blocks"""
+        self.returns = np.ascontiguousarray(returns, dtype='f8')
+        self.sum = self.returns.sum(axis=0)
+        self.sum_sq = np.einsum('ij,ij->j', self.returns, self.returns)
+        n = self.returns.shape[1]
+        self.cross = np.empty((n, n))
+        for start in range(0, n, self.block):
+            self.cross[start:start + self.block] = self.returns[:, start:start + self.block].T @ self.returns
+        self.updates = 0
+    
+    def _replace(self, position, row):
+        old = self.returns[position]
+        self.cross += np.outer(row, row) - np.outer(old, old)
+        self.sum += row - old
+        self.sum_sq += row * row - old * old
+        self.returns[position] = row
+        self.updates += 1
+    
+    def _roll(self, row):
+        self._replace(0, row)
+        self.returns = np.roll(self.returns, -1, axis=0)
+    
+    def update(self, closes):
+        """Bring the window up to the last date of a (dates x tickers) close frame"""
+        with METRICS.timer('correlation'):
+            closes = closes.sort_index()
+            prices = closes.where(closes > 0).ffill().to_numpy(dtype='f8')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                returns = np.nan_to_num(np.diff(np.log(prices), axis=0))
+            dates = closes.index.asi8[1:]
+            tickers = np.asarray(closes.columns, dtype=str)
+            if len(dates) == 0:
+                return self
+            
+            if not self._advance(returns, dates, tickers):
+                METRICS.count('correlation_refits')
+                self.tickers = tickers
+                self.dates = dates[-self.window:]
+                self.fit(returns[-self.window:])
+            if self.persist:
+                self.save()
+        return self
+    
+    def _advance(self, returns, dates, tickers):
+        """Incremental update from the cached window; False when a rebuild is needed"""
+        if self.cross is None or len(self.dates) != self.window or not np.array_equal(self.tickers, tickers):
+            return False
+        end = np.searchsorted(dates, self.dates[-1])
+        start = end + 1 - self.window
+        if end >= len(dates) or start < 0 or not np.array_equal(dates[start:end + 1], self.dates):
+            return False
+        new_rows = returns[end + 1:]
+        changed = np.flatnonzero((returns[start:end + 1] != self.returns).any(axis=1))
+        if len(changed) > 2 or len(new_rows) >= self.window or self.updates + len(new_rows) > self.REFIT_EVERY:
+            return False
+        for position in changed:
+            self._replace(position, returns[start + position])
+        for row in new_rows:
+            self._roll(row)
+        self.dates = dates[-self.window:]
+        return True
+    
+    def matrix(self, tickers):
+        """(k x k) correlations among `tickers`; unknown or flat tickers correlate 0"""
+        tickers = list(tickers)
+        if self.cross is None:
+            return np.eye(len(tickers))
+        position = {ticker: i for i, ticker in enumerate(self.tickers)}
+        known = np.array([ticker in position for ticker in tickers], dtype=bool)
+        index = np.array([position.get(ticker, 0) for ticker in tickers], dtype=int)
+        count = len(self.returns)
+        mean = self.sum[index] / count
+        variance = self.sum_sq[index] / count - mean * mean
+        covariance = self.cross[np.ix_(index, index)] / count - np.outer(mean, mean)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = covariance / np.sqrt(np.outer(variance, variance))
+        correlation = np.nan_to_num(correlation, nan=0.0, posinf=0.0, neginf=0.0)
+        correlation[~known] = 0.0
+        correlation[:, ~known] = 0.0
+        np.fill_diagonal(correlation, 1.0)
+        return correlation
+
+def deduplicate_correlated(results, correlations, threshold=CORRELATION_THRESHOLD):
+    """Keep the best-ranked name of each correlated cluster
+
+    `results` must already be ranked. Walking down the ranking, a name whose
+    return correlation with an already kept name reaches `threshold` joins
+    that leader's cluster instead of taking a slot; leaders list their
+    followers under the 'correlated' detail. Returns (kept results,
+    {leader: [followers]}).
+    """
+    tickers = [str(ticker) for ticker in results.records['ticker']]
+    correlation = correlations.matrix(tickers)
+    leaders = []
+    followers = defaultdict(list)
+    for position in range(len(tickers)):
+        if leaders:
+            nearest = correlation[position, leaders]
+            best = int(np.argmax(nearest))
+            if nearest[best] >= threshold:
+                followers[leaders[best]].append(tickers[position])
+                continue
+        leaders.append(position)
+    
+    kept = results.take(np.array(leaders, dtype=int))
+    for row, position in enumerate(leaders):
+        if followers[position]:
+            kept.records['details'][row] = {**(kept.records['details'][row] or {}),
+                                            'correlated': followers[position]}
+    return kept, {tickers[position]: names for position, names in followers.items() if names}
+
+# Event-driven alerts: the price levels at which any scoring rule would flip on the
+# next bar are solved ahead of time, so live quotes only trigger a re-score when
+# they cross one of them.
+TRIGGER_HISTORY_BARS = 300  # Covers MA200 plus the EWM warm-up the MACD rules need
+
+def _trigger_tails(prices, partial):
+    """Completed-bar Close/High/Low/Volume histories plus each ticker's unfinished session
+
+    Columns whose last bar is today's partial session (`partial`) are shifted
+    down one row, so the hypothetical next bar replaces that session instead
+    of being stacked after it. tails['session'] keeps the partial bar's
+    High/Low/Volume (NaN for the other tickers).
+    """
+    tails = {}
+    for field in ('Close', 'High', 'Low', 'Volume'):
+        completed = prices[field].copy()
+        completed[1:, partial] = prices[field][:-1, partial]
+        completed[0, partial] = np.nan
+        tails[field] = completed[-TRIGGER_HISTORY_BARS:]
+    tails['session'] = {field: np.where(partial, prices[field][-1], np.nan)
+                        for field in ('High', 'Low', 'Volume')}
+    return tails
+
+def _next_bar_table(tails, columns, prices):
+    """Indicator table for hypothetical next bars closing at `prices`
+
+    tails comes from _trigger_tails; candidate k extends column columns[k] by
+    a bar closing at prices[k]. A ticker in an unfinished session keeps that
+    session's range and volume; otherwise high = low = close and the volume
+    is the last bar's.
+    """
+    def extend(field, new_row):
+        return np.vstack([tails[field][:, columns], new_row[None, :]])
+    
+    session = tails['session']
+    high = np.fmax(session['High'][columns], prices)
+    low = np.fmin(session['Low'][columns], prices)
+    volume = session['Volume'][columns]
+    volume = np.where(np.isnan(volume), tails['Volume'][-1, columns], volume)
+    return compute_indicator_table(extend('Close', prices), extend('High', high), extend('Low', low),
+                                   extend('Volume', volume), np.arange(len(prices)))
+
+def _next_bar_fired(tails, columns, prices, thresholds, rules, block=8192):
+    """Fired-rule masks (candidates x rules) for hypothetical next bars, in column blocks"""
+    fired = np.zeros((len(prices), len(rules)), dtype=bool)
+    rule_ids = [rule['id'] for rule in rules]
+    for offset in range(0, len(prices), block):
+        part = slice(offset, offset + block)
+        table = _next_bar_table(tails, columns[part], prices[part])
+        _, part_fired = evaluate_scoring_rules(table, thresholds, rules)
+        fired[part] = part_fired[rule_ids].to_numpy(dtype=bool)
+    return fired
+
+class TriggerIndex:
+    """Every ticker's trigger levels in one sorted array, for O(log n) quote checks
+
+    Ticker i's levels are keyed into [i, i + 1) by their log distance from the
+    reference (last close) price, so a whole batch of quotes is located with a
+    single np.searchsorted. A quote that lands in a different gap between
+    levels than the last checked price has crossed a trigger.
+    """
+    LOG_RANGE = np.log(4.0)  # Quotes beyond half / double the reference clip to the ends
+    
+    def __init__(self, tickers, reference, ticker_ids, levels):
+        self.tickers = list(tickers)
+        self.position = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.reference = np.asarray(reference, dtype='f8')
+        ticker_ids = np.asarray(ticker_ids, dtype=int)
+        levels = np.asarray(levels, dtype='f8')
+        keys = self._keys(ticker_ids, levels)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.levels = levels[order]
+        self.ticker_ids = ticker_ids[order]
+        self.buckets = self._bucket(np.arange(len(self.tickers)), self.reference)
+    
+    def _keys(self, ticker_ids, prices):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            offset = np.log(prices / self.reference[ticker_ids]) / self.LOG_RANGE + 0.5
+        return ticker_ids + np.clip(np.nan_to_num(offset, nan=0.5), 0.0, 1 - 1e-12)
+    
+    def _bucket(self, ticker_ids, prices):
+        return np.searchsorted(self.keys, self._keys(ticker_ids, prices), side='right')
+    
+    def levels_for(self, ticker):
+        return self.levels[self.ticker_ids == self.position[ticker]]
+    
+    def crossed(self, quotes):
+        """Tickers whose quote crossed a level since the last check (their position is updated)"""
+        tickers = [ticker for ticker in quotes if ticker in self.position]
+        if not tickers:
+            return []
+        ticker_ids = np.array([self.position[ticker] for ticker in tickers])
+        buckets = self._bucket(ticker_ids, np.array([quotes[ticker] for ticker in tickers], dtype='f8'))
+        moved = buckets != self.buckets[ticker_ids]
+        self.buckets[ticker_ids[moved]] = buckets[moved]
+        return [tickers[i] for i in np.flatnonzero(moved)]
+    
+    def __len__(self):
+        return len(self.levels)
+
+def _last_bar_dates(bulk_data, tickers):
+    """'YYYY-MM-DD' market date of each ticker's last bar"""
+    fields = ('Open', 'High', 'Low', 'Close', 'Volume')
+    dates, present, prices = build_price_matrix(bulk_data, tickers, fields, align='dates')
+    if not present:
+        return np.zeros(0, dtype=str)
+    has_bar = np.zeros(prices['Close'].shape, dtype=bool)
+    for values in prices.values():
+        has_bar |= ~np.isnan(values)
+    last_row = len(dates) - 1 - np.argmax(has_bar[::-1], axis=0)
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_convert(CACHE_TIMEZONE)
+    return np.asarray(dates.strftime('%Y-%m-%d'))[last_row]
+
+def build_trigger_index(bulk_data, tickers, thresholds=None, rules=None, span=0.15, grid=33, iterations=8,
+                        session=None):
+    """Solve the next-bar prices at which any rule flips, for every ticker
+
+    The rules are evaluated on a geometric grid of `grid` candidate closes
+    within +/-`span` of each ticker's last close. Every grid interval where
+    the fired-rule set changes is then narrowed by vectorized bisection, all
+    intervals at once. Two flips inside one grid interval show up as one
+    level. A ticker whose last bar belongs to `session` (today's market date
+    by default) is still trading, so its next bar replaces that one. Returns
+    (TriggerIndex, tails), where tails are the price histories used for
+    re-scoring.
+    """
+    thresholds = SCORING_THRESHOLDS if thresholds is None else thresholds
+    rules = SCORING_RULES if rules is None else rules
+    _, present, prices = build_price_matrix(bulk_data, tickers)
+    partial = _last_bar_dates(bulk_data, present) == (session or _market_date())
+    tails = _trigger_tails(prices, partial) if len(present) else {}
+    reference = prices['Close'][-1] if len(present) else np.zeros(0)
+    usable = np.flatnonzero(np.isfinite(reference) & (reference > 0))
+    
+    factors = np.geomspace(1 - span, 1 + span, grid)
+    columns = np.repeat(usable, grid)
+    candidates = (reference[usable, None] * factors).ravel()
+    fired = _next_bar_fired(tails, columns, candidates, thresholds, rules).reshape(len(usable), grid, -1)
+    
+    rows, steps = np.nonzero((fired[:, 1:] != fired[:, :-1]).any(axis=2))
+    low = reference[usable[rows]] * factors[steps]
+    high = reference[usable[rows]] * factors[steps + 1]
+    fired_low = fired[rows, steps]
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        same = (_next_bar_fired(tails, usable[rows], middle, thresholds, rules) == fired_low).all(axis=1)
+        low = np.where(same, middle, low)
+        high = np.where(same, high, middle)
+    
+    return TriggerIndex(present, reference, usable[rows], (low + high) / 2), tails
+
+def _yfinance_quotes(tickers, chunk_size=25, rate_limit=10.0):
+    """Latest one-minute close per ticker, in bulk requests throttled by fetch_pipeline"""
+    fetch_chunk = partial(fetch_bulk_data, period='1d', interval='1m', chunk_size=chunk_size, max_retries=1)
+    quotes = {}
+    for chunk, bulk_data, _ in fetch_pipeline(list(tickers), fetch_chunk, chunk_size=chunk_size,
+                                              rate_limit=rate_limit):
+        for ticker in chunk:
+            ticker_data = extract_ticker_data(bulk_data, ticker)
+            if ticker_data is not None and ticker_data['Close'].notna().any():
+                quotes[ticker] = ticker_data['Close'].dropna().iloc[-1]
+    return quotes
+
+def watch(stock_list, quote_source=None, interval=60, iterations=None, provider=None, company_names=None):
+    """Continuous alert mode: re-score only the tickers whose quote crossed a trigger level
+
+    quote_source(tickers) returns {ticker: last price} (one-minute yfinance
+    bars by default). Each crossing is re-scored exactly, as a next bar
+    closing at the quote, and announced. When the market date changes the
+    daily bars are fetched again and the trigger levels rebuilt. Returns the
+    alerts raised.
+    """
+    company_names = COMPANY_NAMES if company_names is None else company_names
+    provider = provider or default_provider()
+    quote_source = quote_source or _yfinance_quotes
+    thresholds, rules = load_scoring_config(os.environ.get('SCORING_CONFIG'))
+    
+    def prepare(session):
+        bulk_data = fetch_universe(stock_list, provider)
+        started = time.perf_counter()
+        index, tails = build_trigger_index(bulk_data, stock_list, thresholds, rules, session=session)
+        _, scores, _ = score_universe(bulk_data, stock_list, thresholds, rules)
+        print(f"👀 Watching {len(index.tickers)} stocks - {len(index)} trigger levels for {session} "
+              f"({time.perf_counter() - started:.1f}s to precompute)")
+        return index, tails, scores['score'].to_dict()
+    
+    session = _market_date()
+    index, tails, last_score = prepare(session)
+    alerts = []
+    rounds = 0
+    while iterations is None or rounds < iterations:
+        today = _market_date()
+        if today != session:
+            # A new session: yesterday's bar is final and every level was solved against it
+            session = today
+            index, tails, last_score = prepare(session)
+        quotes = quote_source(index.tickers)
+        crossed = index.crossed(quotes)
+        if crossed:
+            columns = np.array([index.position[ticker] for ticker in crossed])
+            prices = np.array([quotes[ticker] for ticker in crossed], dtype='f8')
+            table = _next_bar_table(tails, columns, prices)
+            table.index = pd.Index(crossed, name='ticker')
+            scores, fired = evaluate_scoring_rules(table, thresholds, rules)
+            results = ResultTable.from_scores(table, scores, fired, company_names, rules)
+            for result in results:
+                ticker = result['ticker']
+                passed = bool(scores.at[ticker, 'passed'])
+                print(f"🔔 {ticker:5s} ${result['price']:.2f} crossed a trigger - "
+                      f"score {last_score.get(ticker, 0)} → {result['score']}{' 🎯' if passed else ''}")
+                if passed:
+                    for signal in result['signals'][:4]:
+                        print(f"      • {signal}")
+                last_score[ticker] = result['score']
+                alerts.append({'ticker': ticker, 'price': result['price'], 'score': result['score'],
+                               'passed': passed})
+        rounds += 1
+        if iterations is None or rounds < iterations:
+            time.sleep(interval)
+    return alerts
+
+def _bar_history(bulk_data, tickers):
+    """Validated indicator history over each ticker's own bars
+
+    The live scorer right-aligns each ticker's own bars, so a session the
+    ticker has no bar for is skipped rather than treated as a missing close.
+    The history is computed on the same (bars x tickers) layout and mapped
+    back to the union calendar through bar_row, the bar of every (date,
+    ticker) cell (-1 where the ticker has none). Returns (dates, present,
+    close, history, bar_row), with the validated close on the union calendar
+    (NaN where the ticker has no valid close of its own).
+    """
+    dates, present, prices = build_price_matrix(bulk_data, tickers, VALIDATION_FIELDS, align='dates')
+    has_bar = np.zeros(prices['Close'].shape, dtype=bool)
+    for values in prices.values():
+        has_bar |= ~np.isnan(values)
+    counts = has_bar.sum(axis=0)
+    n_bars = int(counts.max()) if len(present) else 0
+    bar_row = np.where(has_bar, np.cumsum(has_bar, axis=0) - 1 + (n_bars - counts), -1)
+    cells = np.nonzero(has_bar)
+    bars = {}
+    for field, values in prices.items():
+        bars[field] = np.full((n_bars, len(present)), np.nan)
+        bars[field][bar_row[cells], cells[1]] = values[cells]
+    
+    listed = bars['Close'] > 0
+    bars, eligible = validate_prices(bars, history=True)
+    history = compute_indicator_history(bars['Close'], bars['High'], bars['Low'], bars['Volume'], eligible)
+    close = np.full(has_bar.shape, np.nan)
+    close[cells] = np.where(listed, bars['Close'], np.nan)[bar_row[cells], cells[1]]
+    return dates, present, close, history, bar_row
+
+def backtest_scores(bulk_data, tickers, thresholds=None, rules=None):
+    """Score every ticker at every historical date with the live rules
+
+    Returns (score, passed, close) as dates x tickers frames: the rule score,
+    the quality-filter result and the close price. Dates without a valid
+    close of the ticker's own have a NaN score. Each date's scores match what
+    score_universe gives for the history up to that date (see _bar_history).
+    """
+    dates, present, close, history, bar_row = _bar_history(bulk_data, tickers)
+    table = pd.DataFrame({field: values.ravel() for field, values in history.items()})
+    scores, _ = evaluate_scoring_rules(table, thresholds, rules)
+    
+    shape = history['price'].shape
+    cells = np.nonzero(~np.isnan(close))
+    bars = (bar_row[cells], cells[1])
+    score = np.full(close.shape, np.nan)
+    score[cells] = scores['score'].to_numpy().reshape(shape)[bars]
+    passed = np.zeros(close.shape, dtype=bool)
+    passed[cells] = scores['passed'].to_numpy().reshape(shape)[bars]
+    return (pd.DataFrame(score, index=dates, columns=present),
+            pd.DataFrame(passed, index=dates, columns=present),
+            pd.DataFrame(close, index=dates, columns=present))
+
+def backtest_report(score, passed, close, horizons=(5, 20, 60), thresholds=None):
+    """Forward-return statistics per score bucket
+
+    Buckets follow the main() tiers (signals that pass the quality filter);
+    'all' is every scored ticker-date and serves as the baseline. Returns a
+    frame indexed by (bucket, horizon) with count, mean/median forward
+    return, hit rate and the mean return in excess of the baseline.
+    """
+    thresholds = SCORING_THRESHOLDS if thresholds is None else thresholds
+    values = score.to_numpy()
+    ok = passed.to_numpy()
+    buckets = {
+        'ultimate': ok & (values >= thresholds['ultimate_score']),
+        'premium': ok & (values >= thresholds['premium_score']) & (values < thresholds['ultimate_score']),
+        'good': ok & (values >= thresholds['good_score']) & (values < thresholds['premium_score']),
+        'all': ~np.isnan(values),
+    }
+    prices = close.to_numpy()
+    rows = []
+    
+    for horizon in horizons:
+        forward = np.full(prices.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            forward[:-horizon] = prices[horizon:] / prices[:-horizon] - 1
+        has_return = ~np.isnan(forward)
+        baseline = forward[buckets['all'] & has_return].mean() if (buckets['all'] & has_return).any() else np.nan
+        for bucket, mask in buckets.items():
+            returns = forward[mask & has_return]
+            mean_return = returns.mean() if len(returns) else np.nan
+            rows.append({
+                'bucket': bucket,
+                'horizon': horizon,
+                'count': len(returns),
+                'mean_return': mean_return,
+                'median_return': np.median(returns) if len(returns) else np.nan,
+                'hit_rate': (returns > 0).mean() if len(returns) else np.nan,
+                'excess_return': mean_return - baseline,
+            })
+    return pd.DataFrame(rows).set_index(['bucket', 'horizon'])
+
+def run_backtest(stock_list, period="10y", horizons=(5, 20, 60), provider=None, workers=4, rate_limit=10.0):
+    """Replay the scoring system over `period` of (cached) history and print bucket statistics"""
+    provider = provider or default_provider()
+    thresholds, rules = load_scoring_config(os.environ.get('SCORING_CONFIG'))
+    
+    print(f"\n🧪 BACKTEST: {len(stock_list)} stocks over {period}")
+    print("=" * 80)
+    
+    started = time.perf_counter()
+    if isinstance(provider, PanelProvider):
+        bulk_data = provider.panel.since(period)  # Mapped, not fetched
+    else:
+        bulk_data = fetch_universe(stock_list, provider, period, workers=workers, rate_limit=rate_limit)
+    if bulk_data.empty:
+        print("❌ No data")
+        return None, None
+    loaded = time.perf_counter()
+    
+    score, passed, close = backtest_scores(bulk_data, stock_list, thresholds, rules)
+    stats = backtest_report(score, passed, close, horizons, thresholds)
+    finished = time.perf_counter()
+    
+    print(f"📅 {len(score)} trading days x {score.shape[1]} tickers "
+          f"(data {loaded - started:.1f}s, scoring {finished - loaded:.1f}s)")
+    for horizon in horizons:
+        print(f"\n📈 {horizon}-day forward returns")
+        print("─" * 70)
+        for bucket in ('ultimate', 'premium', 'good', 'all'):
+            row = stats.loc[(bucket, horizon)]
+            print(f"{bucket:9s} n={int(row['count']):7d}  mean {row['mean_return']:+7.2%}  "
+                  f"median {row['median_return']:+7.2%}  hit {row['hit_rate']:6.1%}  "
+                  f"excess {row['excess_return']:+7.2%}")
+    return score, stats
+
+# Parameter sweep: candidate thresholds and rule weights are scored against one
+# precomputed indicator history, many candidates per pass as broadcast tensors
+SWEEP_GRID = {
+    'thresholds': {
+        'rsi_oversold': [25, 30, 35],
+        'rsi_overbought': [65, 70, 75],
+        'bb_oversold': [0.2, 0.25, 0.3],
+        'support_distance': [0.02, 0.03, 0.05],
+        'high_volume_ratio': [1.5, 2.0],
+        'roc_10_momentum': [3, 5, 8],
+        'confidence_bonus': [1.0, 1.2, 1.5],
+        'good_score': [4, 6, 8],
+    },
+}
+_SIGNAL_COUNTERS = {'buy_signals', 'sell_signals', 'confidence'}
+
+def expand_sweep_grid(grid=None, rules=None, samples=None, seed=0):
+    """Candidate parameter sets, one row each, from a sweep grid
+
+    The grid mirrors the SCORING_CONFIG overrides with lists of values:
+    {"thresholds": {name: [values]}, "rules": {rule_id: {field: [values]}}}.
+    Threshold columns keep the threshold name and rule columns are named
+    '<rule_id>.<field>'. `samples` draws that many distinct combinations at
+    random instead of taking the full product.
+    """
+    grid = SWEEP_GRID if grid is None else grid
+    rules = SCORING_RULES if rules is None else rules
+    _check_overrides(grid.get('thresholds', {}), grid.get('rules', {}), [rule['id'] for rule in rules],
+                     'sweep parameters', lambda values: all(_is_number(value) for value in values))
+    axes = dict(grid.get('thresholds', {}))
+    for rule_id, fields in grid.get('rules', {}).items():
+        axes.update({f'{rule_id}.{field}': values for field, values in fields.items()})
+    if not axes:
+        raise ValueError("The sweep grid has no parameters")
+    
+    sizes = [len(values) for values in axes.values()]
+    total = int(np.prod(sizes))
+    picks = np.arange(total)
+    if samples and samples < total:
+        picks = np.sort(np.random.default_rng(seed).choice(total, samples, replace=False))
+    indices = np.unravel_index(picks, sizes)
+    return pd.DataFrame({name: np.asarray(values)[index] for (name, values), index in zip(axes.items(), indices)})
+
+def _candidate_config(candidates, thresholds, rules):
+    """Thresholds and rules with every swept parameter as a (candidates x 1) column"""
+    thresholds = dict(thresholds)
+    rules = [dict(rule) for rule in rules]
+    by_id = {rule['id']: rule for rule in rules}
+    for name, values in candidates.items():
+        column = np.asarray(values)[:, None]
+        if '.' in name:
+            rule_id, field = name.split('.', 1)
+            by_id[rule_id][field] = column
+        else:
+            thresholds[name] = column
+    return thresholds, rules
+
+def _sweep_candidates(columns, static, forward, candidates, thresholds, rules, cells=1 << 22):
+    """(count, return sum, hits) per candidate over the rows the selected tiers pick
+
+    Candidates are evaluated `cells // rows` at a time, so each rule is one
+    (batch x rows) boolean tensor op. Rules in `static` do not depend on any
+    swept parameter and reuse their precomputed masks.
+    """
+    n_rows = len(forward)
+    n_candidates = len(next(iter(candidates.values())))
+    batch = max(1, cells // max(n_rows, 1))
+    gains = (forward > 0).astype('f8')
+    stats = np.zeros((n_candidates, 3))
+    
+    for start in range(0, n_candidates, batch):
+        stop = min(start + batch, n_candidates)
+        chunk = {name: values[start:stop] for name, values in candidates.items()}
+        chunk_thresholds, chunk_rules = _candidate_config(chunk, thresholds, rules)
+        score, buy_signals, sell_signals, _, fired = _apply_scoring_rules(columns, chunk_thresholds, chunk_rules,
+                                                                          n_rows, static)
+        any_fired = reduce(np.logical_or, fired.values())
+        passed = any_fired & ((buy_signals - sell_signals > 0) | (score >= chunk_thresholds['min_score']))
+        selected = passed & (score >= chunk_thresholds['good_score'])
+        selected = np.broadcast_to(selected, (stop - start, n_rows)).astype('f8')
+        stats[start:stop] = np.column_stack([selected.sum(axis=1), selected @ forward, selected @ gains])
+    return stats
+
+def _sweep_shard(shm_name, shape, fields, dtypes, static_bits, candidates, thresholds, rules, cells):
+    """Process-pool worker: sweep its slice of candidates over the shared indicator block"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = np.ndarray(shape, dtype='f8', buffer=shm.buf)
+        columns = {field: block[i].astype(dtype) for i, (field, dtype) in enumerate(zip(fields, dtypes))}
+        forward = np.array(block[-1])
+        del block
+    finally:
+        shm.close()
+    static = {rule_id: np.unpackbits(bits, count=shape[1]).astype(bool) for rule_id, bits in static_bits.items()}
+    return _sweep_candidates(columns, static, forward, candidates, thresholds, rules, cells)
+
+def sweep_thresholds(bulk_data, tickers, candidates, horizon=20, min_count=30, thresholds=None, rules=None,
+                     processes=1, cells=1 << 22):
+    """Rank candidate parameter sets by the forward returns of the signals they select
+
+    The indicator history is computed once. Rules that no swept parameter
+    touches are evaluated once; the rest run as broadcast tensor ops over
+    batches of candidates, split across `processes` worker processes that
+    map the indicator columns from shared memory. Each candidate selects the
+    ticker-dates that pass the quality filter and reach its good_score tier.
+    Returns `candidates` with count, mean_return, hit_rate and excess_return
+    (over all ticker-dates) columns, best excess return first; candidates
+    selecting fewer than `min_count` ticker-dates are ranked last.
+    """
+    thresholds = SCORING_THRESHOLDS if thresholds is None else thresholds
+    rules = SCORING_RULES if rules is None else rules
+    dates, present, close, history, bar_row = _bar_history(bulk_data, tickers)
+    forward = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        forward[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    rows = np.nonzero(~np.isnan(forward))
+    forward = forward[rows]
+    table = {field: values[bar_row[rows], rows[1]] for field, values in history.items()}
+    
+    swept = {_THRESHOLD_ALIASES.get(name, name) for name in candidates if '.' not in name} | _SIGNAL_COUNTERS
+    namespace = _rule_namespace(table, thresholds)
+    static, needed = {}, set()
+    with METRICS.timer('sweep.static_rules'), np.errstate(invalid='ignore'):
+        for rule in rules:
+            names = set(_compile_rule(rule['when']).co_names)
+            if names & swept:
+                needed |= names & set(table)
+                continue
+            condition = np.asarray(eval(_compile_rule(rule['when']), {'__builtins__': {}}, namespace), dtype=bool)
+            static[rule['id']] = np.broadcast_to(condition, forward.shape)
+    columns = {field: table[field] for field in sorted(needed)}
+    unsupported = [field for field, values in columns.items() if values.dtype == object]
+    if unsupported:
+        raise ValueError(f"Swept rules compare non-numeric columns: {', '.join(unsupported)}")
+    
+    values = {name: candidates[name].to_numpy() for name in candidates.columns}
+    processes = processes or os.cpu_count() or 1
+    with METRICS.timer('sweep.candidates'):
+        if processes == 1 or len(candidates) < 2 * processes:
+            stats = _sweep_candidates(columns, static, forward, values, thresholds, rules, cells)
+        else:
+            shape = (len(columns) + 1, len(forward))
+            shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+            try:
+                block = np.ndarray(shape, dtype='f8', buffer=shm.buf)
+                for i, column in enumerate(columns.values()):
+                    block[i] = column
+                block[-1] = forward
+                del block
+                
+                static_bits = {rule_id: np.packbits(mask) for rule_id, mask in static.items()}
+                dtypes = [column.dtype for column in columns.values()]
+                bounds = np.linspace(0, len(candidates), processes + 1).astype(int)
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    futures = [executor.submit(_sweep_shard, shm.name, shape, list(columns), dtypes, static_bits,
+                                               {name: column[start:stop] for name, column in values.items()},
+                                               thresholds, rules, cells)
+                               for start, stop in zip(bounds[:-1], bounds[1:])]
+                    stats = np.vstack([future.result() for future in futures])
+            finally:
+                shm.close()
+                shm.unlink()
+    
+    count, total, gains = stats.T
+    ranked = candidates.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ranked['count'] = count.astype(int)
+        ranked['mean_return'] = total / count
+        ranked['hit_rate'] = gains / count
+    ranked['excess_return'] = ranked['mean_return'] - (forward.mean() if len(forward) else np.nan)
+    ranked['_eligible'] = ranked['count'] >= min_count
+    ranked = ranked.sort_values(['_eligible', 'excess_return'], ascending=False, na_position='last', kind='stable')
+    return ranked.drop(columns='_eligible').reset_index(drop=True)
+
+def sweep_config(ranked, parameters, position=0):
+    """SCORING_CONFIG overrides ({"thresholds", "rules"}) for one ranked parameter set"""
+    config = {'thresholds': {}, 'rules': {}}
+    for name in parameters:
+        value = ranked[name].iloc[position].item()  # Per column, so integer parameters stay integers
+        if '.' in name:
+            rule_id, field = name.split('.', 1)
+            config['rules'].setdefault(rule_id, {})[field] = value
+        else:
+            config['thresholds'][name] = value
+    return config
+
+def run_sweep(stock_list, grid_path=None, period="10y", horizon=20, min_count=30, samples=None, processes=1,
+              top=20, output=None, save_best=None, provider=None, workers=4, rate_limit=10.0):
+    """Sweep a parameter grid over `period` of (cached) history and print the best parameter sets"""
+    provider = provider or default_provider()
+    thresholds, rules = load_scoring_config(os.environ.get('SCORING_CONFIG'))
+    grid = None
+    if grid_path:
+        with open(grid_path) as f:
+            grid = json.load(f)
+    candidates = expand_sweep_grid(grid, rules, samples)
+    
+    print(f"\n🎛️  PARAMETER SWEEP: {len(candidates)} parameter sets x {len(stock_list)} stocks over {period}")
+    print("=" * 80)
+    
+    started = time.perf_counter()
+    if isinstance(provider, PanelProvider):
+        bulk_data = provider.panel.since(period)
+    else:
+        bulk_data = fetch_universe(stock_list, provider, period, workers=workers, rate_limit=rate_limit)
+    if bulk_data.empty:
+        print("❌ No data")
+        return None
+    loaded = time.perf_counter()
+    
+    ranked = sweep_thresholds(bulk_data, stock_list, candidates, horizon, min_count, thresholds, rules, processes)
+    finished = time.perf_counter()
+    print(f"⚙️  {len(candidates)} parameter sets scored in {finished - loaded:.1f}s "
+          f"(data {loaded - started:.1f}s, {len(candidates) / max(finished - loaded, 1e-9):.0f} sets/s)")
+    
+    parameters = list(candidates.columns)
+    print(f"\n🏆 Top {min(top, len(ranked))} by {horizon}-day excess return (at least {min_count} signals)")
+    print("─" * 70)
+    for _, row in ranked.head(top).iterrows():
+        settings = ', '.join(f"{name}={row[name]:g}" for name in parameters)
+        print(f"excess {row['excess_return']:+7.2%}  mean {row['mean_return']:+7.2%}  "
+              f"hit {row['hit_rate']:6.1%}  n={int(row['count']):7d}  {settings}")
+    
+    if output:
+        ranked.to_csv(output, index=False)
+        print(f"\n📄 Ranked parameter sets written to {output}")
+    if save_best and len(ranked):
+        with open(save_best, 'w') as f:
+            json.dump(sweep_config(ranked, parameters), f, indent=2)
+        print(f"💾 Best parameter set written to {save_best} (use it with SCORING_CONFIG={save_best})")
+    return ranked
+
+# Email delivery runs off the analysis path: digests are rendered from templates
+# compiled once, queued, and sent by a background thread over pooled SMTP
+# connections with retry and backoff.
+EMAIL_FEATURES = [
+    "Multi-timeframe RSI analysis (extreme levels)",
+    "Advanced MACD with momentum strength",
+    "Bollinger Bands with squeeze detection",
+    "Multi-level Support/Resistance mapping",
+    "Volume trend and explosion detection",
+    "Momentum indicators (ROC, Stochastic, Williams %R)",
+    "Golden Cross variations (50/200 + 20/50)",
+    "Confidence scoring with quality filters",
+]
+
+class EmailRenderer:
+    """Plain-text and HTML digests from templates compiled once at import"""
+    TEXT_PAGE = string.Template(
+        "🚀 ULTIMATE NASDAQ-100 STOCK ANALYSIS\n📅 ${date}\n🎯 Advanced Multi-Indicator Analysis\n\n"
+        "${delta}${sections}\n${rule}\n🧠 ULTIMATE ANALYSIS FEATURES:\n${features}\n\n"
+        "📊 Analysis completed: ${time}\n🎯 ${count} high-quality opportunities identified\n"
+        "⚙️ Ultimate NASDAQ-100 Stock Analyzer\n📈 Professional-grade technical analysis!")
+    TEXT_ROW = ("\n{idx}. {ticker} - {company_name}\n💰 Price: ${price:.2f}\n🎯 Ultimate Score: {score} {stars}\n"
+                "📊 Signal Quality: {buy_signals} buy vs {sell_signals} sell\n📈 RSI: {rsi:.1f}\n🔍 Key Signals:\n"
+                "{signals}\n" + "─" * 60).format
+    TEXT_UNCHANGED_ROW = "\n{idx}. {ticker} - Score {score} {stars} (unchanged) - ${price:.2f}".format
+    HTML_PAGE = string.Template(
+        "<html><body style=\"font-family: Arial, sans-serif\">"
+        "<h2>🚀 Ultimate NASDAQ-100 Stock Analysis</h2><p>📅 ${date}</p>${delta}${sections}"
+        "<p style=\"color: #666\">🎯 ${count} high-quality opportunities identified - "
+        "analysis completed ${time}</p></body></html>")
+    HTML_SECTION = string.Template(
+        "<h3>${title}</h3><table border=\"1\" cellpadding=\"4\" cellspacing=\"0\" style=\"border-collapse: collapse\">"
+        "<tr><th>#</th><th>Ticker</th><th>Company</th><th>Price</th><th>Score</th><th>Buy / Sell</th>"
+        "<th>RSI</th><th>Key signals</th></tr>${rows}</table>")
+    HTML_ROW = ("<tr><td>{idx}</td><td><b>{ticker}</b></td><td>{company_name}</td><td>${price:.2f}</td>"
+                "<td>{score} {stars}</td><td>{buy_signals} / {sell_signals}</td><td>{rsi:.1f}</td>"
+                "<td>{signals}</td></tr>").format
+    
+    @staticmethod
+    def _fields(idx, stock):
+        return {'idx': idx, 'ticker': stock['ticker'], 'company_name': stock['company_name'],
+                'price': stock['price'], 'score': stock['score'], 'stars': "⭐" * min(stock['confidence'], 5),
+                'buy_signals': stock['buy_signals'], 'sell_signals': stock['sell_signals'], 'rsi': stock['rsi']}
+    
+    def render_text(self, sections, delta_report, unchanged, count, now, limit):
+        parts = []
+        for title, opportunities in sections:
+            parts.append(f"{title}:\n")
+            for idx, stock in enumerate(opportunities[:limit], 1):
+                fields = self._fields(idx, stock)
+                if stock['ticker'] in unchanged:
+                    parts.append(self.TEXT_UNCHANGED_ROW(**fields))
+                    continue
+                signals = [f"   • {signal}" for signal in stock['signals'][:5]]
+                if len(stock['signals']) > 5:
+                    signals.append(f"   • ... and {len(stock['signals']) - 5} more signals")
+                parts.append(self.TEXT_ROW(signals='\n'.join(signals), **fields))
+            parts.append("\n")
+        return self.TEXT_PAGE.substitute(
+            date=now.strftime('%A, %B %d, %Y at %I:%M %p EST'), delta=delta_report + "\n\n" if delta_report else "",
+            sections='\n'.join(parts), rule="=" * 60, features='\n'.join(f"• {feature}" for feature in EMAIL_FEATURES),
+            time=now.strftime('%I:%M %p EST'), count=count)
+    
+    def render_html(self, sections, delta_report, unchanged, count, now, limit):
+        tables = []
+        for title, opportunities in sections:
+            rows = []
+            for idx, stock in enumerate(opportunities[:limit], 1):
+                fields = self._fields(idx, stock)
+                fields['ticker'] = html.escape(fields['ticker'])
+                fields['company_name'] = html.escape(fields['company_name'])
+                signals = "unchanged" if stock['ticker'] in unchanged else \
+                    "<br>".join(html.escape(signal) for signal in stock['signals'][:5])
+                rows.append(self.HTML_ROW(signals=signals, **fields))
+            tables.append(self.HTML_SECTION.substitute(title=html.escape(title), rows=''.join(rows)))
+        return self.HTML_PAGE.substitute(
+            date=now.strftime('%A, %B %d, %Y at %I:%M %p EST'),
+            delta=f"<pre>{html.escape(delta_report)}</pre>" if delta_report else "",
+            sections=''.join(tables), count=count, time=now.strftime('%I:%M %p EST'))
+    
+    def render(self, sections, delta_report="", unchanged=(), limit=15):
+        """(subject, text, html) for a digest of (title, opportunities) sections, `limit` rows each"""
+        count = len({stock['ticker'] for _, opportunities in sections for stock in opportunities})
+        now = datetime.now()
+        return (f"🚀 ULTIMATE Analysis - {count} Premium Opportunities",
+                self.render_text(sections, delta_report, unchanged, count, now, limit),
+                self.render_html(sections, delta_report, unchanged, count, now, limit))
+
+EMAIL_RENDERER = EmailRenderer()
+
+def load_watchlists(path=None):
+    """Digest subscriptions: {name: {'recipients': [...], 'tickers': [...] or None}}
+
+    Read from a JSON file (EMAIL_WATCHLISTS). A watchlist without tickers
+    covers every opportunity. Defaults to everything sent to EMAIL_ADDRESS.
+    """
+    if not path:
+        return {'all': {'recipients': [EMAIL_ADDRESS], 'tickers': None}}
+    with open(path) as f:
+        return json.load(f)
+
+def build_digests(opportunities, watchlists):
+    """Batch watchlists into one digest per group of recipients who follow the same lists
+
+    Returns a list of (recipients, [(section title, opportunities)]).
+    """
+    followed = defaultdict(list)
+    for name, watchlist in watchlists.items():
+        for recipient in watchlist['recipients']:
+            followed[recipient].append(name)
+    
+    groups = defaultdict(list)
+    for recipient, names in followed.items():
+        groups[tuple(names)].append(recipient)
+    
+    digests = []
+    for names, recipients in groups.items():
+        sections = []
+        for name in names:
+            tickers = watchlists[name].get('tickers')
+            if tickers is not None:
+                tickers = set(tickers)
+            selected = opportunities if tickers is None else [stock for stock in opportunities
+                                                               if stock['ticker'] in tickers]
+            if not selected:
+                continue
+            title = f"🏆 TOP {len(selected)} ULTIMATE OPPORTUNITIES" if tickers is None else \
+                f"🏆 {name.upper()} WATCHLIST - {len(selected)} OPPORTUNITIES"
+            sections.append((title, selected))
+        if sections:
+            digests.append((recipients, sections))
+    return digests
+
+class SMTPPool:
+    """Reusable SMTP connections, so repeated sends skip the connect and TLS handshake
+
+    Port 465 uses implicit TLS and 587 STARTTLS, both with login. Any other
+    port is plain SMTP without login, e.g. a local stand-in server
+    (SMTP_HOST=localhost SMTP_PORT=8025).
+    """
+    def __init__(self, host='smtp.gmail.com', port=465, user=None, password=None, size=2, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+    
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get('SMTP_HOST', 'smtp.gmail.com'), int(os.environ.get('SMTP_PORT', 465)),
+                   EMAIL_ADDRESS, EMAIL_PASSWORD)
+    
+    def _connect(self):
+        METRICS.count('smtp_connects')
+        if self.port == 465:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                          context=ssl.create_default_context())
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.port == 587:
+                connection.starttls(context=ssl.create_default_context())
+        if self.port in (465, 587):
+            connection.login(self.user, self.password)
+        return connection
+    
+    @staticmethod
+    def _alive(connection):
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+    
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+    
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a live connection; it goes back to the pool unless the send failed"""
+        try:
+            connection = self.idle.get_nowait()
+            if not self._alive(connection):
+                self._discard(connection)  # Release the dead socket before replacing it
+                connection = self._connect()
+        except queue.Empty:
+            connection = self._connect()
+        
+        try:
+            yield connection
+        except:
+            self._discard(connection)
+            raise
+        if self.idle.qsize() < self.size:
+            self.idle.put(connection)
+        else:
+            self._discard(connection)
+    
+    def close(self):
+        while True:
+            try:
+                self._discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+class Notifier:
+    """Background send queue: submit() returns at once, worker threads deliver
+
+    Transient failures are retried with exponential backoff. Permanent (5xx)
+    rejections are not. Messages that still fail are kept in `failed`;
+    `queued` counts the messages accepted for delivery.
+    """
+    def __init__(self, pool=None, workers=1, retries=3, backoff=2.0):
+        self.pool = pool or SMTPPool.from_env()
+        self.retries = retries
+        self.backoff = backoff
+        self.queue = queue.Queue()
+        self.queued = 0
+        self.sent = 0
+        self.failed = []
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+    
+    def submit(self, message):
+        self.queue.put(message)
+        with self.lock:
+            self.queued += 1
+    
+    def _work(self):
+        while True:
+            message = self.queue.get()
+            try:
+                if message is None:
+                    return
+                self._deliver(message)
+            finally:
+                self.queue.task_done()
+    
+    def _deliver(self, message):
+        for attempt in range(self.retries + 1):
+            try:
+                with METRICS.timer('email_send'), self.pool.connection() as connection:
+                    connection.send_message(message)
+                with self.lock:
+                    self.sent += 1
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                error = e
+                if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500:
+                    break
+                if attempt < self.retries:
+                    METRICS.count('email_retries')
+                    time.sleep(self.backoff * 2 ** attempt)
+        METRICS.count('email_errors')
+        with self.lock:
+            self.failed.append((message, error))
+    
+    def close(self, timeout=None):
+        """Wait for the queued messages, stop the workers and release the connections"""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.pool.close()
+
+def send_ultimate_email(opportunities, delta=None, notifier=None, watchlists=None):
+    """Queue the analysis digests for background delivery and return the Notifier
+
+    Every group of recipients following the same watchlists (EMAIL_WATCHLISTS)
+    gets one digest, as plain text and an HTML table. With a snapshot `delta`
+    it leads with what changed since the last run, and opportunities whose
+    score did not change get a single line. Call notifier.close() before
+    exiting so the sends can finish.
+    """
+    notifier = notifier or Notifier()
+    try:
+        watchlists = load_watchlists(os.environ.get('EMAIL_WATCHLISTS')) if watchlists is None else watchlists
+        delta_report = ""
+        unchanged = set()
+        if delta is not None and delta['previous'] is not None:
+            delta_report = format_delta_report(delta)
+            unchanged = {stock['ticker'] for stock in opportunities} - set(delta['new'].index) - set(delta['changed'].index)
+        
+        digests = build_digests(opportunities, watchlists)
+        for recipients, sections in digests:
+            subject, text, html_body = EMAIL_RENDERER.render(sections, delta_report, unchanged)
+            message = email_message.EmailMessage()
+            message['Subject'] = subject
+            message['From'] = EMAIL_ADDRESS
+            message['To'] = ', '.join(recipients)
+            message.set_content(text)
+            message.add_alternative(html_body, subtype='html')
+            notifier.submit(message)
+        print(f"\n📧 Ultimate analysis email queued: {len(digests)} digest(s), {len(opportunities)} opportunities")
+        
+    except Exception as e:
+        METRICS.count('email_errors')
+        print(f"❌ Email error: {e}")
+    return notifier
+
+# Daemon mode: a resident process keeps prices, indicators and scores in memory,
+# refreshes them on a schedule and answers queries over a local HTTP API.
+def _jsonable(value):
+    """NumPy scalars to Python, NaN to None, recursively"""
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+class AnalyzerService:
+    """Warm analyzer state for the daemon, refreshed on a schedule
+
+    Each refresh builds a complete new state (prices, indicator table, scores,
+    ranked opportunities) and swaps it in with one assignment, so queries read
+    a consistent snapshot from memory without waiting for a refresh.
+    """
+    
+    def __init__(self, stock_list, provider=None, company_names=None, refresh_every=900):
+        self.stock_list = list(stock_list)
+        self.provider = provider or default_provider()
+        self.company_names = COMPANY_NAMES if company_names is None else company_names
+        self.refresh_every = refresh_every
+        self.thresholds, self.rules = load_scoring_config(os.environ.get('SCORING_CONFIG'))
+        self.state = None
+        self.refresh_lock = threading.Lock()
+        self.stopped = threading.Event()
+    
+    def refresh(self):
+        """Re-fetch (incrementally, through the price cache) and re-score the universe"""
+        with self.refresh_lock, METRICS.timer('refresh'):
+            started = time.perf_counter()
+            bulk_data = fetch_universe(self.stock_list, self.provider)
+            table, scores, fired = score_universe(bulk_data, self.stock_list, self.thresholds, self.rules)
+            passed = scores['passed'].to_numpy(dtype=bool)
+            opportunities = ResultTable.from_scores(table[passed], scores[passed], fired[passed],
+                                                    self.company_names, self.rules).sorted()
+            self.state = {
+                'bulk_data': bulk_data,
+                'table': table,
+                'scores': scores,
+                'fired': fired,
+                'opportunities': opportunities,
+                'updated': datetime.now().isoformat(timespec='seconds'),
+                'seconds': round(time.perf_counter() - started, 3),
+            }
+        return self.status()
+    
+    def run_schedule(self):
+        while not self.stopped.wait(self.refresh_every):
+            try:
+                self.refresh()
+            except Exception as e:
+                METRICS.count('refresh_errors')
+                print(f"❌ Refresh failed: {e}")
+    
+    def status(self):
+        state = self.state
+        return {'updated': state['updated'], 'seconds': state['seconds'], 'tickers': len(state['table']),
+                'opportunities': len(state['opportunities'])}
+    
+    def opportunities(self, limit=None, tier=None):
+        """Ranked opportunities, optionally one tier ('ultimate', 'premium', 'good') only"""
+        state = self.state
+        results = state['opportunities']
+        if tier:
+            results = dict(zip(('ultimate', 'premium', 'good'), results.tiers(self.thresholds)))[tier]
+        return {'updated': state['updated'], 'count': len(results),
+                'opportunities': [_result_row(result) for result in results[:limit]]}
+    
+    def ticker(self, ticker):
+        """Full indicator breakdown of one ticker, whether or not it passed (None when unknown)"""
+        state = self.state
+        if ticker not in state['table'].index:
+            return None
+        rows = [ticker]
+        result = ResultTable.from_scores(state['table'].loc[rows], state['scores'].loc[rows],
+                                         state['fired'].loc[rows], self.company_names, self.rules)[0]
+        breakdown = result.to_dict()
+        breakdown['passed'] = bool(state['scores'].at[ticker, 'passed'])
+        fired = state['fired'].loc[ticker]
+        breakdown['rules_fired'] = [rule_id for rule_id in fired.index if fired[rule_id]]
+        breakdown['updated'] = state['updated']
+        return breakdown
+    
+    def stop(self):
+        self.stopped.set()
+
+def _service_handler(service):
+    """Request handler class answering from `service`'s in-memory state"""
+    
+    class Handler(http_server.BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(_jsonable(payload)).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            url = urllib_parse.urlsplit(self.path)
+            query = dict(urllib_parse.parse_qsl(url.query))
+            parts = url.path.strip('/').split('/')
+            with METRICS.timer('query'):
+                if parts == ['opportunities']:
+                    tier = query.get('tier')
+                    if tier not in (None, 'ultimate', 'premium', 'good'):
+                        return self._reply(400, {'error': f"unknown tier {tier}"})
+                    limit = int(query['limit']) if query.get('limit', '').isdigit() else None
+                    return self._reply(200, service.opportunities(limit, tier))
+                if len(parts) == 2 and parts[0] == 'ticker':
+                    breakdown = service.ticker(parts[1].upper())
+                    if breakdown is None:
+                        return self._reply(404, {'error': f"no data for {parts[1].upper()}"})
+                    return self._reply(200, breakdown)
+                if parts == ['status']:
+                    return self._reply(200, service.status())
+            self._reply(404, {'error': "try /opportunities, /ticker/<TICKER>, /status or POST /refresh"})
+        
+        def do_POST(self):
+            if self.path.rstrip('/') == '/refresh':
+                return self._reply(200, service.refresh())
+            self._reply(404, {'error': "only POST /refresh"})
+        
+        def log_message(self, format, *args):
+            pass  # Queries are counted in the metrics instead
+    
+    return Handler
+
+def serve(stock_list, host='127.0.0.1', port=8765, socket_path=None, refresh_every=900, provider=None,
+          company_names=None):
+    """Run the resident analyzer until interrupted
+
+    Listens on a Unix socket when `socket_path` is given, on host:port otherwise:
+    GET /opportunities[?tier=&limit=], GET /ticker/<TICKER>, GET /status and
+    POST /refresh (refreshes also run every `refresh_every` seconds).
+    """
+    service = AnalyzerService(stock_list, provider, company_names, refresh_every)
+    print(f"🔄 Loading {len(service.stock_list)} stocks...")
+    status = service.refresh()
+    print(f"✅ {status['tickers']} stocks scored in {status['seconds']:.1f}s - "
+          f"{status['opportunities']} opportunities")
+    
+    handler = _service_handler(service)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = socketserver.ThreadingUnixStreamServer(socket_path, handler)
+        address = f"unix:{socket_path}"
+    else:
+        server = http_server.ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{server.server_address[1]}"
+    server.daemon_threads = True
+    threading.Thread(target=service.run_schedule, daemon=True).start()
+    print(f"🛰️  Serving on {address} (refresh every {refresh_every:.0f}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+OUTPUT_FIELDS = ('ticker', 'company_name', 'price', 'score', 'confidence', 'buy_signals', 'sell_signals', 'rsi')
+
+def _result_row(result):
+    row = {field: result[field] for field in OUTPUT_FIELDS}
+    row['signals'] = list(result['signals'])
+    return row
+
+def write_results(results, fmt, path=None):
+    """Write the opportunities as JSON or CSV rows to `path` (stdout when omitted)"""
+    rows = [_result_row(result) for result in results]
+    
+    with (open(path, 'w', newline='') if path else contextlib.nullcontext(sys.stdout)) as f:
+        if fmt == 'json':
+            json.dump(rows, f, indent=2, default=lambda value: value.item())
+            f.write('\n')
+        else:
+            writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS + ('signals',))
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({**row, 'signals': ' | '.join(row['signals'])})
+
+def parse_args(argv=None):
+    """Command line options; each defaults to the environment variable the workflows set"""
+    parser = argparse.ArgumentParser(prog='NASDAQ-100-2.py', description="Ultimate NASDAQ-100 stock analyzer")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--universe', default=os.environ.get('STOCK_UNIVERSE'),
+                        help="CSV or JSON ticker file (default: the built-in NASDAQ-100)")
+    common.add_argument('--replay', metavar='DIR', default=os.environ.get('STOCK_REPLAY_DIR'),
+                        help="serve prices from recorded snapshots in DIR")
+    common.add_argument('--offline', action='store_true',
+                        help="use the on-disk price cache only, without network access")
+    common.add_argument('--panel', action='store_true', default=os.environ.get('STOCK_PANEL', '') not in ('', '0'),
+                        help="read daily prices from the memory-mapped panel built by the panel command")
+    common.add_argument('--metrics', action='store_true', default=METRICS.enabled,
+                        help="print per-stage timings, including import and startup time")
+    common.add_argument('--kernels', choices=KERNEL_BACKENDS, default=os.environ.get('STOCK_KERNELS', 'auto'),
+                        help="indicator kernels: numba (compiled), numpy, or auto (numba when installed)")
+    
+    commands = parser.add_subparsers(dest='command', metavar='{analyze,backtest,sweep,watch,serve,panel}')
+    analyze = commands.add_parser('analyze', parents=[common], help="score the universe once (default)")
+    analyze.add_argument('--period', default='1y')
+    analyze.add_argument('--interval', default='1d')
+    analyze.add_argument('--timeframes', default=os.environ.get('STOCK_TIMEFRAMES'),
+                         help="comma-separated timeframes, e.g. 5m,1h,1d")
+    analyze.add_argument('--processes', type=int, default=int(os.environ.get('STOCK_PROCESSES', 1)))
+    analyze.add_argument('--format', choices=('text', 'json', 'csv'), default='text',
+                         help="json/csv write the opportunities to --output (or stdout, with progress on stderr)")
+    analyze.add_argument('--output', help="file for --format json/csv")
+    analyze.add_argument('--no-email', action='store_true', help="skip the email digests")
+    analyze.add_argument('--dedup-correlation', type=float,
+                         default=float(os.environ.get('STOCK_DEDUP_CORRELATION', CORRELATION_THRESHOLD)),
+                         help="keep only the best name of clusters correlated at least this much (0 disables)")
+    backtest = commands.add_parser('backtest', parents=[common], help="replay the scoring rules over history")
+    backtest.add_argument('period', nargs='?', default='10y')
+    sweep_parser = commands.add_parser('sweep', parents=[common], help="rank scoring parameter sets by forward returns")
+    sweep_parser.add_argument('grid', nargs='?', help="JSON grid of threshold/rule values (default: built-in grid)")
+    sweep_parser.add_argument('--period', default='10y')
+    sweep_parser.add_argument('--horizon', type=int, default=20, help="forward-return horizon in trading days")
+    sweep_parser.add_argument('--min-count', type=int, default=30, help="rank sets with fewer signals last")
+    sweep_parser.add_argument('--samples', type=int, help="score this many random parameter sets from the grid")
+    sweep_parser.add_argument('--processes', type=int, default=int(os.environ.get('STOCK_PROCESSES', 1)))
+    sweep_parser.add_argument('--top', type=int, default=20)
+    sweep_parser.add_argument('--output', help="write the full ranking as CSV")
+    sweep_parser.add_argument('--save-best', metavar='FILE', help="write the best set as a SCORING_CONFIG file")
+    watch_parser = commands.add_parser('watch', parents=[common], help="alert on trigger-level crossings")
+    watch_parser.add_argument('seconds', nargs='?', type=float, default=60, help="polling interval")
+    serve_parser = commands.add_parser('serve', parents=[common], help="resident daemon with a local query API")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--socket', help="listen on this Unix socket instead of TCP")
+    serve_parser.add_argument('--refresh-every', type=float, default=900, help="seconds between refreshes")
+    panel_parser = commands.add_parser('panel', parents=[common], help="build the memory-mapped price panel")
+    panel_parser.add_argument('--period', default='10y')
+    panel_parser.add_argument('--float32', action='store_true', help="store float32 values (half the size)")
+    
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0] not in commands.choices and argv[0] not in ('-h', '--help')):
+        argv = ['analyze'] + argv
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Ultimate stock analysis main function"""
+    args = parse_args(argv)
+    if args.metrics:
+        METRICS.enabled = True
+        METRICS.record('startup.import', IMPORT_SECONDS)
+        METRICS.record('startup', time.perf_counter() - _IMPORT_STARTED)
+    set_kernel_backend(args.kernels)
+    
+    universe = load_universe(args.universe)
+    if args.replay:
+        provider = ReplayProvider(args.replay)
+    elif args.panel and args.command != 'panel':
+        try:
+            provider = PanelProvider(PricePanel.open())
+        except FileNotFoundError:
+            print("❌ No price panel yet - build it with: python NASDAQ-100-2.py panel")
+            return None
+    elif args.offline:
+        provider = CacheProvider(offline=True)
+    else:
+        provider = None
+    
+    with provider or contextlib.nullcontext():
+        return run_command(args, universe, provider)
+
+def run_command(args, universe, provider):
+    """Dispatch the parsed sub-command"""
+    if args.command == 'backtest':
+        return run_backtest(list(universe), args.period, provider=provider)
+    if args.command == 'panel':
+        return build_panel(list(universe), args.period, provider=provider, dtype='f4' if args.float32 else 'f8')
+    if args.command == 'sweep':
+        return run_sweep(list(universe), args.grid, args.period, args.horizon, args.min_count, args.samples,
+                         args.processes, args.top, args.output, args.save_best, provider)
+    if args.command == 'watch':
+        return watch(list(universe), interval=args.seconds, provider=provider, company_names=universe)
+    if args.command == 'serve':
+        return serve(list(universe), args.host, args.port, args.socket, args.refresh_every, provider, universe)
+    if args.format != 'text' and not args.output:
+        # Keep stdout clean for the JSON/CSV rows
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run_analysis(args, universe, provider)
+    else:
+        results = run_analysis(args, universe, provider)
+    if args.format != 'text':
+        write_results(results, args.format, args.output)
+    return results
+
+def run_analysis(args, universe, provider):
+    """Score the universe, print the tiers, write the report and send the email digests"""
+    start_time = datetime.now()
+    
+    print(f"\n" + "="*80)
+    print(f"🚀 ULTIMATE NASDAQ-100 STOCK ANALYZER")
+    print(f"📅 {start_time.strftime('%A, %B %d, %Y at %I:%M %p EST')}")
+    print(f"🎯 Professional-Grade Multi-Indicator Analysis")
+    print(f"="*80)
+    
+    delta = None
+    notifier = None
+    correlations = None
+    if args.timeframes:
+        # e.g. --timeframes 5m,1h,1d scores every timeframe from a single 5m download
+        results = analyze_timeframes(list(universe), args.timeframes.split(','), provider=provider,
+                                     company_names=universe)
+    else:
+        # Every run's scores are kept so the report can show what changed since the last one
+        store = SnapshotStore()
+        run_date = _market_date()
+        # Replayed or cache-only history must not overwrite the live correlation window
+        persist = not (args.replay or args.offline)
+        correlations = RollingCorrelation(persist=persist) if args.dedup_correlation > 0 else None
+        results = analyze_stocks(list(universe), provider=provider, company_names=universe,
+                                 processes=args.processes, store=store, run_date=run_date,
+                                 period=args.period, interval=args.interval, correlations=correlations)
+        if run_date in store.saved:
+            delta = store.delta(run_date)
+            print(f"\n{format_delta_report(delta)}")
+    
+    report_lines = [f"ULTIMATE NASDAQ-100 STOCK ANALYSIS - {start_time.strftime('%Y-%m-%d %H:%M')}"]
+    if delta is not None:
+        report_lines.append(format_delta_report(delta))
+    
+    if results:
+        # Sort by ultimate score
+        results = results.sorted()
+        
+        # One slot per correlated cluster: the best-scoring name stands in for the rest
+        if correlations is not None:
+            results, clusters = deduplicate_correlated(results, correlations, args.dedup_correlation)
+            if clusters:
+                print(f"\n🔗 {sum(map(len, clusters.values()))} correlated opportunities folded into "
+                      f"{len(clusters)} cluster leaders")
+        
+        # Categorize by quality: exceptional, very good, good
+        thresholds, _ = load_scoring_config(os.environ.get('SCORING_CONFIG'))
+        ultimate_opportunities, premium_opportunities, good_opportunities = results.tiers(thresholds)
+        ultimate_range, premium_range, good_range = ResultTable.tier_ranges(thresholds)
+        
+        print(f"\n" + "="*80)
+        print(f"🏆 ULTIMATE OPPORTUNITIES (Score {ultimate_range})")
+        print(f"="*80)
+        
+        if ultimate_opportunities:
+            for idx, result in enumerate(ultimate_opportunities[:10], 1):
+                confidence_display = "⭐" * min(result['confidence'], 5)
+                print(f"\n{idx}. {result['ticker']} - {result['company_name']}")
+                print(f"   💰 Price: ${result['price']:.2f}")
+                print(f"   🎯 Ultimate Score: {result['score']} {confidence_display}")
+                print(f"   📊 Quality: {result['buy_signals']} buy signals vs {result['sell_signals']} sell")
+                print(f"   📈 RSI: {result['rsi']:.1f}")
+                if 'correlated' in result:
+                    print(f"   🔗 Correlated: {', '.join(result['correlated'])}")
+                if 'timeframes' in result:
+                    breakdown = ' | '.join(f"{timeframe} {values['score']:+d}"
+                                           for timeframe, values in result['timeframes'].items())
+                    print(f"   🕒 Timeframes: {breakdown} ({result['timeframe_confidence']:.0%} bullish)")
+                print(f"   🔍 Top Signals:")
+                for signal in result['signals'][:4]:  # Top 4 signals
+                    print(f"      • {signal}")
+                if len(result['signals']) > 4:
+                    print(f"      • ... plus {len(result['signals']) - 4} more")
+                print("   " + "─" * 70)
+        
+        if premium_opportunities:
+            print(f"\n🥇 PREMIUM OPPORTUNITIES (Score {premium_range})")
+            print("─" * 50)
             for idx, result in enumerate(premium_opportunities[:5], 1):
                 print(f"{idx}. {result['ticker']} - Score: {result['score']} - ${result['price']:.2f} - RSI: {result['rsi']:.1f}")
         
         if good_opportunities:
-            print(f"\n🥈 GOOD OPPORTUNITIES (Score 4-7)")
+            print(f"\n🥈 GOOD OPPORTUNITIES (Score {good_range})")
             print("─" * 50)
             for idx, result in enumerate(good_opportunities[:5], 1):
                 print(f"{idx}. {result['ticker']} - Score: {result['score']} - ${result['price']:.2f}")
         
+        for tier, opportunities in (('ULTIMATE', ultimate_opportunities), ('PREMIUM', premium_opportunities),
+                                    ('GOOD', good_opportunities)):
+            report_lines.append(f"\n{tier} ({len(opportunities)})")
+            report_lines.extend(f"{result['ticker']:6s} score {result['score']:3d}  confidence {result['confidence']}"
+                                f"  ${result['price']:.2f}"
+                                + (f"  (+ {', '.join(result['correlated'])})" if 'correlated' in result else "")
+                                for result in opportunities)
+        
         # Send email with all quality opportunities
         email_opportunities = ultimate_opportunities + premium_opportunities
-        if email_opportunities:
+        if email_opportunities and not args.no_email:
             try:
-                send_ultimate_email(email_opportunities)
+                with METRICS.timer('email'):
+                    notifier = send_ultimate_email(email_opportunities, delta)
             except Exception as e:
                 print(f"❌ Email failed: {e}")
         
@@ -678,17 +4714,41 @@ def main():
         print(f"📊 ULTIMATE ANALYSIS COMPLETE")
         print(f"="*80)
         print(f"⏱️  Analysis time: {duration:.1f} seconds")
-        print(f"📈 Total stocks analyzed: {len(STOCKS_TO_MONITOR)}")
+        if METRICS.enabled:
+            METRICS.report()
+        print(f"📈 Total stocks analyzed: {len(universe)}")
         print(f"🎯 Opportunities found: {len(results)}")
         print(f"🏆 Ultimate opportunities: {len(ultimate_opportunities)}")
         print(f"🥇 Premium opportunities: {len(premium_opportunities)}")
         print(f"🥈 Good opportunities: {len(good_opportunities)}")
-        print(f"📧 Email sent with top {len(email_opportunities)} opportunities")
+        if notifier is not None and notifier.queued:
+            print(f"📧 Email queued with top {len(email_opportunities)} opportunities")
         print(f"="*80)
         
     else:
         print("\n❌ No opportunities detected with current market conditions.")
         print("💡 Try running again later or adjust scoring thresholds.")
+        if METRICS.enabled:
+            METRICS.report()
+    
+    # Picked up by the workflow's artifact upload
+    with open(os.environ.get('STOCK_REPORT_FILE', 'analysis_report.txt'), 'w') as f:
+        f.write('\n'.join(report_lines) + '\n')
+    
+    # The digests were sending in the background; wait for them before exiting
+    if notifier is not None:
+        notifier.close()
+        print(f"📧 Emails delivered: {notifier.sent}")
+        for _, error in notifier.failed:
+            print(f"❌ Email error: {error}")
+    
+    metrics_file = os.environ.get('STOCK_METRICS_FILE')
+    if METRICS.enabled and metrics_file:
+        METRICS.export(metrics_file)
+    return results
+
+# Time spent importing this module, reported with --metrics
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,265 @@
+"""Offline benchmark for the NASDAQ-100 analyzer
+
+Times every indicator function, a full analyze_stocks() run and CLI startup on
+deterministic synthetic OHLCV data (no network access), and writes the
+results as JSON so runs can be compared:
+
+    python benchmark.py --tickers 100 --bars 252 --output bench.json
+    python benchmark.py --compare bench.json
+
+`--parity` instead checks every available kernel backend against the pandas
+implementations and exits non-zero on a mismatch.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ANALYZER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'NASDAQ-100-2.py')
+
+def load_analyzer():
+    """Import NASDAQ-100-2.py as a module (its file name is not importable directly)"""
+    sys.path.insert(0, os.path.dirname(ANALYZER_PATH))
+    spec = importlib.util.spec_from_file_location('nasdaq_analyzer', ANALYZER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def synthetic_ohlcv(n_tickers=100, n_bars=252, seed=0, gap_rate=0.02, nan_rate=0.01, zero_volume_rate=0.01):
+    """Deterministic random-walk OHLCV frames keyed by ticker
+
+    Each ticker drops `gap_rate` of its sessions (missing bars), blanks
+    `nan_rate` of the remaining rows and reports zero volume on
+    `zero_volume_rate` of them, so the indicators see realistic dirty data.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2015-01-02', periods=n_bars, tz='America/New_York')
+    data = {}
+
+    for i in range(n_tickers):
+        returns = rng.normal(0.0004, 0.02, n_bars)
+        close = 20 + 180 * rng.random() * np.exp(np.cumsum(returns))
+        spread = close * rng.uniform(0.002, 0.03, n_bars)
+        frame = pd.DataFrame({
+            'Open': close + rng.normal(0, 0.3, n_bars) * spread,
+            'High': close + spread * rng.random(n_bars),
+            'Low': close - spread * rng.random(n_bars),
+            'Close': close,
+            'Volume': rng.lognormal(14, 0.5, n_bars).round(),
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=index)
+
+        frame.loc[rng.random(n_bars) < zero_volume_rate, 'Volume'] = 0.0
+        frame.loc[rng.random(n_bars) < nan_rate, ['Open', 'High', 'Low', 'Close']] = np.nan
+        frame = frame.loc[rng.random(n_bars) >= gap_rate]
+        data[f"SYN{i:04d}"] = frame
+    return data
+
+def time_call(function, repeat):
+    """Wall-clock seconds of `repeat` runs of function()"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def summarize(timings, calls):
+    return {
+        'calls': calls,
+        'best_s': min(timings),
+        'median_s': statistics.median(timings),
+        'per_call_ms': min(timings) / calls * 1000,
+    }
+
+def time_startup(repeat):
+    """Interpreter start + module import + CLI parsing, as paid by every cron invocation"""
+    command = [sys.executable, ANALYZER_PATH, '--help']
+    return time_call(lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL), repeat)
+
+def available_backends(analyzer):
+    """Kernel backends that load here (numba only when it is installed)"""
+    backends = []
+    for name in ('numpy', 'numba'):
+        try:
+            analyzer.set_kernel_backend(name)
+        except ImportError:
+            continue
+        backends.append(name)
+    analyzer.set_kernel_backend('auto')
+    return backends
+
+def field_matrix(data, field):
+    """(dates x tickers) array of one OHLCV field, NaN where a ticker has no bar"""
+    return pd.concat({ticker: frame[field] for ticker, frame in data.items()}, axis=1).to_numpy(dtype='f8')
+
+def time_kernels(analyzer, data, repeat):
+    """Time each kernel of each available backend over the whole synthetic universe"""
+    close, high = field_matrix(data, 'Close'), field_matrix(data, 'High')
+    calls = {
+        'ewm_mean': lambda kernels: kernels['ewm_mean'](close, 26),
+        'rolling_extreme': lambda kernels: kernels['rolling_extreme'](high, 50, True, 1),
+        'rolling_nth_extreme_mean': lambda kernels: kernels['rolling_nth_extreme_mean'](high, 50, 6, 10, True),
+    }
+    results = {}
+    for backend in available_backends(analyzer):
+        analyzer.set_kernel_backend(backend)
+        kernels = analyzer.kernels()
+        for name, call in calls.items():
+            call(kernels)  # Compile / warm up
+            results[f'kernels.{backend}.{name}'] = summarize(time_call(lambda: call(kernels), repeat), close.shape[1])
+    analyzer.set_kernel_backend('auto')
+    return results
+
+def check_parity(analyzer, data, rtol=1e-9, sample=10):
+    """Compare every kernel backend with pandas and the numpy matrix engine; True when all match"""
+    close, high, low, volume = (field_matrix(data, field) for field in ('Close', 'High', 'Low', 'Volume'))
+    frame = pd.DataFrame(high[:, :sample])
+    nth_reference = np.array([
+        [frame[j].iloc[max(0, i - 49):i + 1].nlargest(10).iloc[5:].mean() for j in frame] for i in range(len(frame))
+    ])
+    references = {
+        'ewm_mean': (lambda kernels: kernels['ewm_mean'](close, 12),
+                     pd.DataFrame(close).ewm(span=12).mean().to_numpy()),
+        'rolling_max': (lambda kernels: kernels['rolling_extreme'](high, 50, True, 1),
+                        pd.DataFrame(high).rolling(50, min_periods=1).max().to_numpy()),
+        'rolling_min': (lambda kernels: kernels['rolling_extreme'](low, 14, False, 14),
+                        pd.DataFrame(low).rolling(14).min().to_numpy()),
+        'rolling_nth_extreme_mean': (lambda kernels: kernels['rolling_nth_extreme_mean'](
+            high[:, :sample], 50, 6, 10, True), nth_reference),
+    }
+    tickers = list(data)
+    analyzer.set_kernel_backend('numpy')
+    expected_table = analyzer.compute_indicator_table(close, high, low, volume, tickers)
+    expected_history = analyzer.compute_indicator_history(close, high, low, volume)
+    
+    def mismatch(actual, expected):
+        actual, expected = np.asarray(actual, dtype='f8'), np.asarray(expected, dtype='f8')
+        same = np.isclose(actual, expected, rtol=rtol, atol=0, equal_nan=True)
+        return int((~same).sum())
+    
+    ok = True
+    for backend in available_backends(analyzer):
+        analyzer.set_kernel_backend(backend)
+        kernels = analyzer.kernels()
+        checks = {name: mismatch(call(kernels), expected) for name, (call, expected) in references.items()}
+        table = analyzer.compute_indicator_table(close, high, low, volume, tickers)
+        history = analyzer.compute_indicator_history(close, high, low, volume)
+        numeric = [column for column in table if table[column].dtype.kind in 'fib']
+        checks['indicator_table'] = sum(mismatch(table[column], expected_table[column]) for column in numeric)
+        checks['indicator_history'] = sum(mismatch(history[column], expected_history[column])
+                                          for column in expected_history if history[column].dtype.kind in 'fib')
+        for name, failures in checks.items():
+            print(f"{'✅' if failures == 0 else '❌'} {backend:6s} {name:26s} {failures} mismatches")
+            ok = ok and failures == 0
+    analyzer.set_kernel_backend('auto')
+    return ok
+
+def run_benchmarks(analyzer, data, repeat=5):
+    """Time each indicator over every ticker, the matrix engine, a stubbed end-to-end run and startup"""
+    frames = list(data.values())
+    tickers = list(data)
+
+    def moving_averages(df):
+        return pd.DataFrame({f'MA{w}': analyzer.calculate_moving_average(df, w) for w in (20, 50, 200)})
+
+    averaged = [moving_averages(df) for df in frames]
+    indicators = {
+        'calculate_rsi': lambda: [analyzer.calculate_rsi(df) for df in frames],
+        'calculate_macd': lambda: [analyzer.calculate_macd(df) for df in frames],
+        'calculate_bollinger_bands': lambda: [analyzer.calculate_bollinger_bands(df) for df in frames],
+        'find_support_resistance': lambda: [analyzer.find_support_resistance(df) for df in frames],
+        'analyze_volume': lambda: [analyzer.analyze_volume(df) for df in frames],
+        'check_golden_cross': lambda: [analyzer.check_golden_cross(df) for df in averaged],
+        'calculate_momentum_indicators': lambda: [analyzer.calculate_momentum_indicators(df) for df in frames],
+    }
+    results = {name: summarize(time_call(function, repeat), len(frames)) for name, function in indicators.items()}
+
+    bulk_data = pd.concat(data, axis=1)
+    results['score_universe'] = summarize(time_call(lambda: analyzer.score_universe(bulk_data, tickers), repeat), 1)
+
+    class SyntheticProvider(analyzer.DataProvider):
+        rate_limited = False
+
+        async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+            return data.get(ticker)
+
+    provider = SyntheticProvider()
+
+    def end_to_end():
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyzer.analyze_stocks(tickers, provider=provider)
+
+    results['analyze_stocks'] = summarize(time_call(end_to_end, repeat), 1)
+    results['startup'] = summarize(time_startup(repeat), 1)
+    results.update(time_kernels(analyzer, data, repeat))
+    return results
+
+def compare(results, baseline):
+    """Print per-benchmark speed ratios against a previous JSON report"""
+    print(f"\n{'benchmark':32s} {'baseline ms':>12s} {'current ms':>12s} {'speedup':>8s}")
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        before = previous['best_s'] * 1000
+        after = current['best_s'] * 1000
+        print(f"{name:32s} {before:12.2f} {after:12.2f} {before / after:7.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=100)
+    parser.add_argument('--bars', type=int, default=252)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--compare', help="previous JSON report to compare against")
+    parser.add_argument('--parity', action='store_true', help="check the kernel backends against pandas and exit")
+    args = parser.parse_args(argv)
+
+    analyzer = load_analyzer()
+    data = synthetic_ohlcv(args.tickers, args.bars, args.seed)
+    if args.parity:
+        sys.exit(0 if check_parity(analyzer, data) else 1)
+    results = run_benchmarks(analyzer, data, args.repeat)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'tickers': args.tickers,
+            'bars': args.bars,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📊 Benchmark written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return report
+
+if __name__ == "__main__":
+    main()
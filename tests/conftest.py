@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+
+@pytest.fixture(scope='session')
+def analyzer():
+    """NASDAQ-100-2.py loaded as a module, the same way benchmark.py loads it"""
+    return benchmark.load_analyzer()
+
+@pytest.fixture(scope='session')
+def dirty_data():
+    """Synthetic frames with missing sessions, blank rows and zero-volume days"""
+    return benchmark.synthetic_ohlcv(n_tickers=60, n_bars=320, seed=7, gap_rate=0.03, nan_rate=0.02,
+                                     zero_volume_rate=0.02)
+
+@pytest.fixture(params=['numpy', 'numba'])
+def kernel_backend(request, analyzer, monkeypatch):
+    """Run the test once per indicator kernel backend (numba only when it is installed)"""
+    if request.param == 'numba':
+        pytest.importorskip('numba')
+    monkeypatch.setenv('STOCK_KERNELS', 'auto')
+    analyzer.set_kernel_backend(request.param)
+    yield request.param
+    analyzer.set_kernel_backend('auto')
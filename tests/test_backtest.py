@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+def test_backtest_matches_live_scores_on_dirty_data(analyzer, dirty_data):
+    bulk_data = pd.concat(dirty_data, axis=1)
+    tickers = list(dirty_data)
+    score, passed, close = analyzer.backtest_scores(bulk_data, tickers)
+
+    for date in score.index[[210, 260, -1]]:
+        table, live, _ = analyzer.score_universe(bulk_data.loc[:date], tickers)
+        traded = [ticker for ticker in tickers if date in dirty_data[ticker].index]
+        scored = [ticker for ticker in traded if not np.isnan(score.loc[date, ticker])]
+        masked = sorted(set(traded) - set(scored))
+
+        assert len(scored) > 40
+        np.testing.assert_array_equal(score.loc[date, scored].to_numpy(), live.loc[scored, 'score'].to_numpy())
+        np.testing.assert_array_equal(passed.loc[date, scored].to_numpy(), live.loc[scored, 'passed'].to_numpy())
+        assert (table.loc[masked, 'eligible'] == 0).all()  # No close of their own on the date
+
+def test_backtest_skips_sessions_a_ticker_has_no_bar_for(analyzer, dirty_data):
+    bulk_data = pd.concat(dirty_data, axis=1)
+    score, _, close = analyzer.backtest_scores(bulk_data, list(dirty_data))
+
+    for ticker, frame in dirty_data.items():
+        absent = score.index.difference(frame.index)
+        assert score.loc[absent, ticker].isna().all()
+        assert close.loc[absent, ticker].isna().all()
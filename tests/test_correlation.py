@@ -0,0 +1,60 @@
+import contextlib
+import io
+import json
+import os
+
+import pandas as pd
+import pytest
+
+@pytest.fixture
+def closes(dirty_data):
+    return pd.concat({ticker: frame['Close'] for ticker, frame in dirty_data.items()}, axis=1)
+
+def test_unreadable_cache_is_rebuilt(analyzer, closes, tmp_path):
+    path = tmp_path / 'correlation_60d.npz'
+    path.write_bytes(b'not an npz file')
+
+    correlations = analyzer.RollingCorrelation(path=str(path))
+    assert correlations.cross is None
+
+    correlations.update(closes)
+    assert analyzer.RollingCorrelation(path=str(path)).cross.shape == (len(closes.columns),) * 2
+
+def test_cache_missing_a_field_is_rebuilt(analyzer, tmp_path):
+    path = tmp_path / 'correlation_60d.npz'
+    with open(path, 'wb') as f:
+        analyzer.np.savez(f, tickers=analyzer.np.array(['AAPL']))
+
+    assert analyzer.RollingCorrelation(path=str(path)).cross is None
+
+def test_unpersisted_window_leaves_the_cache_alone(analyzer, closes, tmp_path):
+    path = tmp_path / 'correlation_60d.npz'
+    analyzer.RollingCorrelation(path=str(path)).update(closes.iloc[:-20])
+    saved = path.read_bytes()
+
+    replayed = analyzer.RollingCorrelation(path=str(path), persist=False).update(closes)
+    assert path.read_bytes() == saved
+    assert replayed.dates[-1] == closes.index.asi8[-1]
+
+@pytest.mark.parametrize('mode', ['--replay', '--offline'])
+def test_replay_and_offline_runs_do_not_write_the_cache(analyzer, dirty_data, tmp_path, monkeypatch, mode):
+    bulk_data = pd.concat(dirty_data, axis=1)
+    universe = tmp_path / 'universe.json'
+    universe.write_text(json.dumps({ticker: ticker for ticker in dirty_data}))
+    monkeypatch.setattr(analyzer, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(analyzer, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setenv('STOCK_REPORT_FILE', str(tmp_path / 'report.txt'))
+    if mode == '--replay':
+        analyzer.save_replay_snapshot(bulk_data, str(tmp_path / 'replay'))
+        argv = ['analyze', '--replay', str(tmp_path / 'replay')]
+    else:
+        for ticker, frame in dirty_data.items():
+            analyzer.save_cached_history(ticker, '1d', frame.dropna(subset=['Close']))
+        argv = ['analyze', '--offline']
+
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        analyzer.main(argv + ['--universe', str(universe), '--no-email'])
+
+    assert 'ULTIMATE ANALYSIS COMPLETE' in output.getvalue()
+    assert os.path.isdir(tmp_path / 'cache') == (mode == '--offline')
+    assert not os.path.exists(tmp_path / 'cache' / 'correlation_60d.npz')
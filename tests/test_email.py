@@ -0,0 +1,165 @@
+import contextlib
+import email
+import io
+import json
+import smtplib
+import socket
+import socketserver
+import threading
+
+import pandas as pd
+import pytest
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no auth, no TLS"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections.append(self.request)
+        self.reply('220 stand-in ESMTP')
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith('EHLO'):
+                self.wfile.write(b'250-stand-in\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n')
+            elif command.startswith('DATA'):
+                self.reply('354 end with <CRLF>.<CRLF>')
+                lines = []
+                for line in self.rfile:
+                    if line == b'.\r\n':
+                        break
+                    lines.append(line[1:] if line.startswith(b'..') else line)
+                code = server.data_replies.pop(0) if server.data_replies else '250 queued'
+                server.attempts += 1
+                if code.startswith('250'):
+                    server.messages.append(email.message_from_bytes(b''.join(lines)))
+                self.reply(code)
+            elif command.startswith('QUIT'):
+                self.reply('221 bye')
+                return
+            elif command.split(' ')[0] in ('HELO', 'MAIL', 'RCPT', 'NOOP', 'RSET'):
+                self.reply('250 ok')
+            else:
+                self.reply('500 unknown command')
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = []
+        self.messages = []
+        self.data_replies = []
+        self.attempts = 0
+
+    def drop_connections(self):
+        """Cut every client off, as an idle timeout on a real server would"""
+        with self.lock:
+            for connection in self.connections:
+                with contextlib.suppress(OSError):
+                    connection.shutdown(socket.SHUT_RDWR)
+
+@pytest.fixture
+def smtp_server():
+    server = StandInSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def pool(analyzer, smtp_server):
+    pool = analyzer.SMTPPool('127.0.0.1', smtp_server.server_address[1], timeout=5)
+    yield pool
+    pool.close()
+
+def make_message(analyzer, subject='🚀 digest'):
+    message = analyzer.email_message.EmailMessage()
+    message['Subject'] = subject
+    message['From'] = 'analyzer@example.com'
+    message['To'] = 'reader@example.com'
+    message.set_content('📈 body')
+    return message
+
+def test_notifier_reuses_one_pooled_connection(analyzer, smtp_server, pool):
+    notifier = analyzer.Notifier(pool)
+    for i in range(3):
+        notifier.submit(make_message(analyzer, f"digest {i}"))
+    notifier.close(timeout=10)
+
+    assert (notifier.queued, notifier.sent, notifier.failed) == (3, 3, [])
+    assert [message['Subject'] for message in smtp_server.messages] == ['digest 0', 'digest 1', 'digest 2']
+    assert len(smtp_server.connections) == 1
+
+def test_dead_pooled_connection_is_closed_before_it_is_replaced(analyzer, smtp_server, pool):
+    with pool.connection() as connection:
+        connection.send_message(make_message(analyzer))
+    stale = pool.idle.queue[-1]
+    smtp_server.drop_connections()
+
+    with pool.connection() as connection:
+        connection.send_message(make_message(analyzer))
+
+    assert connection is not stale
+    assert stale.sock is None  # Closed, not just dropped from the pool
+    assert len(smtp_server.connections) == 2 and len(smtp_server.messages) == 2
+
+def test_transient_rejections_are_retried(analyzer, smtp_server, pool):
+    smtp_server.data_replies = ['451 try again later']
+    notifier = analyzer.Notifier(pool, backoff=0)
+    notifier.submit(make_message(analyzer))
+    notifier.close(timeout=10)
+
+    assert notifier.sent == 1 and notifier.failed == []
+    assert smtp_server.attempts == 2
+
+def test_permanent_rejections_are_not_retried(analyzer, smtp_server, pool):
+    smtp_server.data_replies = ['550 mailbox unavailable']
+    notifier = analyzer.Notifier(pool, backoff=0)
+    notifier.submit(make_message(analyzer))
+    notifier.close(timeout=10)
+
+    assert notifier.sent == 0 and smtp_server.attempts == 1
+    [(_, error)] = notifier.failed
+    assert isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 550
+
+@pytest.fixture
+def analysis_run(analyzer, dirty_data, smtp_server, tmp_path, monkeypatch):
+    """Run the analyze command on a replay snapshot of the dirty data, mailing the stand-in server"""
+    analyzer.save_replay_snapshot(pd.concat(dirty_data, axis=1), str(tmp_path / 'replay'))
+    universe = tmp_path / 'universe.json'
+    universe.write_text(json.dumps({ticker: f"{ticker} Inc." for ticker in dirty_data}))
+    monkeypatch.setattr(analyzer, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(analyzer, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(analyzer, 'EMAIL_ADDRESS', 'reader@example.com')
+    monkeypatch.setenv('STOCK_REPORT_FILE', str(tmp_path / 'report.txt'))
+    monkeypatch.setenv('SMTP_HOST', '127.0.0.1')
+    monkeypatch.setenv('SMTP_PORT', str(smtp_server.server_address[1]))
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            analyzer.main(['analyze', '--replay', str(tmp_path / 'replay'), '--universe', str(universe)])
+        return output.getvalue()
+    return run
+
+def test_analysis_email_is_delivered(analysis_run, smtp_server):
+    output = analysis_run()
+
+    assert '📧 Email queued with top' in output
+    assert '📧 Emails delivered: 1' in output
+    [message] = smtp_server.messages
+    assert message['To'] == 'reader@example.com'
+
+def test_email_queued_is_not_reported_when_nothing_was_queued(analysis_run, smtp_server, monkeypatch, tmp_path):
+    monkeypatch.setenv('EMAIL_WATCHLISTS', str(tmp_path / 'missing.json'))
+    output = analysis_run()
+
+    assert '❌ Email error' in output
+    assert 'Email queued' not in output
+    assert smtp_server.messages == []
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+
+def reference_row(analyzer, data):
+    """Last-bar indicators from the per-ticker pandas functions"""
+    data = data.copy()
+    for window in (20, 50, 200):
+        data[f'MA{window}'] = data['Close'].rolling(window).mean()
+    row = {
+        'price': data['Close'].iloc[-1],
+        'rsi': analyzer.calculate_rsi(data).iloc[-1],
+        'ma20': data['MA20'].iloc[-1],
+        'ma50': data['MA50'].iloc[-1],
+        'ma200': data['MA200'].iloc[-1],
+        'cross': analyzer.check_golden_cross(data),
+    }
+    groups = {
+        'macd_data': analyzer.calculate_macd(data),
+        'bb_data': analyzer.calculate_bollinger_bands(data),
+        'sr_data': analyzer.find_support_resistance(data),
+        'volume_data': analyzer.analyze_volume(data),
+        'momentum_data': analyzer.calculate_momentum_indicators(data),
+    }
+    return row, groups
+
+def assert_same(expected, actual, label):
+    if expected is None or isinstance(expected, str):
+        assert actual == expected, label
+    else:
+        np.testing.assert_allclose(float(actual), float(expected), rtol=1e-9, atol=1e-9, err_msg=label)
+
+def check_table_against_reference(analyzer, data):
+    bulk_data = pd.concat(data, axis=1)
+    _, present, prices = analyzer.build_price_matrix(bulk_data, list(data))
+    table = analyzer.compute_indicator_table(prices['Close'], prices['High'], prices['Low'],
+                                             prices['Volume'], present).to_dict('index')
+    for ticker in present:
+        expected, expected_groups = reference_row(analyzer, analyzer.extract_ticker_data(bulk_data, ticker))
+        row = table[ticker]
+        for field, value in expected.items():
+            assert_same(value, row[field], f"{ticker} {field}")
+        groups = analyzer.indicator_groups(row)
+        for group, values in expected_groups.items():
+            assert (values is None) == (groups[group] is None), f"{ticker} {group} validity"
+            for field, value in (values or {}).items():
+                assert_same(value, groups[group][field], f"{ticker} {group}.{field}")
+
+def test_table_matches_pandas_functions_on_clean_data(analyzer, kernel_backend):
+    data = benchmark.synthetic_ohlcv(n_tickers=20, n_bars=260, seed=3, gap_rate=0, nan_rate=0, zero_volume_rate=0)
+    for i, n_bars in enumerate([15, 20, 21, 50, 70, 199, 200, 201]):
+        data[f"SYN{i:04d}"] = data[f"SYN{i:04d}"].tail(n_bars)
+    check_table_against_reference(analyzer, data)
+
+def test_table_matches_pandas_functions_on_dirty_data(analyzer, kernel_backend, dirty_data):
+    check_table_against_reference(analyzer, dirty_data)
+
+def test_rsi_treats_missing_changes_as_zero(analyzer, kernel_backend):
+    data = benchmark.synthetic_ohlcv(n_tickers=1, n_bars=60, seed=1, gap_rate=0, nan_rate=0, zero_volume_rate=0)
+    frame = data['SYN0000']
+    frame.iloc[-5, frame.columns.get_loc('Close')] = np.nan
+    close = frame[['Close']].to_numpy()
+
+    table = analyzer.compute_indicator_table(close, close, close, frame[['Volume']].to_numpy(), ['SYN0000'])
+    history = analyzer.compute_indicator_history(close, close, close, frame[['Volume']].to_numpy())
+
+    expected = analyzer.calculate_rsi(frame)
+    assert table['rsi'].iloc[0] == pytest.approx(expected.iloc[-1], rel=1e-12)
+    eligible = slice(analyzer.INDICATOR_MIN_BARS['rsi'] - 1, None)
+    np.testing.assert_allclose(history['rsi'][eligible, 0], expected.to_numpy()[eligible], rtol=1e-9)
+
+def test_each_price_window_is_traversed_once(analyzer, dirty_data, monkeypatch):
+    caches = []
+    slices = []
+    tail_rows = analyzer._tail_rows
+
+    class RecordingCache(analyzer.FeatureCache):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            caches.append(self)
+
+    def recording_tail_rows(values, count):
+        slices.append(values)
+        return tail_rows(values, count)
+
+    monkeypatch.setattr(analyzer, 'FeatureCache', RecordingCache)
+    monkeypatch.setattr(analyzer, '_tail_rows', recording_tail_rows)
+    bulk_data = pd.concat(dirty_data, axis=1)
+    _, present, prices = analyzer.build_price_matrix(bulk_data, list(dirty_data))
+    analyzer.compute_indicator_table(prices['Close'], prices['High'], prices['Low'], prices['Volume'], present)
+
+    [cache] = caches
+    price_slices = [values for values in slices if any(values is array for array in cache.arrays.values())]
+    assert set(cache.windows) == set(analyzer.FEATURE_WINDOWS)
+    assert len(price_slices) == len(cache.windows)
+    assert set(cache.passes.values()) == {1}
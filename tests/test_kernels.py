@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+
+@pytest.fixture(params=['clean', 'dirty'])
+def prices(request, dirty_data):
+    """(dates x tickers) High/Low/Close matrices; the dirty ones have gaps, blank rows and a late listing"""
+    if request.param == 'clean':
+        data = benchmark.synthetic_ohlcv(n_tickers=12, n_bars=260, seed=5, gap_rate=0, nan_rate=0,
+                                         zero_volume_rate=0)
+    else:
+        data = dict(dirty_data)
+        data['SYN0000'] = data['SYN0000'].tail(40)
+    return {field: benchmark.field_matrix(data, field) for field in ('High', 'Low', 'Close')}
+
+def nth_extreme_reference(values, window, first, last, largest):
+    frame = pd.DataFrame(values)
+    pick = pd.Series.nlargest if largest else pd.Series.nsmallest
+    return np.array([[pick(frame[j].iloc[max(0, i - window + 1):i + 1], last).iloc[first - 1:].mean()
+                      for j in frame] for i in range(len(frame))])
+
+@pytest.mark.parametrize('span', [12, 26])
+def test_ewm_mean_matches_pandas(analyzer, kernel_backend, prices, span):
+    expected = pd.DataFrame(prices['Close']).ewm(span=span).mean().to_numpy()
+    np.testing.assert_allclose(analyzer._ewm_mean(prices['Close'], span), expected, rtol=1e-9)
+
+@pytest.mark.parametrize('how, window, min_periods', [('max', 50, 1), ('min', 14, None), ('max', 20, 5)])
+def test_rolling_extremes_match_pandas(analyzer, kernel_backend, prices, how, window, min_periods):
+    values = prices['High' if how == 'max' else 'Low']
+    rolling = pd.DataFrame(values).rolling(window, min_periods=min_periods)
+    expected = getattr(rolling, how)().to_numpy()
+    np.testing.assert_array_equal(analyzer._rolling(values, window, how, min_periods), expected)
+
+@pytest.mark.parametrize('first, last, largest', [(6, 10, True), (6, 10, False), (1, 3, True)])
+def test_rolling_nth_extreme_mean_matches_pandas(analyzer, kernel_backend, prices, first, last, largest):
+    values = prices['High' if largest else 'Low'][:, :6]
+    expected = nth_extreme_reference(values, 50, first, last, largest)
+    np.testing.assert_allclose(analyzer._rolling_nth_extreme_mean(values, 50, first, last, largest), expected,
+                               rtol=1e-9)
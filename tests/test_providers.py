@@ -0,0 +1,210 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+def history(seed, n_bars=30):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n_bars).cumsum()
+    index = pd.bdate_range('2024-01-02', periods=n_bars, tz='America/New_York')
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': 1e6, 'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+
+@pytest.fixture
+def stub_provider(analyzer):
+    class StubProvider(analyzer.DataProvider):
+        """Serves synthetic frames; ERR* raises, NONE* has no data, SLOW* never answers in time"""
+
+        def __init__(self):
+            self.requests = []
+
+        async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+            self.requests.append(ticker)
+            if ticker.startswith('ERR'):
+                raise RuntimeError('provider error')
+            if ticker.startswith('NONE'):
+                return None
+            if ticker.startswith('SLOW'):
+                await asyncio.sleep(5)
+            return history(sum(map(ord, ticker)))
+    return StubProvider()
+
+def test_fetch_many_returns_bulk_frame_in_request_order(stub_provider):
+    bulk_data, missing = asyncio.run(stub_provider.fetch_many(['MSFT', 'AAPL', 'MSFT']))
+
+    assert missing == []
+    assert list(dict.fromkeys(bulk_data.columns.get_level_values(0))) == ['MSFT', 'AAPL']
+    pd.testing.assert_frame_equal(bulk_data['AAPL'], history(sum(map(ord, 'AAPL'))))
+    assert stub_provider.requests == ['MSFT', 'AAPL']
+
+def test_fetch_many_reports_failed_tickers_as_missing(stub_provider, capsys):
+    bulk_data, missing = asyncio.run(stub_provider.fetch_many(['ERR1', 'AAPL', 'NONE1', 'SLOW1'], timeout=0.2))
+
+    assert missing == ['ERR1', 'NONE1', 'SLOW1']
+    assert list(dict.fromkeys(bulk_data.columns.get_level_values(0))) == ['AAPL']
+    output = capsys.readouterr().out
+    assert 'Error fetching data for ERR1: provider error' in output
+    assert 'Timed out fetching SLOW1' in output
+
+def test_fetch_many_with_no_data_returns_empty_frame(stub_provider):
+    bulk_data, missing = asyncio.run(stub_provider.fetch_many(['ERR1', 'NONE1']))
+
+    assert bulk_data.empty
+    assert missing == ['ERR1', 'NONE1']
+
+def test_blocking_wrappers(stub_provider):
+    bulk_data, missing = stub_provider.fetch_chunk(['AAPL', 'NONE1'])
+    assert missing == ['NONE1']
+    assert stub_provider.download(['AAPL', 'NONE1']).equals(bulk_data)
+
+def test_fetch_bulk_data_retries_only_empty_tickers(analyzer, stub_provider):
+    calls = []
+    flaky = {'AMZN'}
+
+    def download(tickers, **request):
+        calls.append(list(tickers))
+        data = stub_provider.download([t for t in tickers if t not in flaky], **request)
+        flaky.clear()  # AMZN comes back on the retry
+        return data
+
+    bulk_data, missing = analyzer.fetch_bulk_data(['AAPL', 'AMZN', 'NONE1'], chunk_size=2, backoff=0,
+                                                  provider=download)
+
+    assert calls == [['AAPL', 'AMZN'], ['NONE1'], ['AMZN', 'NONE1'], ['NONE1']]
+    assert missing == ['NONE1']
+    assert list(dict.fromkeys(bulk_data.columns.get_level_values(0))) == ['AAPL', 'AMZN']
+
+def test_fetch_bulk_data_gives_up_on_failing_chunks(analyzer, capsys):
+    def download(tickers, **request):
+        raise ConnectionError('rate limited')
+
+    bulk_data, missing = analyzer.fetch_bulk_data(['AAPL', 'AMZN'], max_retries=2, backoff=0, provider=download)
+
+    assert bulk_data.empty
+    assert missing == ['AAPL', 'AMZN']
+    assert capsys.readouterr().out.count('rate limited') == 1  # Only the last attempt is reported
+
+def test_token_bucket_waits_off_its_debt(analyzer, monkeypatch):
+    waits = []
+    monkeypatch.setattr(analyzer.time, 'sleep', waits.append)
+    bucket = analyzer.TokenBucket(rate=10.0, capacity=5)
+
+    bucket.acquire(5)
+    assert waits == []
+    bucket.acquire(10)
+    assert waits == [pytest.approx(1.0, abs=0.05)]
+
+def test_fetch_pipeline_throttles_every_chunk(analyzer, stub_provider, monkeypatch):
+    acquired = []
+
+    class RecordingBucket:
+        def __init__(self, rate, capacity):
+            assert (rate, capacity) == (5.0, 3)
+
+        def acquire(self, tokens=1):
+            acquired.append(tokens)
+
+    monkeypatch.setattr(analyzer, 'TokenBucket', RecordingBucket)
+    stocks = ['AAPL', 'AMZN', 'ERR1', 'MSFT', 'NONE1']
+    chunks = list(analyzer.fetch_pipeline(stocks, stub_provider.fetch_chunk, workers=2, chunk_size=2,
+                                          rate_limit=5.0, burst=3))
+
+    assert sorted(acquired) == [1, 2, 2]
+    missing = sorted(ticker for _, _, chunk_missing in chunks for ticker in chunk_missing)
+    assert missing == ['ERR1', 'NONE1']
+
+def test_fetch_pipeline_reports_failed_chunks(analyzer, capsys):
+    def fetch_chunk(chunk):
+        raise TimeoutError('upstream down')
+
+    chunks = list(analyzer.fetch_pipeline(['AAPL', 'AMZN', 'MSFT'], fetch_chunk, chunk_size=2, rate_limit=None))
+
+    assert sorted(ticker for _, _, missing in chunks for ticker in missing) == ['AAPL', 'AMZN', 'MSFT']
+    assert all(bulk_data.empty for _, bulk_data, _ in chunks)
+    assert 'upstream down' in capsys.readouterr().out
+
+def test_fetch_universe_skips_throttling_for_local_providers(analyzer, stub_provider, monkeypatch):
+    def no_bucket(rate, capacity):
+        raise AssertionError('local providers must not be rate limited')
+
+    monkeypatch.setattr(analyzer, 'TokenBucket', no_bucket)
+    stub_provider.rate_limited = False
+    bulk_data = analyzer.fetch_universe(['AAPL', 'NONE1', 'MSFT'], stub_provider)
+
+    assert set(bulk_data.columns.get_level_values(0)) == {'AAPL', 'MSFT'}
+
+def test_default_provider_is_shared(analyzer):
+    assert analyzer.default_provider() is analyzer.default_provider()
+    assert analyzer.default_provider().upstream is analyzer.default_provider(use_cache=False)
+
+def test_closing_a_cache_provider_keeps_the_shared_upstream(analyzer):
+    shared = analyzer.YFinanceProvider()
+    with analyzer.CacheProvider(shared, offline=True) as provider:
+        pass
+    assert provider.executor._shutdown and not shared.executor._shutdown
+    shared.close()
+
+    with analyzer.CacheProvider(offline=True) as provider:
+        pass
+    assert not analyzer.default_provider(use_cache=False).executor._shutdown
+
+def test_cache_provider_closes_an_upstream_it_was_handed_to_own(analyzer):
+    owned = analyzer.YFinanceProvider()
+    with analyzer.CacheProvider(owned, offline=True, owns_upstream=True):
+        pass
+    assert owned.executor._shutdown
+
+@pytest.fixture
+def fake_yfinance(analyzer, monkeypatch):
+    """Stands in for yf.download: one call per chunk, recording overlapping calls"""
+    class FakeYFinance:
+        def __init__(self):
+            self.calls = []
+            self.active = 0
+            self.overlapped = False
+
+        def download(self, tickers, **request):
+            self.active += 1
+            self.overlapped = self.overlapped or self.active > 1
+            self.calls.append(list(tickers))
+            time.sleep(0.01)
+            self.active -= 1
+            frames = {ticker: history(sum(map(ord, ticker))) for ticker in tickers if not ticker.startswith('NONE')}
+            frames = frames or {tickers[0]: history(0).iloc[:0]}
+            data = pd.concat(frames, axis=1)
+            return data if len(tickers) > 1 else data[tickers[0]]
+
+    fake = FakeYFinance()
+    monkeypatch.setattr(analyzer, 'yf', fake)
+    return fake
+
+def test_yfinance_provider_downloads_each_chunk_in_one_request(analyzer, fake_yfinance):
+    with analyzer.YFinanceProvider(max_retries=2, backoff=0) as provider:
+        bulk_data, missing = provider.fetch_chunk(['AAPL', 'MSFT', 'NONE1'])
+
+    assert fake_yfinance.calls == [['AAPL', 'MSFT', 'NONE1'], ['NONE1']]
+    assert missing == ['NONE1']
+    assert list(dict.fromkeys(bulk_data.columns.get_level_values(0))) == ['AAPL', 'MSFT']
+
+def test_concurrent_chunks_take_turns_on_yf_download(analyzer, fake_yfinance):
+    stocks = [f"T{i:03d}" for i in range(40)]
+    with analyzer.YFinanceProvider() as provider:
+        chunks = list(analyzer.fetch_pipeline(stocks, provider.fetch_chunk, workers=4, chunk_size=10,
+                                              rate_limit=None))
+
+    assert sorted(len(call) for call in fake_yfinance.calls) == [10, 10, 10, 10]
+    assert not fake_yfinance.overlapped
+    assert sum(len(bulk_data.columns.get_level_values(0).unique()) for _, bulk_data, _ in chunks) == 40
+
+def test_blocking_wrappers_work_inside_a_running_event_loop(analyzer, stub_provider, fake_yfinance):
+    async def handler():
+        return (stub_provider.fetch_chunk(['AAPL', 'NONE1']), stub_provider.download(['MSFT']),
+                analyzer.get_stock_data('AMZN'))
+
+    (bulk_data, missing), downloaded, history = asyncio.run(handler())
+
+    assert missing == ['NONE1'] and list(bulk_data.columns.get_level_values(0).unique()) == ['AAPL']
+    assert list(downloaded.columns.get_level_values(0).unique()) == ['MSFT']
+    assert history is not None and fake_yfinance.calls == [['AMZN']]
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+@pytest.fixture
+def write_config(tmp_path):
+    def write(config):
+        path = tmp_path / 'scoring.json'
+        path.write_text(json.dumps(config))
+        return str(path)
+    return write
+
+def test_numeric_overrides_are_applied(analyzer, write_config):
+    path = write_config({'thresholds': {'rsi_oversold': 32}, 'rules': {'golden_cross': {'score': 8}}})
+    thresholds, rules = analyzer.load_scoring_config(path)
+
+    assert thresholds['rsi_oversold'] == 32
+    assert {rule['id']: rule for rule in rules}['golden_cross']['score'] == 8
+
+@pytest.mark.parametrize('rule, match', [
+    ({'when': "__import__('os').system('id')"}, 'not when'),
+    ({'text': "{rsi.__class__}"}, 'not text'),
+    ({'score': '8'}, 'Non-numeric'),
+    ({'score': True}, 'Non-numeric'),
+])
+def test_rule_overrides_are_limited_to_numbers(analyzer, write_config, rule, match):
+    with pytest.raises(ValueError, match=match):
+        analyzer.load_scoring_config(write_config({'rules': {'golden_cross': rule}}))
+
+def test_unknown_overrides_are_rejected(analyzer, write_config):
+    with pytest.raises(ValueError, match='no_such_rule'):
+        analyzer.load_scoring_config(write_config({'rules': {'no_such_rule': {'score': 1}}}))
+    with pytest.raises(ValueError, match='Non-numeric'):
+        analyzer.load_scoring_config(write_config({'thresholds': {'rsi_oversold': 'rsi'}}))
+
+def test_sweep_grid_cannot_override_rule_conditions(analyzer):
+    assert len(analyzer.expand_sweep_grid({'rules': {'golden_cross': {'score': [4, 6]}}})) == 2
+    with pytest.raises(ValueError, match='not when'):
+        analyzer.expand_sweep_grid({'rules': {'golden_cross': {'when': ['True']}}})
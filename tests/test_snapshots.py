@@ -0,0 +1,46 @@
+import contextlib
+import io
+
+import pytest
+
+@pytest.fixture
+def run(analyzer, dirty_data, tmp_path):
+    class SyntheticProvider(analyzer.DataProvider):
+        rate_limited = False
+
+        def __init__(self, available):
+            self.available = available
+
+        async def fetch_history(self, ticker, period="1y", interval="1d", start=None):
+            return dirty_data[ticker] if ticker in self.available else None
+
+    store = analyzer.SnapshotStore(str(tmp_path))
+    tickers = list(dirty_data)
+
+    def analyze(available, run_date):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            analyzer.analyze_stocks(tickers, provider=SyntheticProvider(available), store=store, run_date=run_date)
+        return output.getvalue()
+    return store, tickers, analyze
+
+def test_full_run_is_saved(run):
+    store, tickers, analyze = run
+    analyze(set(tickers), '2026-01-05')
+
+    assert store.saved == ['2026-01-05']
+    assert len(store.load('2026-01-05')) == len(tickers)
+
+def test_mostly_failed_run_is_not_saved(run):
+    store, tickers, analyze = run
+    analyze(set(tickers), '2026-01-05')
+    output = analyze(set(tickers[:10]), '2026-01-06')
+
+    assert 'Snapshot not saved: only 10 of 60 tickers were scored' in output
+    assert store.dates() == ['2026-01-05']
+    assert store.saved == ['2026-01-05']
+
+def test_run_without_data_is_not_saved(run):
+    store, _, analyze = run
+    analyze(set(), '2026-01-05')
+
+    assert store.dates() == []
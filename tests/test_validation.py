@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+def make_prices(close, n_cols=1, splits=None):
+    close = np.tile(np.asarray(close, dtype='f8')[:, None], (1, n_cols))
+    return {
+        'Open': close * 1.001,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': np.full(close.shape, 1e6),
+        'Stock Splits': np.zeros(close.shape) if splits is None else np.asarray(splits, dtype='f8')[:, None],
+    }
+
+def trending(n_rows=60):
+    return 20 + 0.05 * np.arange(n_rows) + np.sin(np.arange(n_rows))
+
+def test_unrecorded_split_like_drop_masks_the_ticker(analyzer):
+    close = trending()
+    close[40:] /= 2
+    prices = make_prices(close)
+
+    validated, eligible = analyzer.validate_prices(prices)
+
+    np.testing.assert_array_equal(validated['Close'], prices['Close'])  # Prices are left alone
+    assert eligible[0] == 0
+
+def test_recorded_split_is_back_adjusted(analyzer):
+    close = trending()
+    close[40:] /= 2
+    splits = np.zeros(len(close))
+    splits[40] = 2.0
+    prices = make_prices(close, splits=splits)
+
+    validated, eligible = analyzer.validate_prices(prices)
+
+    np.testing.assert_allclose(validated['Close'][:40, 0], close[:40] / 2)
+    np.testing.assert_allclose(validated['Close'][40:, 0], close[40:])
+    np.testing.assert_allclose(validated['Volume'][:40, 0], 2e6)
+    assert eligible[0] == analyzer.indicator_eligibility(np.array([60]))[0]
+
+def test_gap_fill_only_touches_missing_fields(analyzer):
+    prices = make_prices(trending())
+    prices['Close'][30, 0] = np.nan
+    prices['High'][31, 0] = prices['Low'][31, 0] = np.nan
+    prices['Close'][31, 0] = np.nan
+
+    validated, _ = analyzer.validate_prices(prices)
+
+    last_close = prices['Close'][29, 0]
+    assert validated['Close'][30, 0] == validated['Close'][31, 0] == last_close
+    assert validated['High'][30, 0] == prices['High'][30, 0]  # Valid fields keep their values
+    assert validated['Open'][31, 0] == prices['Open'][31, 0]
+    assert validated['High'][31, 0] == validated['Low'][31, 0] == last_close
+    assert np.isnan(validated['Volume'][30:32, 0]).sum() == 0
+
+def test_missing_last_close_masks_the_ticker(analyzer):
+    prices = make_prices(trending(), n_cols=2)
+    prices['Close'][-2:, 1] = np.nan
+
+    validated, eligible = analyzer.validate_prices(prices)
+
+    assert np.isnan(validated['Close'][-2:, 1]).all()  # Not carried forward
+    assert eligible[0] != 0 and eligible[1] == 0
+
+def test_history_mask_matches_the_live_mask_bar_by_bar(analyzer, dirty_data):
+    bulk_data = pd.concat(dirty_data, axis=1)
+    _, present, prices = analyzer.build_price_matrix(bulk_data, list(dirty_data), analyzer.VALIDATION_FIELDS)
+    close = prices['Close']
+    close[200:, 3] /= 3  # A 3-for-1 split with no "Stock Splits" record
+    _, history = analyzer.validate_prices(prices, history=True)
+
+    for end in (150, 201, 260, len(close)):
+        _, live = analyzer.validate_prices({field: values[:end] for field, values in prices.items()})
+        np.testing.assert_array_equal(history[end - 1], live)
+    assert history[199, 3] != 0 and history[200, 3] == 0
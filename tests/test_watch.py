@@ -0,0 +1,93 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+
+@pytest.fixture
+def bulk_data():
+    """Missing sessions but no blank rows, so validation leaves the prices alone"""
+    data = benchmark.synthetic_ohlcv(n_tickers=12, n_bars=300, seed=11, gap_rate=0.05, nan_rate=0,
+                                     zero_volume_rate=0)
+    return pd.concat(data, axis=1)
+
+def session_of(bulk_data):
+    return bulk_data.index[-1].strftime('%Y-%m-%d')
+
+def test_quote_at_the_last_close_rescores_todays_session_unchanged(analyzer, bulk_data):
+    tickers = list(dict.fromkeys(bulk_data.columns.get_level_values(0)))
+    index, tails = analyzer.build_trigger_index(bulk_data, tickers, session=session_of(bulk_data))
+    live, _, _ = analyzer.score_universe(bulk_data, tickers)
+
+    columns = np.arange(len(index.tickers))
+    table = analyzer._next_bar_table(tails, columns, index.reference)
+    table.index = pd.Index(index.tickers, name='ticker')
+
+    today = bulk_data.index[-1]
+    in_session = [ticker for ticker in index.tickers if today in bulk_data[ticker].dropna(how='all').index]
+    assert len(in_session) > 5
+    for field in [column for column in live if live[column].dtype.kind == 'f']:
+        np.testing.assert_allclose(table.loc[in_session, field].to_numpy(dtype='f8'),
+                                   live.loc[in_session, field].to_numpy(dtype='f8'), rtol=1e-9, atol=1e-12, err_msg=field)
+
+def test_next_bar_follows_a_finished_session(analyzer, bulk_data):
+    tickers = list(dict.fromkeys(bulk_data.columns.get_level_values(0)))
+    index, tails = analyzer.build_trigger_index(bulk_data, tickers, session='2099-01-02')
+    _, _, prices = analyzer.build_price_matrix(bulk_data, tickers)
+
+    np.testing.assert_array_equal(tails['Close'], prices['Close'][-analyzer.TRIGGER_HISTORY_BARS:])
+    assert np.isnan(tails['session']['High']).all()
+
+def test_watch_rebuilds_the_levels_for_a_new_session(analyzer, bulk_data, monkeypatch):
+    tickers = list(dict.fromkeys(bulk_data.columns.get_level_values(0)))
+    fetched = []
+    sessions = iter(['2026-10-16', '2026-10-16', '2026-10-19', '2026-10-19'])
+    built_for = []
+    build = analyzer.build_trigger_index
+
+    def fetch_universe(stock_list, provider):
+        fetched.append(list(stock_list))
+        return bulk_data
+
+    def build_trigger_index(*args, session=None, **kwargs):
+        built_for.append(session)
+        return build(*args, session=session, **kwargs)
+
+    monkeypatch.setattr(analyzer, 'fetch_universe', fetch_universe)
+    monkeypatch.setattr(analyzer, 'build_trigger_index', build_trigger_index)
+    monkeypatch.setattr(analyzer, '_market_date', lambda: next(sessions))
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.watch(tickers, quote_source=lambda tickers: {}, interval=0, iterations=3, provider=object())
+
+    assert built_for == ['2026-10-16', '2026-10-19']
+    assert len(fetched) == 2
+
+def test_yfinance_quotes_are_batched_and_throttled(analyzer, monkeypatch):
+    acquired = []
+    requests = []
+
+    class RecordingBucket:
+        def __init__(self, rate, capacity):
+            pass
+
+        def acquire(self, tokens=1):
+            acquired.append(tokens)
+
+    def download(tickers, **request):
+        requests.append((list(tickers), request['interval']))
+        index = pd.date_range('2026-10-16 09:30', periods=3, freq='min', tz='America/New_York')
+        return pd.concat({ticker: pd.DataFrame({'Close': [1.0, 2.0, np.nan]}, index=index) for ticker in tickers},
+                         axis=1)
+
+    monkeypatch.setattr(analyzer, 'TokenBucket', RecordingBucket)
+    monkeypatch.setattr(analyzer, '_yfinance_download', download)
+    stocks = [f"T{i:03d}" for i in range(60)]
+    quotes = analyzer._yfinance_quotes(stocks)
+
+    assert quotes == {ticker: 2.0 for ticker in stocks}
+    assert sorted(len(chunk) for chunk, _ in requests) == [10, 25, 25]
+    assert {interval for _, interval in requests} == {'1m'}
+    assert sorted(acquired) == [10, 25, 25]